@@ -18,7 +18,13 @@ import subprocess
 
 from direction import MOVEMENT_MAP_INVERTED, Direction, Position, deltaPosition
 
-from node import ORIGO, Engine, EngineMode, Node, DFSWithPath
+from node import ORIGO, Engine, EngineMode, Grid, Node, DFSWithPath
+from parallel import untanglingInParallel
+from paging import PagedStore
+from store import StoreNode
+from worldfile import isWorldFile
+from autosave import Autosave
+from worldlog import WriteAheadLog
 from color import (
     Color,
     ColorManager,
@@ -42,6 +48,10 @@ COLOR_CURSOR: Color = (50, 50, 50)
 
 SCREEN_AUTO_RESOLUTION: bool = False
 SCREEN_FRAME_RATE: int = 60  # How often to render the scene
+SCREEN_WORK_RATIO: float = 0.5  # Part of every frame spent on maintenance
+SOLVER_BUDGET: float = 5.0  # Seconds to spend untangling by annealing
+RESIDENT_NODES: int = 100_000  # Nodes kept in memory, the rest is paged out
+AUTOSAVE_INTERVAL: float = 60.0  # Seconds between saving the whole world
 SCREEN_TILE_SIZE: int = 50  # Pixel width during start
 
 TIME_OUT_DURATION: float = 0.2  # Time waiting between events
@@ -157,6 +167,8 @@ class Application:
 
         self.engine.setDrawer(self.render)
         self.writer = False
+        self.log: WriteAheadLog | None = None  # Saving changes as they happen
+        self.autosave: Autosave | None = None  # Saving the whole world now and then
 
         self.clock = pygame.time.Clock()
 
@@ -205,6 +217,7 @@ class Application:
                 else:
                     self.engine.getNode().setData(editor.value)
 
+                self.engine.journal.end()  # Editing is a single step
                 return
 
         editor.update(events)
@@ -224,7 +237,8 @@ class Application:
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if pygame.mouse.get_pressed()[0]:  # Left click
                     if self.engine.getMode() != EngineMode.READ_ONLY:
-                        self.engine.getNode().toggleLock()
+                        with self.engine.journal:
+                            self.engine.getNode().toggleLock()
 
                 elif pygame.mouse.get_pressed()[2]:  # Right click
                     toggleEngineMode(self.engine, EngineMode.LIMINAL)
@@ -241,6 +255,7 @@ class Application:
                     toggleEngineMode(self.engine, EngineMode.NORMAL)
                 elif event.key == pygame.K_RETURN:
                     editor.value = self.engine.getNode().getData() or ""
+                    self.engine.journal.begin()
                     self.engine.getNode().setData(None)
                     self.writer = True
                     editor.font_color = self.colors2[-1]
@@ -249,7 +264,12 @@ class Application:
 
                 elif event.key == pygame.K_SPACE:  # Lock current Node
                     if self.engine.getMode() != EngineMode.READ_ONLY:
-                        self.engine.getNode().toggleLock()
+                        with self.engine.journal:
+                            self.engine.getNode().toggleLock()
+                elif event.key == pygame.K_z:  # Undo
+                    self.engine.undo()
+                elif event.key == pygame.K_x:  # Redo
+                    self.engine.redo()
                 elif event.key == pygame.K_ESCAPE:  # Stop program
                     self.running = False
                     return
@@ -258,9 +278,13 @@ class Application:
                 elif event.key == pygame.K_i:  # Insert new Node
                     self.engine.insert()
                 elif event.key == pygame.K_v:  # Untangle graph (best effort)
-                    self.engine.untangle()
+                    self.engine.maintain(self.engine.untangling())
+                elif event.key == pygame.K_m:  # Untangle graph (all cores)
+                    self.engine.maintain(untanglingInParallel(self.engine))
+                elif event.key == pygame.K_g:  # Untangle graph (annealing)
+                    self.engine.maintain(self.engine.solving(SOLVER_BUDGET))
                 elif event.key == pygame.K_p:  # Prune
-                    self.engine.prune()
+                    self.engine.maintain(self.engine.pruning())
                 elif event.key == pygame.K_c:  # Random color-theme
                     n: int = self.engine.getDepth() + 3
                     colorManagerGrid.settings = randomColorSettings(n)
@@ -270,17 +294,28 @@ class Application:
                     self.colors2 = colorManagerText.computeRange(n)
 
                 elif event.key == pygame.K_y:  # serialize program
-                    path: str | None = create_file()
-                    if path is not None:
-                        Engine.serialize(self.engine, path)
+                    if self.autosave is not None:  # Already saving, save now
+                        self.autosave.save(self.engine)
+                    else:
+                        path: str | None = create_file()
+                        if path is not None:
+                            self.startSaving(path)
 
                 elif event.key == pygame.K_u:  # serialize program
                     path: str | None = browse_file()
                     if path is not None:
-                        self.engine = Engine.deserialize(path)
+                        self.engine.cancel()
+                        self.stopSaving()
+                        if isWorldFile(path):  # Keep saving changes to it
+                            self.engine, self.log = WriteAheadLog.resume(
+                                path, RESIDENT_NODES
+                            )
+                            self.autosave = Autosave(path, AUTOSAVE_INTERVAL, self.log)
+                        else:
+                            self.engine = Engine.deserialize(path)
 
                 elif event.key == pygame.K_t:  # Straighten out graph optimization
-                    self.engine.optimize()
+                    self.engine.maintain(self.engine.optimizing())
 
                 # elif event.key == pygame.K_b:  # Debugging purposes
                 #     self.engine.getNode().setData(self.engine.getNode().getId())
@@ -410,39 +445,68 @@ class Application:
             self.delta_movement = TILE_SPEED / (self.clock.get_fps() + EPSILON)
             self.handle_events()
             self.handle_movements()
+            if self.engine.work(SCREEN_WORK_RATIO / SCREEN_FRAME_RATE):
+                self.can_draw = True
             if self.can_draw:
                 self.render()
                 self.can_draw = False
+            if self.log is not None and not self.engine.isBusy():
+                self.log.commit(self.engine)
+            if self.autosave is not None:
+                self.autosave.tick(self.engine)
 
+        self.stopSaving()
         pygame.quit()
 
+    def startSaving(self, filename: str) -> None:
+        """Save the world to a file in the background, and keep it saved
+
+        :param filename: world file
+        """
+        if isinstance(self.engine.start, StoreNode):
+            self.log = WriteAheadLog.create(self.engine, filename, checkpoint=False)
+
+        self.autosave = Autosave(filename, AUTOSAVE_INTERVAL, self.log)
+        self.autosave.save(self.engine)
+
+    def stopSaving(self) -> None:
+        """Finish the save being written and stop saving"""
+        if self.autosave is not None:
+            self.autosave.close()
+            self.autosave = None
+
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
     def render(self) -> None:
         """Render the scene and items on the grid
 
-        The cost of this function is vast as it traverses the network on each
-        redraw.
+        Everything is drawn from the neighborhood the engine already explored,
+        see Engine.iterLinks, so every link is drawn once and every Node is
+        placed once.
         """
         if self.find_home:
-            path: List[Node] = self.engine.search(self.engine.start)
+            path: Set[Node] = set(self.engine.routeHome() or [])
         else:
-            path: List[Node] = []
+            path: Set[Node] = set()
 
         self.window.fill(self.colors[0])
         dx: float = self.x / 2
         dy: float = self.y / 2
 
         depth: int = self.engine.getDepth()
+        places: Dict[Position, Tuple[Position, float]] = {}
 
-        def recDraw(
-            node: Node,
-            parent: Node,
-            n: int,
-            previousPosition: Position,
-            currentPosition: Position,
-            visited: List[Node],
-        ):
-            if n < 0:
-                return
+        def place(currentPosition: Position, n: int) -> Tuple[Position, float]:
+            """Where a position of the grid is drawn, and how large
+
+            :param currentPosition: position in the grid
+            :param n: priority of the position, the depth left
+            :return: position on the screen and tile size
+            """
+            if currentPosition in places:
+                return places[currentPosition]
 
             if WARP:
                 distance: float = (
@@ -468,52 +532,50 @@ class Application:
                 self.middleY - (currentPosition[1] - dy) * deltaSize,
             )
 
-            for direction, neighbor in node.items():
-                if neighbor not in visited:
-                    recDraw(
-                        neighbor,
-                        node,
-                        n - 1,
-                        position,
-                        deltaPosition(direction, currentPosition),
-                        [node] + visited,
-                    )
+            places[currentPosition] = position, deltaSize
 
-            if node != parent:
-                if node in path:
-                    color: Color = self.colors2[n + 2]
-                else:
-                    color: Color = self.colors[n + 2]
-                pygame.draw.line(
-                    self.window,
-                    color,
-                    position,
-                    previousPosition,
-                    int(deltaSize / 3),
-                )
+            return position, deltaSize
 
-            if node.isLocked():
-                pygame.draw.circle(
-                    self.window,
-                    self.colors[0],
-                    position,
-                    deltaSize / 8,
-                )
+        grid: Grid = self.engine.grid
+        for n, currentPosition, node, otherPosition in self.engine.iterLinks():
+            position, deltaSize = place(currentPosition, n)
+            previousPosition, _ = place(otherPosition, grid[otherPosition][0])
 
-            data: Any = node.getData()
-            if data is not None:
-                self.window.blit(
-                    font.render(
-                        data,
-                        False,
-                        self.colors2[n + 2],
-                    ),
-                    position,
-                )
+            if node in path:
+                color: Color = self.colors2[n + 2]
+            else:
+                color: Color = self.colors[n + 2]
+            pygame.draw.line(
+                self.window,
+                color,
+                position,
+                previousPosition,
+                int(deltaSize / 3),
+            )
 
-        startNode: Node = self.engine.getNode()
+        for n in sorted(self.engine.world):
+            for currentPosition, node in self.engine.world[n]:
+                position, deltaSize = place(currentPosition, n)
+
+                if node.isLocked():
+                    pygame.draw.circle(
+                        self.window,
+                        self.colors[0],
+                        position,
+                        deltaSize / 8,
+                    )
+
+                data: Any = node.getData()
+                if data is not None:
+                    self.window.blit(
+                        font.render(
+                            data,
+                            False,
+                            self.colors2[n + 2],
+                        ),
+                        position,
+                    )
 
-        recDraw(startNode, startNode, depth, ORIGO, ORIGO, [])
         if self.writer:
             self.window.blit(
                 editor.surface,
@@ -544,7 +606,7 @@ class Application:
 
 if __name__ == "__main__":
     depthStart: int = 15
-    engine = Engine(EngineMode.NORMAL, depthStart)
+    engine = Engine(EngineMode.NORMAL, depthStart, PagedStore(RESIDENT_NODES).new())
     app = Application(engine)
 
     app.loop()
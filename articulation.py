@@ -0,0 +1,176 @@
+# Static analysis
+from __future__ import annotations
+from typing import Dict, Generator, Iterator, List, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from node import Node
+
+
+class ArticulationIndex:
+    """Cut vertices of a network, found by Hopcroft-Tarjan in a single depth
+    first search
+
+    For every Node the index knows how many biconnected components (blocks) it
+    belongs to. A Node is a cut vertex, meaning its removal would split the
+    network, exactly when it belongs to more than one block. After that every
+    query is a lookup.
+
+    The index is valid as long as nobody gets connected or disconnected, so
+    rotations and bends keep it. Attaching or detaching a leaf is repaired in
+    place, anything else makes it stale until built again.
+
+    Usage:
+
+    >>> cuts = ArticulationIndex()
+    >>> cuts.build(node)
+    >>> cuts.isCut(node)
+    >>> cuts.blockOf(node, neighbor)
+
+    :param blocks: number of blocks each Node of the indexed network is in
+    :param owner: for every Node but the first, the block holding the edge it
+        was discovered by
+    :param tops: for every block, its Node closest to the first one. A block
+        is its top and the Nodes it owns
+    :param version: link version the index is valid for, see
+        ``Node.getLinkVersion``
+    """
+
+    def __init__(self):
+        self.blocks: Dict[Node, int] = {}
+        self.owner: Dict[Node, int] = {}
+        self.tops: List[Node] = []
+        self.version: int | None = None
+
+    def __contains__(self, node: Node) -> bool:
+        return node in self.blocks
+
+    def isValid(self, node: Node) -> bool:
+        """Checks if the index can answer for a Node
+
+        :param node: Node to ask about
+        :return: if up to date and node is indexed
+        """
+        return self.version == node.getLinkVersion() and node in self.blocks
+
+    def build(self, root: Node) -> None:
+        """Index the network root lives in, without recursion
+
+        :param root: any Node of the network
+        """
+        for _ in self.building(root):
+            pass
+
+    def building(self, root: Node) -> Generator[None, None, None]:
+        """Index the network root lives in, one Node per step. The index is
+        only replaced once done.
+
+        :param root: any Node of the network
+        """
+        discovery: Dict[Node, int] = {root: 0}
+        low: Dict[Node, int] = {root: 0}
+        blocks: Dict[Node, int] = {root: 0}
+        owner: Dict[Node, int] = {}
+        tops: List[Node] = []
+
+        # Nodes of the blocks not yet complete, in discovery order
+        pending: List[Node] = []
+        stack: List[Tuple[Node, Node | None, Iterator[Node]]] = [
+            (root, None, root.values())
+        ]
+
+        while stack:
+            yield
+            node, parent, neighbors = stack[-1]
+
+            for neighbor in neighbors:
+                if neighbor not in discovery:
+                    discovery[neighbor] = low[neighbor] = len(discovery)
+                    blocks[neighbor] = 0
+                    pending.append(neighbor)
+                    stack.append((neighbor, node, neighbor.values()))
+                    break
+
+                # An ancestor or a finished descendant
+                low[node] = min(low[node], discovery[neighbor])
+
+            else:
+                stack.pop()
+                if parent is None:
+                    continue
+
+                low[parent] = min(low[parent], low[node])
+                if low[node] >= discovery[parent]:
+                    # Everything below and including node forms a block with parent
+                    blocks[parent] += 1
+                    while True:
+                        other: Node = pending.pop()
+                        blocks[other] += 1
+                        owner[other] = len(tops)
+                        yield
+                        if other == node:
+                            break
+
+                    tops.append(parent)
+
+        self.blocks = blocks
+        self.owner = owner
+        self.tops = tops
+        self.version = root.getLinkVersion()
+
+    def isCut(self, node: Node) -> bool:
+        """Checks if removing a Node would split the network
+
+        :param node: indexed Node
+        :return: if cut vertex
+        """
+        return self.blocks[node] > 1
+
+    def blockOf(self, node: Node, neighbor: Node) -> int:
+        """Find the block an edge belongs to. Every edge belongs to exactly
+        one.
+
+        :param node: indexed Node
+        :param neighbor: Node connected to it
+        :return: block number, see tops
+        """
+        block: int | None = self.owner.get(node)
+        if block is not None and (
+            block == self.owner.get(neighbor) or self.tops[block] == neighbor
+        ):
+            return block
+
+        return self.owner[neighbor]  # node is the top of its block
+
+    def attach(self, leaf: Node, node: Node, since: int) -> None:
+        """A new leaf was connected to an indexed Node. The edge between them
+        is a block of its own.
+
+        :param leaf: the new leaf
+        :param node: Node the leaf was connected to
+        :param since: link version from before the connection
+        """
+        if since != self.version or node not in self.blocks:
+            self.version = None
+            return
+
+        self.blocks[leaf] = 1
+        self.blocks[node] += 1
+        self.owner[leaf] = len(self.tops)
+        self.tops.append(node)
+        self.version = node.getLinkVersion()
+
+    def detach(self, leaf: Node, node: Node, since: int) -> None:
+        """An indexed leaf was disconnected from its only neighbor
+
+        :param leaf: the former leaf
+        :param node: Node the leaf was connected to
+        :param since: link version from before the disconnection
+        """
+        if since != self.version or leaf not in self.blocks:
+            self.version = None
+            return
+
+        del self.blocks[leaf]
+        self.owner.pop(leaf, None)  # Not owned if it was the first Node
+        self.blocks[node] -= 1
+        self.version = node.getLinkVersion()
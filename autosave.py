@@ -0,0 +1,139 @@
+# Static analysis
+from __future__ import annotations
+from typing import Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import time
+
+from node import Engine
+from worldfile import Snapshot, replaceWorld, takeSnapshot
+from worldlog import WriteAheadLog
+
+
+class Autosave:
+    """Saves the world of an engine every so often, while the engine goes on
+
+    A save starts with a snapshot of the network, see takeSnapshot, which
+    only copies flat arrays. That is all the caller waits for, the snapshot is
+    written on a worker thread, in place of the world file, see replaceWorld.
+
+    If the world is logged, see WriteAheadLog, a save doubles as a checkpoint:
+    once the world file is in place, the log drops what it has caught up with.
+
+    Usage:
+
+    >>> autosave = Autosave("world", interval=60.0)
+    >>> autosave.tick(engine)  # Every frame, saves when it is time
+    >>> autosave.seconds, autosave.bytes  # How the last save went
+
+    :param filename: world file to save to
+    :param interval: seconds between saves
+    :param log: log of the world, if any
+    :param saves: number of saves done
+    :param stalled: seconds the last save kept the caller waiting
+    :param seconds: seconds the last save took in all
+    :param bytes: size of the last save
+    """
+
+    def __init__(
+        self, filename: str, interval: float = 60.0, log: WriteAheadLog | None = None
+    ):
+        self.filename: str = filename
+        self.interval: float = interval
+        self.log: WriteAheadLog | None = log
+
+        self.saves: int = 0
+        self.stalled: float = 0.0
+        self.seconds: float = 0.0
+        self.bytes: int = 0
+
+        self.pool: ThreadPoolExecutor = ThreadPoolExecutor(1)
+        self.future: Future | None = None
+        self.started: float = time.perf_counter()
+        self.end: int = 0  # Where the log ended at the snapshot
+
+    def isBusy(self) -> bool:
+        """Checks if a save is being written
+
+        :return: if busy
+        """
+        return self.future is not None
+
+    def save(self, engine: Engine) -> bool:
+        """Start saving now, unless a save is still being written
+
+        :param engine: engine to save, done with any operation
+        :return: if started
+        """
+        self.poll()
+        if self.isBusy():
+            return False
+
+        self.started = time.perf_counter()
+        if self.log is not None:
+            self.end = self.log.mark(engine)
+
+        snapshot: Snapshot = takeSnapshot(engine)
+        self.stalled = time.perf_counter() - self.started
+        self.future = self.pool.submit(_write, snapshot, self.filename)
+
+        return True
+
+    def tick(self, engine: Engine) -> None:
+        """Finish the save written, and start the next one once it is time
+
+        :param engine: engine to save, left alone while it is busy
+        """
+        self.poll()
+        if (
+            not self.isBusy()
+            and not engine.isBusy()
+            and time.perf_counter() - self.started >= self.interval
+        ):
+            self.save(engine)
+
+    def poll(self) -> bool:
+        """Finish the save written if it is done
+
+        :return: if one was finished
+        """
+        if self.future is None or not self.future.done():
+            return False
+
+        future: Future = self.future
+        self.future = None
+        try:
+            self.bytes, finished = future.result()
+        except OSError as error:
+            print(f"Unable to save the world: {error}")
+            return False
+
+        if self.log is not None:
+            self.log.compact(self.end)
+
+        self.saves += 1
+        self.seconds = finished - self.started
+        print(
+            f"Saved {self.bytes} bytes in {self.seconds:.3f} s, "
+            f"waited {1000 * self.stalled:.1f} ms for it"
+        )
+
+        return True
+
+    def close(self) -> None:
+        """Wait for the save being written"""
+        if self.future is not None:
+            self.future.exception()  # Waits
+            self.poll()
+
+        self.pool.shutdown()
+
+
+def _write(snapshot: Snapshot, filename: str) -> Tuple[int, float]:
+    """Write a snapshot, on the worker thread
+
+    :return: number of bytes written, and when it was done
+    """
+    size: int = replaceWorld(snapshot, filename)
+
+    return size, time.perf_counter()
@@ -0,0 +1,956 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# File: benchmark.py
+# Author: Irreq
+# Date: 17/10-2026
+
+"""Benchmarks for the engine. Run all of them or only some by name:
+
+    python3 benchmark.py
+    python3 benchmark.py store
+"""
+
+from __future__ import annotations
+from typing import Callable, Deque, Dict, List, Tuple, Any
+from collections import deque
+
+import gc
+import os
+import pickle
+import random
+import sys
+import time
+import tracemalloc
+
+from direction import Direction, Position, ORIGO, deltaPosition, oppositeDirection
+from node import (
+    Engine,
+    EngineMode,
+    Node,
+    DFSWithCallback,
+    DFSWithCallbackAfter,
+    isArticulationPoint,
+    bend,
+    countCollisions,
+    relativeExplorer,
+    createGrid,
+    createCorridor,
+)
+from store import NodeStore
+from articulation import ArticulationIndex
+from embedding import Embedding
+from holonomy import Holonomy
+from parallel import untangleInParallel
+from paging import PagedStore
+from worldfile import loadStore, loadWorld, openWorld, saveWorld
+from worldlog import WriteAheadLog, logName
+from autosave import Autosave
+from traversal import INFINITY
+
+
+def measure(f: Callable[[], Any], repeat: int = 1) -> float:
+    """Best wall time of f in seconds
+
+    :param f: function to time
+    :param repeat: number of runs
+    :return: seconds
+    """
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def report(name: str, **values: Any) -> None:
+    columns = "  ".join(f"{key}={value}" for key, value in values.items())
+    print(f"{name:<24} {columns}")
+
+
+def walk(node: Node) -> int:
+    """Visit every reachable Node once
+
+    :param node: start Node
+    :return: number of Nodes
+    """
+    seen = {node}
+    stack: List[Node] = [node]
+    while stack:
+        for neighbor in stack.pop().values():
+            if neighbor not in seen:
+                seen.add(neighbor)
+                stack.append(neighbor)
+
+    return len(seen)
+
+
+def benchmarkStore(sizes: List[int] = [100, 300]) -> None:
+    """Memory and throughput of the object graph against the NodeStore"""
+    backends: Dict[str, Callable[[], Node]] = {
+        "object": Node,
+        "store": lambda: NodeStore().new(),
+    }
+    for size in sizes:
+        for name, makeRoot in backends.items():
+            gc.collect()
+            tracemalloc.start()
+            root: Node = makeRoot()
+            grid = createGrid(root, size, size)
+            del grid
+            gc.collect()
+            memory, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            nodes: int = size * size
+            seconds: float = measure(lambda: walk(root))
+
+            engine = Engine(EngineMode.READ_ONLY, 10, root)
+            steps: int = size // 2
+
+            def stroll() -> None:
+                for _ in range(steps):
+                    engine.move(Direction.NORTH)
+                for _ in range(steps):
+                    engine.move(Direction.SOUTH)
+
+            strollSeconds: float = measure(stroll)
+
+            report(
+                f"store/{name}/{nodes}",
+                bytes_per_node=round(memory / nodes, 1),
+                walk_nodes_per_s=int(nodes / seconds),
+                move_ms=round(1000 * strollSeconds / (2 * steps), 3),
+            )
+
+
+def benchmarkTraversal(lengths: List[int] = [10_000, 100_000]) -> None:
+    """Iterative traversal kernels on long corridors"""
+    for length in lengths:
+        root: Node = Node()
+        createCorridor(root, length)
+
+        def pre() -> None:
+            DFSWithCallback(root, root.newEpoch(), None, lambda _: False, INFINITY)
+
+        def post() -> None:
+            DFSWithCallbackAfter(root, lambda *_: False, {})
+
+        def explore() -> None:
+            relativeExplorer(root, INFINITY, {}, ORIGO, root.newEpoch())
+
+        for name, f in (("pre", pre), ("post", post), ("explore", explore)):
+            seconds: float = measure(f, repeat=3)
+            report(
+                f"traversal/{name}/{length}",
+                nodes_per_s=int(length / seconds),
+                recursion_limit=sys.getrecursionlimit(),
+            )
+
+
+def benchmarkStep(depths: List[int] = [5, 10, 20, 40], size: int = 200) -> None:
+    """Latency of a single step, shifting the neighborhood against exploring
+    it all over again"""
+    grid = createGrid(Node(), size, size)
+    steps: int = 20
+    for depth in depths:
+        engine = Engine(EngineMode.READ_ONLY, depth, grid[(size // 2, size // 2)])
+
+        def stroll() -> None:
+            for _ in range(steps):
+                engine.move(Direction.NORTH)
+            for _ in range(steps):
+                engine.move(Direction.SOUTH)
+
+        shiftSeconds: float = measure(stroll, repeat=3)
+        updateSeconds: float = measure(engine.update, repeat=3)
+
+        report(
+            f"step/{depth}",
+            nodes=len(engine.grid),
+            shift_ms=round(1000 * shiftSeconds / (2 * steps), 3),
+            update_ms=round(1000 * updateSeconds, 3),
+        )
+
+
+def oneSided(source: Node, target: Node) -> int:
+    """Plain breadth first search for reference
+
+    :param source: start Node
+    :param target: Node to find
+    :return: number of Nodes explored
+    """
+    seen = {source}
+    frontier: Deque[Node] = deque([source])
+    while frontier:
+        node: Node = frontier.popleft()
+        if node == target:
+            break
+
+        for neighbor in node.values():
+            if neighbor not in seen:
+                seen.add(neighbor)
+                frontier.append(neighbor)
+
+    return len(seen)
+
+
+def benchmarkSearch(sizes: List[int] = [100, 300, 1000]) -> None:
+    """Shortest route from the middle of a world to a Node near by, to a far
+    corner and to a Node that cannot be reached"""
+    for size in sizes:
+        grid = createGrid(NodeStore().new(), size, size)
+        middle: int = size // 2
+        engine = Engine(EngineMode.READ_ONLY, 1, grid[(middle, middle)])
+        targets: Dict[str, Node] = {
+            "near": grid[(middle + 10, middle)],
+            "far": grid[(0, 0)],
+            "unreachable": engine.node.spawn(),
+        }
+
+        for name, target in targets.items():
+            seconds: float = measure(lambda: engine.search(target), repeat=3)
+            limited: float = measure(lambda: engine.search(target, 50), repeat=3)
+            reference: float = measure(lambda: oneSided(engine.node, target))
+            route = engine.search(target)
+            report(
+                f"search/{name}/{size * size}",
+                hops=None if route is None else len(route),
+                ms=round(1000 * seconds, 3),
+                limit_50_ms=round(1000 * limited, 3),
+                one_sided_ms=round(1000 * reference, 3),
+            )
+
+
+def benchmarkRoutes(sizes: List[int] = [100, 300]) -> None:
+    """Route home every frame, walking the route tree against searching"""
+    for size in sizes:
+        grid = createGrid(NodeStore().new(), size, size)
+        engine = Engine(EngineMode.READ_ONLY, 1, grid[(0, 0)])
+        for _ in range(size - 1):
+            engine.move(Direction.NORTH)
+
+        search: float = measure(lambda: engine.search(engine.start), repeat=3)
+        walk: float = measure(engine.routeHome, repeat=3)
+        build: float = measure(engine.routes.build)
+        report(
+            f"routes/{size * size}",
+            hops=len(engine.routeHome()),
+            search_ms=round(1000 * search, 3),
+            route_home_ms=round(1000 * walk, 3),
+            build_ms=round(1000 * build, 3),
+        )
+
+
+def benchmarkCuts(sizes: List[int] = [30, 60]) -> None:
+    """Cut vertex test for every Node, searching against the index"""
+    for size in sizes:
+        grid = createGrid(Node(), size, size)
+        nodes: List[Node] = list(grid.values())
+
+        def search() -> None:
+            for node in nodes:
+                isArticulationPoint(node)
+
+        def index() -> None:
+            cuts = ArticulationIndex()
+            cuts.build(nodes[0])
+            for node in nodes:
+                cuts.isCut(node)
+
+        report(
+            f"cuts/{len(nodes)}",
+            search_ms=round(1000 * measure(search), 3),
+            index_ms=round(1000 * measure(index, repeat=3), 3),
+        )
+
+
+def addPortals(grid: Dict[Position, Node], count: int, seed: int = 0) -> None:
+    """Rewire random pairs of Nodes in a grid to each other, like portals
+
+    :param grid: grid from createGrid
+    :param count: number of portals
+    :param seed: random seed
+    """
+    rng = random.Random(seed)
+    nodes: List[Node] = list(grid.values())
+    for _ in range(count):
+        a, b = rng.sample(nodes, 2)
+        direction: Direction = rng.choice(list(Direction))
+        opposite: Direction = oppositeDirection(direction)
+        if a[direction] is not None:
+            a.disconnect(direction, a[direction])
+        if b[opposite] is not None:
+            b.disconnect(opposite, b[opposite])
+        a.connect(direction, b)
+
+
+def benchmarkCollisions(sizes: List[int] = [32, 100, 317]) -> None:
+    """Collision count on grids with portals"""
+    for size in sizes:
+        grid = createGrid(Node(), size, size)
+        addPortals(grid, size)
+        root: Node = grid[(0, 0)]
+
+        seconds: float = measure(lambda: countCollisions(root), repeat=3)
+        report(
+            f"collisions/{size * size}",
+            collisions=countCollisions(root),
+            ms=round(1000 * seconds, 3),
+            nodes_per_s=int(size * size / seconds),
+        )
+
+
+def benchmarkBends(lengths: List[int] = [1_000, 10_000]) -> None:
+    """Trial bends of short teeth along a comb, counting the collisions again
+    against following the bends in an embedding"""
+    for length in lengths:
+        root = Node()
+        spine: List[Node] = [root]
+        for _ in range(length - 1):
+            spine.append(createCorridor(spine[-1], 2, Direction.EAST))
+
+        teeth: List[Node] = []
+        for node in spine[::10]:
+            tooth = node.spawn()
+            node.connect(Direction.NORTH, tooth)
+            createCorridor(tooth, 3, Direction.NORTH)
+            teeth.append(tooth)
+
+        cuts = ArticulationIndex()
+        cuts.build(root)
+        trials: List[Node] = teeth[:: max(1, len(teeth) // 100)]
+
+        def count() -> None:
+            for tooth in trials:
+                pivot: Node = tooth[Direction.SOUTH]
+                before: int = countCollisions(root)
+                bend(tooth, pivot, 1, cuts.isCut)
+                countCollisions(root) - before
+                bend(tooth, pivot, -1, cuts.isCut)
+
+        counted: float = measure(count)
+        embedding = Embedding(root)
+
+        def follow() -> None:
+            for tooth in trials:
+                pivot: Node = tooth[Direction.SOUTH]
+                since: int = root.getVersion()
+                bend(tooth, pivot, 1, cuts.isCut)
+                embedding.rotate(tooth, pivot, 1, since)
+                bend(tooth, pivot, -1, cuts.isCut)
+                embedding.revert()
+
+        report(
+            f"bends/{len(embedding)}",
+            count_ms=round(1000 * counted / len(trials), 3),
+            embedding_ms=round(1000 * measure(follow, repeat=3) / len(trials), 3),
+        )
+
+
+def benchmarkRotations(lengths: List[int] = [10_000, 100_000]) -> None:
+    """Repeated bends of a long tail, frames of the object graph against the
+    rows of the NodeStore that are rotated one by one"""
+    backends: Dict[str, Callable[[], Node]] = {
+        "object": Node,
+        "store": lambda: NodeStore().new(),
+    }
+    for length in lengths:
+        for name, makeRoot in backends.items():
+            root: Node = makeRoot()
+            pivot: Node = createCorridor(root, 2, Direction.EAST)
+            tail: Node = pivot.spawn()
+            pivot.connect(Direction.NORTH, tail)
+            createCorridor(tail, length, Direction.NORTH)
+            cuts = ArticulationIndex()
+            cuts.build(root)
+
+            first: float = measure(lambda: bend(tail, pivot, 1, cuts.isCut))
+
+            def wheel() -> None:
+                for rotation in [-1, -1, 1, 1] * 5:
+                    bend(tail, pivot, rotation, cuts.isCut)
+
+            report(
+                f"rotations/{name}/{length}",
+                first_bend_ms=round(1000 * first, 3),
+                bend_ms=round(1000 * measure(wheel, repeat=3) / 20, 3),
+            )
+
+
+def benchmarkMaintenance(sizes: List[int] = [32, 100], budget: float = 0.008) -> None:
+    """Untangling grids with portals at once against a slice per frame, the
+    longest slice is what a frame has to wait for"""
+    for size in sizes:
+        engines: List[Engine] = []
+        for _ in range(2):
+            grid = createGrid(Node(), size, size)
+            addPortals(grid, size)
+            engines.append(Engine(EngineMode.LIMINAL, 5, grid[(0, 0)]))
+
+        start: float = time.perf_counter()
+        engines[0].untangle()
+        total: float = time.perf_counter() - start
+
+        engine: Engine = engines[1]
+        engine.maintain(engine.untangling())
+        slices: List[float] = []
+        while engine.isBusy():
+            start = time.perf_counter()
+            engine.work(budget)
+            slices.append(time.perf_counter() - start)
+
+        report(
+            f"maintenance/{size * size}",
+            collisions=countCollisions(engine.node),
+            at_once_ms=round(1000 * total, 3),
+            frames=len(slices),
+            longest_slice_ms=round(1000 * max(slices), 3),
+        )
+
+
+def createTangle(count: int, bends: int, seed: int = 0) -> Node:
+    """Grow a tree of corridors that fits in 2D, then tangle it by bending
+    random Nodes among the first ones reached from the root
+
+    :param count: number of Nodes
+    :param bends: number of bends
+    :param seed: random seed
+    :return: root
+    """
+    rng = random.Random(seed)
+    root: Node = Node()
+    place: Dict[Position, Node] = {ORIGO: root}
+    grown: List[Tuple[Position, Node]] = [(ORIGO, root)]
+    while len(place) < count:
+        position, node = rng.choice(grown)
+        direction: Direction = rng.choice(list(Direction))
+        for _ in range(rng.randint(1, 8)):
+            new: Position = deltaPosition(direction, position)
+            if node[direction] is not None or any(
+                deltaPosition(other, new) in place
+                for other in Direction
+                if other != oppositeDirection(direction)
+            ):
+                break
+
+            other: Node = Node()
+            node.connect(direction, other)
+            place[new] = other
+            grown.append((new, other))
+            position, node = new, other
+
+    parent: Dict[Node, Node] = {}
+    order: List[Node] = [root]
+    for node in order:
+        for neighbor in node.values():
+            if neighbor not in parent and neighbor != root:
+                parent[neighbor] = node
+                order.append(neighbor)
+
+    cuts = ArticulationIndex()
+    cuts.build(root)
+    top: List[Node] = order[1 : count // 50]
+    for _ in range(bends):
+        node = rng.choice(top)
+        bend(node, parent[node], rng.choice([-1, 1, 2]), cuts.isCut)
+
+    return root
+
+
+def benchmarkSolver(
+    sizes: List[int] = [5_000, 50_000], budget: float = 10.0, greedy: int = 5_000
+) -> None:
+    """Annealing on tangled trees against greedy untangling, for the smaller
+    ones"""
+    for size in sizes:
+        root: Node = createTangle(size, size // 100)
+        collisions: int = countCollisions(root)
+        engine = Engine(EngineMode.LIMINAL, 3, root)
+
+        if size <= greedy:
+            seconds: float = measure(engine.untangle)
+            report(
+                f"solver/greedy/{size}",
+                collisions=collisions,
+                left=countCollisions(root),
+                s=round(seconds, 3),
+            )
+            engine.undo()
+
+        start: float = time.perf_counter()
+        annealer = engine.solve(budget, seed=1)
+        seconds = time.perf_counter() - start
+        assert annealer is not None
+
+        every: int = max(1, len(annealer.history) // 5)
+        report(
+            f"solver/anneal/{size}",
+            collisions=collisions,
+            left=countCollisions(root),
+            s=round(seconds, 3),
+            moves=annealer.moves,
+            history=[(round(t, 2), n) for t, n in annealer.history[::every]],
+        )
+
+
+def benchmarkParallel(sizes: List[int] = [1_000, 3_000]) -> None:
+    """Untangling tangled trees greedily against scoring every bend in worker
+    processes, with the cost of the snapshot handed to them"""
+    for size in sizes:
+        root: Node = createTangle(size, size // 100)
+        collisions: int = countCollisions(root)
+        engine = Engine(EngineMode.LIMINAL, 3, root)
+
+        seconds: float = measure(engine.untangle)
+        report(
+            f"parallel/greedy/{size}",
+            collisions=collisions,
+            left=countCollisions(root),
+            s=round(seconds, 3),
+        )
+        engine.undo()
+
+        store, _ = NodeStore.fromGraph(root)
+        snapshot: float = measure(lambda: NodeStore.fromGraph(root))
+        for workers in sorted({1, os.cpu_count() or 1}):
+            seconds = measure(lambda: untangleInParallel(engine, workers))
+            report(
+                f"parallel/{workers}/{size}",
+                collisions=collisions,
+                left=countCollisions(root),
+                s=round(seconds, 3),
+                snapshot_ms=round(1000 * snapshot, 3),
+                snapshot_kb=len(pickle.dumps(store)) // 1024,
+            )
+            engine.undo()
+
+
+def benchmarkHolonomy(sizes: List[int] = [32, 100, 317]) -> None:
+    """Analysing the cycles of grids with portals, and untangling them once
+    the analysis is there to explain what is left"""
+    for size in sizes:
+        grid = createGrid(Node(), size, size)
+        addPortals(grid, size)
+        root: Node = grid[(0, 0)]
+        cuts = ArticulationIndex()
+        cuts.build(root)
+
+        holonomy = Holonomy()
+        seconds: float = measure(lambda: holonomy.build(root, cuts), repeat=3)
+        report(
+            f"holonomy/{size * size}",
+            cycles=len(holonomy.cycles),
+            twisted=len(holonomy.twisted),
+            permanent=holonomy.permanent,
+            ms=round(1000 * seconds, 3),
+            nodes_per_s=int(size * size / seconds),
+        )
+
+        engine = Engine(EngineMode.LIMINAL, 3, root)
+        collisions: int = countCollisions(root)
+        seconds = measure(engine.untangle)
+        report(
+            f"holonomy/untangle/{size * size}",
+            collisions=collisions,
+            left=countCollisions(root),
+            s=round(seconds, 3),
+        )
+
+
+def benchmarkWorldFile(sizes: List[int] = [100, 317, 1000]) -> None:
+    """Saving and loading grids in the world format against pickling them,
+    both from Node objects and from a NodeStore"""
+    path: str = f"benchmark-{os.getpid()}.world"
+    try:
+        for size in sizes:
+            grid = createGrid(Node(), size, size)
+            engine = Engine(EngineMode.LIMINAL, 3, grid[(0, 0)])
+            for backend in ["node", "store"]:
+                written: int = saveWorld(engine, path)
+                save: float = measure(lambda: saveWorld(engine, path))
+                read: float = measure(lambda: loadStore(path))
+                load: float = measure(lambda: loadWorld(path))
+
+                try:
+                    data: bytes = pickle.dumps(engine)
+                    pickled: str = str(len(data) // 1024)
+                    pickleSave: str = f"{measure(lambda: pickle.dumps(engine)):.3f}"
+                    pickleLoad: str = f"{measure(lambda: pickle.loads(data)):.3f}"
+                except RecursionError:
+                    pickled = pickleSave = pickleLoad = "RecursionError"
+
+                report(
+                    f"worldfile/{backend}/{size * size}",
+                    kb=written // 1024,
+                    save_s=round(save, 3),
+                    read_s=round(read, 3),
+                    load_s=round(load, 3),
+                    pickle_kb=pickled,
+                    pickle_save_s=pickleSave,
+                    pickle_load_s=pickleLoad,
+                )
+
+                engine = loadWorld(path)  # Backed by a NodeStore from now on
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def residentKb() -> int | None:
+    """Resident memory of this process right now, where the system tells
+
+    :return: kilobytes. None if unknown
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return None
+
+
+def benchmarkMapped(sizes: List[int] = [317, 1000, 2000], steps: int = 100) -> None:
+    """Opening saved grids in place against loading them, and the memory it
+    takes to walk a while in them"""
+    path: str = f"benchmark-{os.getpid()}.world"
+    try:
+        for size in sizes:
+            grid = createGrid(NodeStore().new(), size, size)
+            engine = Engine(EngineMode.NORMAL, 10, grid[(size // 2, size // 2)])
+            written: int = saveWorld(engine, path)
+            del grid, engine
+            gc.collect()
+
+            before: int | None = residentKb()
+            start: float = time.perf_counter()
+            mapped: Engine = openWorld(path)
+            opened: float = time.perf_counter() - start
+            after: int | None = residentKb()
+
+            start = time.perf_counter()
+            for _ in range(steps):
+                mapped.move(Direction.EAST)
+            walked: float = time.perf_counter() - start
+            end: int | None = residentKb()
+
+            mapped.node._store.close()
+            del mapped
+            gc.collect()
+
+            load: float = measure(lambda: loadWorld(path)) if size <= 1000 else None
+            report(
+                f"mapped/{size * size}",
+                kb=written // 1024,
+                open_ms=round(1000 * opened, 3),
+                load_s=load and round(load, 3),
+                step_ms=round(1000 * walked / steps, 3),
+                rss_open_kb=before and after - before,
+                rss_walk_kb=after and end - after,
+            )
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def benchmarkPaging(
+    budgets: List[int] = [1_000, 10_000], steps: int = 50_000
+) -> None:
+    """A long walk that keeps making new Nodes, all of them kept in memory
+    as objects or in a NodeStore, against paged out beyond a budget. Then back
+    home over old ground."""
+    for budget in [None, 0] + budgets:
+        gc.collect()
+        tracemalloc.start()
+        if budget is None:  # Node objects
+            store: NodeStore | None = None
+            engine = Engine(EngineMode.LIMINAL, 10)
+        else:
+            store = PagedStore(budget) if budget else NodeStore()
+            engine = Engine(EngineMode.LIMINAL, 10, store.new())
+        rng = random.Random(0)
+
+        start: float = time.perf_counter()
+        for _ in range(steps):
+            # Mostly onwards, so it keeps breaking new ground
+            engine.move(rng.choice([Direction.EAST] * 3 + list(Direction)))
+        seconds: float = time.perf_counter() - start
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        nodes: int = walk(engine.start)
+
+        start = time.perf_counter()
+        route: List[Node] = engine.routeHome() or []
+        for node in reversed(route):
+            engine.move(engine.node.directionTo(node))
+        back: float = time.perf_counter() - start
+
+        values: Dict[str, Any] = {
+            "nodes": nodes,
+            "kb": memory // 1024,
+            "step_ms": round(1000 * seconds / steps, 3),
+            "home_ms": round(1000 * back / max(1, len(route)), 3),
+        }
+        if isinstance(store, PagedStore):
+            values.update(
+                resident=store.resident(),
+                hits=store.hits,
+                misses=store.misses,
+                evictions=store.evictions,
+            )
+            store.close()
+
+        name: str = {None: "objects", 0: "store"}.get(budget, str(budget))
+        report(f"paging/{name}", **values)
+        del engine, store
+
+
+def benchmarkWorldLog(sizes: List[int] = [100, 317, 1000], steps: int = 100) -> None:
+    """Saving a few changes to grids through a log against saving them whole,
+    and loading them back, in memory and paged like in the game"""
+    path: str = f"benchmark-{os.getpid()}.world"
+    try:
+        for size in sizes:
+            for backend in ["store", "paged"]:
+                store: NodeStore = NodeStore() if backend == "store" else PagedStore()
+                grid = createGrid(store.new(), size, size)
+                engine = Engine(EngineMode.LIMINAL, 10, grid[(size // 2, size // 2)])
+                del grid
+                written: int = saveWorld(engine, path)
+                save: float = measure(lambda: saveWorld(engine, path))
+
+                log = WriteAheadLog.create(engine, path, interval=INFINITY)
+                rng = random.Random(0)
+                committing: float = 0.0
+                for _ in range(steps):
+                    engine.move(rng.choice(list(Direction)))
+                    engine.node.setData({"visited": True})
+                    if engine.previous.directionTo(engine.node) is not None:
+                        engine.insert()
+
+                    start: float = time.perf_counter()
+                    log.commit(engine)
+                    committing += time.perf_counter() - start
+
+                start = time.perf_counter()
+                log.flush()
+                flushed: float = time.perf_counter() - start
+
+                logged: int = log.written
+                resume: float = measure(lambda: WriteAheadLog.resume(path)[1].close())
+                checkpoint: float = measure(lambda: log.checkpoint(engine))
+                log.close()
+
+                report(
+                    f"worldlog/{backend}/{size * size}",
+                    kb=written // 1024,
+                    save_ms=round(1000 * save, 3),
+                    commit_us=round(1e6 * committing / steps, 1),
+                    flush_ms=round(1000 * flushed, 3),
+                    log_kb=round(logged / 1024, 1),
+                    resume_s=round(resume, 3),
+                    checkpoint_ms=round(1000 * checkpoint, 3),
+                )
+                if isinstance(store, PagedStore):
+                    store.close()
+
+                del engine, log, store
+    finally:
+        for name in [path, logName(path)]:
+            if os.path.exists(name):
+                os.remove(name)
+
+
+def benchmarkAutosave(sizes: List[int] = [317, 1000]) -> None:
+    """Saving grids in the background while the grid of the engine is made
+    again and again, like every frame, against saving them while it waits"""
+    path: str = f"benchmark-{os.getpid()}.world"
+    try:
+        for size in sizes:
+            for backend in ["store", "paged"]:
+                store: NodeStore = NodeStore() if backend == "store" else PagedStore()
+                grid = createGrid(store.new(), size, size)
+                engine = Engine(EngineMode.NORMAL, 10, grid[(size // 2, size // 2)])
+                del grid
+                blocking: float = measure(lambda: saveWorld(engine, path))
+
+                update: float = measure(engine.update, 10)
+
+                autosave = Autosave(path, INFINITY)
+                steps: List[float] = []
+                autosave.save(engine)
+                while autosave.isBusy():
+                    start: float = time.perf_counter()
+                    engine.update()
+                    autosave.poll()
+                    steps.append(time.perf_counter() - start)
+
+                autosave.close()
+                report(
+                    f"autosave/{backend}/{size * size}",
+                    kb=autosave.bytes // 1024,
+                    blocking_ms=round(1000 * blocking, 1),
+                    stalled_ms=round(1000 * autosave.stalled, 1),
+                    background_ms=round(1000 * autosave.seconds, 1),
+                    frames=len(steps),
+                    idle_frame_ms=round(1000 * update, 3),
+                    frame_ms=round(1000 * sum(steps) / len(steps), 3),
+                    worst_frame_ms=round(1000 * max(steps), 3),
+                )
+                if isinstance(store, PagedStore):
+                    store.close()
+
+                del engine, store
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def benchmarkFirstFrame(sizes: List[int] = [100, 317, 1000, 2000]) -> None:
+    """Time until the first frame of a saved grid, loading it whole against
+    opening it paged, with the rows laid out around the cursor or not"""
+    path: str = f"benchmark-{os.getpid()}.world"
+    try:
+        for size in sizes:
+            store = NodeStore()
+            grid = createGrid(store.new(), size, size)
+            engine = Engine(EngineMode.NORMAL, 10, grid[(size // 2, size // 2)])
+            del grid
+            for ordered in [False, True]:
+                saveWorld(engine, path, ordered)
+                load: float = measure(lambda: loadWorld(path))
+
+                start: float = time.perf_counter()
+                paged, log = WriteAheadLog.resume(path, 100_000)
+                opened: float = time.perf_counter() - start
+                pages: int = len(paged.node._store.pages)
+                log.close()
+                paged.node._store.close()
+
+                report(
+                    f"firstframe/{'bfs' if ordered else 'rows'}/{size * size}",
+                    load_ms=round(1000 * load, 3),
+                    paged_ms=round(1000 * opened, 3),
+                    pages=pages,
+                )
+
+            del engine, store
+    finally:
+        for name in [path, logName(path)]:
+            if os.path.exists(name):
+                os.remove(name)
+
+
+def pathLines(
+    node: Node, parent: Node, n: int, position: Position, visited: List[Node]
+) -> int:
+    """The old renderer for reference, enumerating every simple path up to n
+    steps and drawing a line for each, minus the drawing
+
+    :param node: Node to draw
+    :param parent: Node drawn before it
+    :param n: steps left
+    :param position: position of node
+    :param visited: Nodes on the path to node
+    :return: number of lines drawn
+    """
+    if n < 0:
+        return 0
+
+    lines: int = 0
+    for direction, neighbor in node.items():
+        if neighbor not in visited:
+            lines += pathLines(
+                neighbor,
+                node,
+                n - 1,
+                deltaPosition(direction, position),
+                [node] + visited,
+            )
+
+    return lines + (node != parent)
+
+
+def gridLines(engine: Engine) -> int:
+    """The renderer drawing from the grid, minus the drawing
+
+    :param engine: engine to draw
+    :return: number of lines drawn
+    """
+    places: Dict[Position, Position] = {}
+    lines: int = 0
+    for _, position, _, other in engine.iterLinks():
+        for place in (position, other):
+            if place not in places:
+                places[place] = (place[0] * 50, -place[1] * 50)
+        lines += 1
+
+    for priority in sorted(engine.world):
+        for position, node in engine.world[priority]:
+            node.isLocked()
+            node.getData()
+
+    return lines
+
+
+def benchmarkRender(
+    depths: List[int] = [2, 4, 6, 8, 10, 12, 16, 20], size: int = 40
+) -> None:
+    """Frame time against depth on a filled grid, enumerating paths like the old
+    renderer against drawing every link of the grid once. Paths are left out
+    once a frame takes more than a second"""
+    grid = createGrid(Node(), size, size)
+    slow: bool = False
+    for depth in depths:
+        engine = Engine(EngineMode.READ_ONLY, depth, grid[(size // 2, size // 2)])
+        node: Node = engine.getNode()
+
+        pathSeconds: float | None = None
+        paths: int | None = None
+        if not slow:
+            pathSeconds = measure(lambda: pathLines(node, node, depth, ORIGO, []))
+            paths = pathLines(node, node, depth, ORIGO, [])
+            slow = pathSeconds > 1.0
+
+        gridSeconds: float = measure(lambda: gridLines(engine), repeat=5)
+        updateSeconds: float = measure(engine.update, repeat=5)
+
+        report(
+            f"render/{depth}",
+            nodes=len(engine.grid),
+            lines=gridLines(engine),
+            path_lines=paths,
+            paths_ms=None if pathSeconds is None else round(1000 * pathSeconds, 3),
+            grid_ms=round(1000 * gridSeconds, 3),
+            update_ms=round(1000 * updateSeconds, 3),
+        )
+
+
+BENCHMARKS: Dict[str, Callable[[], None]] = {
+    "store": benchmarkStore,
+    "traversal": benchmarkTraversal,
+    "step": benchmarkStep,
+    "search": benchmarkSearch,
+    "routes": benchmarkRoutes,
+    "cuts": benchmarkCuts,
+    "collisions": benchmarkCollisions,
+    "bends": benchmarkBends,
+    "rotations": benchmarkRotations,
+    "maintenance": benchmarkMaintenance,
+    "solver": benchmarkSolver,
+    "parallel": benchmarkParallel,
+    "holonomy": benchmarkHolonomy,
+    "worldfile": benchmarkWorldFile,
+    "mapped": benchmarkMapped,
+    "paging": benchmarkPaging,
+    "worldlog": benchmarkWorldLog,
+    "autosave": benchmarkAutosave,
+    "firstframe": benchmarkFirstFrame,
+    "render": benchmarkRender,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -131,6 +131,20 @@ oppositeDirection: Callable[..., Direction] = lambda direction: OPPOSITE_DIRECTI
 ]
 
 
+def distance(position: Position) -> int:
+    """Fewest steps needed to reach a Position from ORIGO
+
+    :param position: Position
+    :return: number of steps
+    """
+    x, y = position
+
+    if DIAGONAL:
+        return max(abs(x), abs(y))
+
+    return abs(x) + abs(y)
+
+
 def deltaPosition(direction: Direction, position: Position) -> Position:
     """Compute a new Position based on a Direction
 
@@ -145,3 +159,25 @@ def deltaPosition(direction: Direction, position: Position) -> Position:
     dx, dy = MOVEMENT_MAP[direction]
 
     return (x + dx, y + dy)
+
+
+def rotatePosition(
+    position: Position, rotation: Rotation, center: Position = ORIGO
+) -> Position:
+    """Turn a Position around a center the same way Node.rotate turns the
+    Directions of a Node, clockwise for a positive rotation
+
+    :param position: Position to turn
+    :param rotation: number of quarter turns
+    :param center: Position to turn around
+    :return: turned Position
+    """
+    assert not DIAGONAL, "Positions can only be turned in quarter turns"
+
+    cx, cy = center
+    x, y = position[0] - cx, position[1] - cy
+
+    for _ in range(rotation % 4):
+        x, y = y, -x
+
+    return (cx + x, cy + y)
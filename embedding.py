@@ -0,0 +1,291 @@
+# Static analysis
+from __future__ import annotations
+from typing import Dict, Generator, List, Set, Tuple, TYPE_CHECKING
+
+from direction import (
+    DIAGONAL,
+    ORIGO,
+    Position,
+    Rotation,
+    deltaPosition,
+    rotatePosition,
+)
+from traversal import breadthFirst
+
+if TYPE_CHECKING:
+    from node import Node
+
+
+# (Node, Position it was on, Position it is on now)
+Move = Tuple["Node", Position, Position]
+
+# What a rotate did: (number, moves, turned Nodes, state from before a rebuild)
+Change = Tuple[int, List[Move], List[Move], Tuple | None]
+
+
+class Embedding:
+    """The network laid out in 2D, with a count of how many Positions are
+    taken more than once
+
+    Every Node reachable from the root is laid out by a breadth first spanning
+    tree. Every edge also puts the Node it leads to one step from where the
+    Node it comes from is, so an edge that disagrees with the tree puts its
+    Node on one more Position. A collision is a Position taken more than once,
+    see countCollisions.
+
+    A bend only turns the Nodes behind the bent Node around it, so rotate
+    follows a bend by moving just those Nodes and tells how the collisions
+    changed. If the bend is rejected and undone, revert restores the layout
+    just as cheaply, latest rotate first. Edges are expected to link back,
+    like everywhere in the engine.
+
+    Usage:
+
+    >>> embedding = Embedding(engine.node)
+    >>> since = engine.node.getVersion()
+    >>> if bend(node, pivot, 1):
+    ...     if embedding.rotate(node, pivot, 1, since) > 0:
+    ...         bend(node, pivot, -1)
+    ...         embedding.revert()
+
+    :param root: Node laid out at ORIGO
+    :param build: lay out right away, otherwise see building
+    :param place: Position of every Node in the spanning tree
+    :param sources: for every Node, the Positions it is put on and by how many
+        edges (the spanning tree counting as one)
+    :param taken: number of Nodes on every Position
+    :param collisions: number of Nodes on a Position already taken
+    :param version: layout version the embedding is valid for, see
+        ``Node.getVersion``
+    :param history: the latest rotates, to revert
+    :param changes: number of the latest rotate
+    """
+
+    limit: int = 1000  # Number of rotates that can be reverted
+
+    def __init__(self, root: Node, build: bool = True):
+        self.root: Node = root
+        self.version: int | None = None
+        if build:
+            self.build()
+
+    def __contains__(self, node: Node) -> bool:
+        return node in self.place
+
+    def __len__(self) -> int:
+        return len(self.place)
+
+    def build(self) -> None:
+        """Lay out the whole network from scratch, in O(V+E)"""
+        for _ in self.building():
+            pass
+
+    def building(self) -> Generator[None, None, None]:
+        """Lay out the whole network from scratch, one ring or Node per step.
+        The embedding is only valid once done.
+        """
+        self.version = None
+
+        self.place: Dict[Node, Position] = {self.root: ORIGO}
+        for _ in breadthFirst([(ORIGO, self.root)], self.place):
+            yield
+
+        self.sources: Dict[Node, Dict[Position, int]] = {}
+        for node, position in self.place.items():
+            self.sources[node] = {position: 1}
+            yield
+
+        self.taken: Dict[Position, int] = {}
+        self.collisions: int = 0
+
+        for node, position in self.place.items():
+            for direction, neighbor in node.items():
+                self._add(neighbor, deltaPosition(direction, position))
+            yield
+
+        for node, positions in self.sources.items():
+            for position in positions:
+                self._take(position)
+            yield
+
+        self.version = self.root.getVersion()
+
+        self.history: List[Change] = []
+        self.changes: int = 0
+
+    def _take(self, position: Position) -> None:
+        count: int = self.taken.get(position, 0)
+        if count:
+            self.collisions += 1
+
+        self.taken[position] = count + 1
+
+    def _leave(self, position: Position) -> None:
+        count: int = self.taken[position] - 1
+        if count:
+            self.collisions -= 1
+            self.taken[position] = count
+        else:
+            del self.taken[position]
+
+    def _add(self, node: Node, position: Position) -> bool:
+        """One more edge puts node on position
+
+        :return: if node was not there before
+        """
+        positions: Dict[Position, int] = self.sources[node]
+        count: int = positions.get(position, 0)
+        positions[position] = count + 1
+
+        return count == 0
+
+    def _remove(self, node: Node, position: Position) -> bool:
+        """One edge less puts node on position
+
+        :return: if node is not there anymore
+        """
+        positions: Dict[Position, int] = self.sources[node]
+        count: int = positions[position] - 1
+        if count:
+            positions[position] = count
+            return False
+
+        del positions[position]
+        return True
+
+    def _move(self, moves: List[Move]) -> None:
+        for node, old, _ in moves:
+            if self._remove(node, old):
+                self._leave(old)
+
+        for node, _, new in moves:
+            if self._add(node, new):
+                self._take(new)
+
+    def _behind(self, node: Node, pivot: Node) -> List[Node] | None:
+        """Nodes reached from node without passing pivot, as long as they
+        only hang on to the rest of the network through node and form a tree.
+        A cycle among them would let the spanning tree change with the order
+        the turned Nodes give their neighbors in.
+
+        :return: Nodes behind node, node included. None if they do not hang
+            from node alone, close a cycle or are not laid out
+        """
+        if node not in self.place:
+            return None
+
+        behind: Set[Node] = {node}
+        stack: List[Node] = [node]
+        edges: int = 0  # Counted from both ends
+        while stack:
+            other: Node = stack.pop()
+            for neighbor in other.values():
+                if neighbor == pivot:
+                    if other != node:  # Another way around node
+                        return None
+                    continue
+
+                edges += 1
+                if neighbor not in behind:
+                    if neighbor == self.root:  # The root would turn too
+                        return None
+
+                    behind.add(neighbor)
+                    stack.append(neighbor)
+
+        if edges // 2 >= len(behind):  # A cycle
+            return None
+
+        return list(behind)
+
+    def rotate(self, node: Node, pivot: Node, rotation: Rotation, since: int) -> int:
+        """Follow a bend of node around pivot, see bend. The Nodes behind node
+        turn around it, in O(|subtree|). The network is laid out again if they
+        do not hang from node alone, close a cycle or the embedding was not up
+        to date.
+
+        :param node: Node that was bent
+        :param pivot: Node it was bent around
+        :param rotation: rotation of the bend
+        :param since: layout version from before the bend
+        :return: change in collisions
+        """
+        collisions: int = self.collisions
+
+        behind: List[Node] | None = None
+        if since == self.version and not DIAGONAL:
+            behind = self._behind(node, pivot)
+
+        if behind is None:
+            previous = (
+                self.place,
+                self.sources,
+                self.taken,
+                self.collisions,
+                since == self.version,  # If it can be used again
+            )
+            history: List[Change] = self.history
+            changes: int = self.changes
+
+            self.build()
+            self.history, self.changes = history, changes
+            self._push([], [], previous)
+
+            return self.collisions - collisions
+
+        center: Position = self.place[node]
+
+        # The graph is already bent, so every Position is found from the new
+        # Directions and turned back to where it was
+        moves: List[Move] = []
+        turned: List[Move] = []
+        for other in behind:
+            if other == node:
+                position: Position = center
+            else:
+                position = rotatePosition(self.place[other], rotation, center)
+                turned.append((other, self.place[other], position))
+                self.place[other] = position
+
+            for direction, neighbor in other.items():
+                if neighbor == pivot:  # Stays where it is
+                    continue
+
+                new: Position = deltaPosition(direction, position)
+                moves.append((neighbor, rotatePosition(new, -rotation, center), new))
+
+        self._move(moves + turned)
+        self.version = node.getVersion()
+        self._push(moves, turned, None)
+
+        return self.collisions - collisions
+
+    def _push(self, moves: List[Move], turned: List[Move], previous: Tuple | None):
+        self.changes += 1
+        self.history.append((self.changes, moves, turned, previous))
+        if len(self.history) > self.limit:
+            del self.history[: self.limit // 2]
+
+    def revert(self, change: int | None = None) -> None:
+        """Undo the latest rotate, after the bend itself was undone. If it is
+        not the expected one, or was forgotten, the embedding is left to be
+        laid out again.
+
+        :param change: number of the rotate to undo, see changes
+        """
+        if not self.history or change not in (None, self.history[-1][0]):
+            self.version = None
+            self.history.clear()
+            return
+
+        _, moves, turned, previous = self.history.pop()
+        if previous is not None:
+            self.place, self.sources, self.taken, self.collisions, valid = previous
+            self.version = self.root.getVersion() if valid else None
+            return
+
+        self._move([(node, new, old) for node, old, new in moves + turned])
+        for node, old, _ in turned:
+            self.place[node] = old
+
+        self.version = self.root.getVersion()
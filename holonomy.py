@@ -0,0 +1,187 @@
+# Static analysis
+from __future__ import annotations
+from typing import Dict, Generator, List, Set, Tuple, TYPE_CHECKING
+
+from direction import (
+    ALL_DIRECTIONS,
+    ORIGO,
+    Direction,
+    Position,
+    Rotation,
+    deltaPosition,
+    oppositeDirection,
+)
+
+if TYPE_CHECKING:
+    from articulation import ArticulationIndex
+    from node import Node
+
+
+# (Node, neighbor closing the cycle, turn around it, shift around it)
+Cycle = Tuple["Node", "Node", Rotation, Position]
+
+
+class Holonomy:
+    """What walking around every cycle of a network does to the walker, and
+    what it means for flattening it
+
+    A breadth first spanning tree lays out the network like the embedding
+    does. Every edge outside the tree closes one cycle, and walking around it
+    turns the walker (the edges that do not link back the opposite way add up)
+    and shifts them (the edge does not lead to where the tree put its Node).
+    A portal, or a room bigger on the inside, is a cycle that turns or shifts.
+    This is all found in O(V+E).
+
+    A bend around a neighbor in another block (see ArticulationIndex) turns
+    every block beyond it as a whole, and what their cycles do stays the same.
+    A block without such cycles has exactly one layout, so as long as only
+    such bends are made, its Nodes that end up on the same Position always
+    will. Bending a Node around a neighbor in the same block twists the
+    cycles through both, after which they may fit some other way, so these
+    collisions are no bound for the bends the engine makes. The analysis is
+    only valid for the layout it was made for.
+
+    Usage:
+
+    >>> holonomy = Holonomy()
+    >>> holonomy.build(node, cuts)
+    >>> holonomy.permanent  # Collisions no bend across blocks can remove
+    >>> holonomy.cycles  # The portals
+
+    :param cycles: every cycle that turns or shifts, once per closing edge
+    :param twisted: blocks with such cycles
+    :param permanent: collisions within the other blocks, a lower bound for
+        the collisions of any layout reached by bends across blocks only
+    :param version: layout version the analysis is valid for, see
+        ``Node.getVersion``
+    """
+
+    def __init__(self):
+        self.root: Node | None = None
+        self.cycles: List[Cycle] = []
+        self.twisted: Set[int] = set()
+        self.permanent: int = 0
+        self.version: int | None = None
+
+    def isValid(self, root: Node) -> bool:
+        """Checks if the analysis holds for a network laid out from root
+
+        :param root: Node the layout starts from
+        :return: if up to date
+        """
+        return self.root == root and self.version == root.getVersion()
+
+    def build(self, root: Node, cuts: ArticulationIndex) -> None:
+        """Analyse the network root lives in
+
+        :param root: Node the layout starts from
+        :param cuts: up to date index of the network
+        """
+        for _ in self.building(root, cuts):
+            pass
+
+    def building(
+        self, root: Node, cuts: ArticulationIndex
+    ) -> Generator[None, None, None]:
+        """Analyse the network root lives in, one Node per step. The analysis
+        is only replaced once done.
+
+        :param root: Node the layout starts from
+        :param cuts: up to date index of the network
+        """
+        place: Dict[Node, Position] = {root: ORIGO}
+        turn: Dict[Node, Rotation] = {root: 0}  # Along the tree
+        order: List[Node] = [root]
+        for node in order:
+            for direction, neighbor in node.items():
+                if neighbor not in place:
+                    place[neighbor] = deltaPosition(direction, place[node])
+                    turn[neighbor] = (
+                        turn[node] + _twist(node, direction, neighbor)
+                    ) % ALL_DIRECTIONS
+                    order.append(neighbor)
+            yield
+
+        cycles: List[Cycle] = []
+        twisted: Set[int] = set()
+        closed: Set[Tuple[Node, Node]] = set()
+        for node in order:
+            for direction, neighbor in node.items():
+                position: Position = deltaPosition(direction, place[node])
+                if position == place[neighbor] or (neighbor, node) in closed:
+                    continue  # Any turn on the way shows where a tree edge shifts
+
+                shift: Position = _subtract(position, place[neighbor])
+                rotation: Rotation = (
+                    turn[node] + _twist(node, direction, neighbor) - turn[neighbor]
+                ) % ALL_DIRECTIONS
+
+                closed.add((node, neighbor))
+                cycles.append((node, neighbor, rotation, shift))
+                twisted.add(cuts.blockOf(node, neighbor))
+            yield
+
+        # Nodes of every other block on the same Position
+        taken: Dict[Tuple[int, Position], int] = {}
+        for block, top in enumerate(cuts.tops):
+            if block not in twisted and top in place:
+                taken[(block, place[top])] = taken.get((block, place[top]), 0) + 1
+
+        for node in order:
+            block: int | None = cuts.owner.get(node)
+            if block is not None and block not in twisted:
+                taken[(block, place[node])] = taken.get((block, place[node]), 0) + 1
+            yield
+
+        self.root = root
+        self.cycles = cycles
+        self.twisted = twisted
+        self.permanent = sum(count - 1 for count in taken.values())
+        self.version = root.getVersion()
+
+    def explain(self, limit: int = 3) -> str:
+        """Describe why the network cannot be flattened, if it is known
+
+        :param limit: most cycles to name
+        :return: description
+        """
+        lines: List[str] = []
+        if self.permanent:
+            lines.append(
+                f"{self.permanent} collisions are within rooms that only fit "
+                "one way, unless bent inside"
+            )
+
+        if self.cycles:
+            lines.append(
+                f"{len(self.cycles)} cycles do not close, "
+                f"in {len(self.twisted)} rooms:"
+            )
+            for node, neighbor, rotation, shift in self.cycles[:limit]:
+                lines.append(
+                    f"  Node {node.getId()} -> Node {neighbor.getId()} "
+                    f"turns {rotation} and shifts {shift}"
+                )
+
+            if len(self.cycles) > limit:
+                lines.append(f"  and {len(self.cycles) - limit} more")
+
+        return "\n".join(lines)
+
+
+def _twist(node: Node, direction: Direction, neighbor: Node) -> Rotation:
+    """How far the edge back from neighbor is turned from the opposite of
+    direction. Edges that do not link back are not turned.
+    """
+    if neighbor[oppositeDirection(direction)] == node:
+        return 0
+
+    back: Direction | None = neighbor.directionTo(node)
+    if back is None:
+        return 0
+
+    return (back.value - oppositeDirection(direction).value) % ALL_DIRECTIONS
+
+
+def _subtract(a: Position, b: Position) -> Position:
+    return (a[0] - b[0], a[1] - b[1])
@@ -0,0 +1,180 @@
+# Static analysis
+from __future__ import annotations
+from typing import Any, Callable, List, Tuple
+
+# How to undo one change, called as undo(*args)
+Entry = Tuple[Callable[..., Any], Tuple]
+
+
+class Journal:
+    """Log of the changes made to a network, so they can be taken back
+
+    While a journal is active, every change to a Node records how to undo it:
+    setting a neighbor (which is what connect and disconnect do), rotating,
+    swapping, setting data and locking. Rolling back to a savepoint undoes the
+    changes since then, latest first, in O(changes).
+
+    Changes are grouped in steps, one per operation, for undo and redo. A step
+    is only kept if it changed anything, and making a new step forgets what
+    could be redone.
+
+    Usage:
+
+    >>> journal = Journal()
+    >>> with journal:  # One step
+    ...     savepoint = journal.savepoint()
+    ...     node.connect(Direction.NORTH, other)
+    ...     journal.rollback(savepoint)  # Never mind
+    >>> journal.undo()
+
+    :param limit: number of steps to keep
+    :param entries: how to undo every recorded change, oldest first
+    :param steps: where every step starts in entries
+    :param redos: steps that were undone, latest last
+    """
+
+    active: Journal | None = None  # Journal recording right now, if any
+
+    def __init__(self, limit: int = 100):
+        self.limit: int = limit
+        self.entries: List[Entry] = []
+        self.steps: List[int] = []
+        self.redos: List[List[Entry]] = []
+
+        self.depth: int = 0  # Nested steps
+        self.start: int = 0
+        self.bookmark: Entry | None = None
+        self.previous: Journal | None = None
+
+    def __enter__(self) -> Journal:
+        self.begin()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.end()
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def begin(self, undo: Callable[..., Any] | None = None, *args) -> None:
+        """Start recording a step and make the journal active. Nested steps
+        belong to the outermost one.
+
+        :param undo: optional bookmark, how to get back to where the step
+            started, only kept if the step changes anything
+        """
+        if self.depth == 0:
+            self.previous = Journal.active
+            Journal.active = self
+            self.start = len(self.entries)
+            self.bookmark = None if undo is None else (undo, args)
+
+        self.depth += 1
+
+    def end(self) -> None:
+        """Stop recording the current step"""
+        self.depth -= 1
+        if self.depth > 0:
+            return
+
+        Journal.active = self.previous
+        self.previous = None
+
+        if len(self.entries) == self.start:  # Nothing happened
+            return
+
+        if self.bookmark is not None:
+            self.entries.insert(self.start, self.bookmark)
+
+        self.steps.append(self.start)
+        self.redos.clear()
+
+        if len(self.steps) > self.limit:  # Forget the oldest step
+            cut: int = self.steps[1]
+            del self.entries[:cut]
+            self.steps = [start - cut for start in self.steps[1:]]
+
+    def record(self, undo: Callable[..., Any], *args) -> None:
+        """Record how to undo a change
+
+        :param undo: function undoing the change
+        :param args: arguments to call it with
+        """
+        self.entries.append((undo, args))
+
+    def insert(self, savepoint: int, undo: Callable[..., Any], *args) -> None:
+        """Record how to undo something at an earlier savepoint, so rolling
+        back does it after undoing everything recorded since
+
+        :param savepoint: where to record it
+        :param undo: function undoing it
+        :param args: arguments to call it with
+        """
+        self.entries.insert(savepoint, (undo, args))
+
+    def savepoint(self) -> int:
+        """Mark the current state to roll back to
+
+        :return: savepoint
+        """
+        return len(self.entries)
+
+    def rollback(self, savepoint: int) -> List[Entry]:
+        """Undo every change since a savepoint, latest first
+
+        :param savepoint: from savepoint
+        :return: how to redo the changes, see replay
+        """
+        assert savepoint <= len(self.entries), "Savepoint was rolled back already"
+
+        undone: List[Entry] = self.entries[savepoint:]
+        del self.entries[savepoint:]
+
+        return self.replay(undone)
+
+    def replay(self, entries: List[Entry]) -> List[Entry]:
+        """Apply entries, latest first, without adding them to the journal
+
+        :param entries: entries to apply
+        :return: the entries that take them back
+        """
+        kept: List[Entry] = self.entries
+        previous: Journal | None = Journal.active
+
+        self.entries = []  # Every change records its inverse here
+        Journal.active = self
+        try:
+            for undo, args in reversed(entries):
+                undo(*args)
+        finally:
+            inverse: List[Entry] = self.entries
+            self.entries = kept
+            Journal.active = previous
+
+        return inverse
+
+    def undo(self) -> bool:
+        """Take back the latest step
+
+        :return: if there was a step to undo
+        """
+        if not self.steps or self.depth > 0:
+            return False
+
+        self.redos.append(self.rollback(self.steps.pop()))
+
+        return True
+
+    def redo(self) -> bool:
+        """Make the latest undone step again
+
+        :return: if there was a step to redo
+        """
+        if not self.redos or self.depth > 0:
+            return False
+
+        start: int = len(self.entries)
+        self.entries.extend(self.replay(self.redos.pop()))
+        self.steps.append(start)
+
+        return True
@@ -1,13 +1,13 @@
 # Static analysis
 from __future__ import annotations
-from typing import Generator, Callable, Dict, Tuple, Any, List, Set
-from queue import Queue
+from typing import Generator, Iterator, Callable, Dict, Tuple, Any, List, Set, Deque
+from collections import deque
 from enum import Enum
 
 import datetime  # Logging
+import functools
 import pickle
-
-import sys
+import time
 
 # Local package for Direction and Position logic
 from direction import (
@@ -16,14 +16,27 @@ from direction import (
     Direction,
     ORIGO,
     deltaPosition,
+    distance,
     oppositeDirection,
     NEARBY_DIRECTION_MAP,
     ALL_DIRECTIONS,
+    MOVEMENT_MAP,
+    MOVEMENT_MAP_INVERTED,
+    DIAGONAL,
 )
 
-Data = Any
+# Local package for iterative traversals
+from traversal import INFINITY, Ring, preOrder, postOrder, breadthFirst
+
+# Local packages for the routes home and cut vertices
+from route import RouteTree
+from articulation import ArticulationIndex
+from embedding import Embedding
+from holonomy import Holonomy
+from journal import Journal
+from solver import Annealer
 
-INFINITY: int = sys.maxsize  # Just a big number
+Data = Any
 
 
 class EngineMode(Enum):
@@ -35,7 +48,8 @@ class EngineMode(Enum):
 
 
 class NodeState(Enum):
-    """States a Node may be in"""
+    """States a Node was in before traversals marked them with epochs. Only
+    kept so worlds pickled back then can be read, see Engine.deserialize"""
 
     NOT_VISITED = 0
     VISITED = 1
@@ -43,30 +57,130 @@ class NodeState(Enum):
     IGNORE = 3
 
 
-def cleanVisited(visited: List[Node]) -> None:
-    """Reset all Nodes
+class Frame:
+    """Rotation shared by a group of Nodes
+
+    Rotating a Node does not move its neighbors around, the rotation is kept
+    aside and applied when the neighbors are read. A Node is rotated by its own
+    turn plus the turn of the frame it is in, so a whole group in one frame is
+    rotated at once by turning the frame.
+
+    A frame is made for the Nodes reached from an anchor Node without passing
+    a pivot, see Node.rotateAll. It keeps covering exactly them as long as
+    nobody gets connected or disconnected and no member is taken by another
+    frame.
 
-    :param visited: list of Nodes
+    :param anchor: Node the frame was made from
+    :param pivot: Node that was not passed, if any
+    :param turn: rotation of every member
+    :param members: number of Nodes in the frame
+    :param size: number of Nodes the frame was made for
+    :param links: link version the frame was made for, see
+        ``Node.getLinkVersion``
     """
-    for node in visited:
-        node.state = NodeState.NOT_VISITED
+
+    def __init__(self, anchor: Node, pivot: Node | None):
+        self.anchor: Node = anchor
+        self.pivot: Node | None = pivot
+        self.turn: Rotation = 0
+        self.members: int = 0
+        self.size: int = 0
+        self.links: int = anchor.getLinkVersion()
+
+    def covers(self, anchor: Node, pivot: Node | None) -> bool:
+        """Checks if the frame still holds exactly the Nodes reached from
+        anchor without passing pivot
+
+        :param anchor: Node to start from
+        :param pivot: Node not to pass
+        :return: if turning the frame rotates just those Nodes
+        """
+        return (
+            self.anchor is anchor
+            and self.pivot is pivot
+            and self.links == anchor.getLinkVersion()
+            and self.members == self.size
+        )
+
+
+class Network:
+    """Counters shared by the Nodes of one network, see Node.getNetwork
+
+    A Node starts out in a network of its own, or in the network of the Node
+    it was spawned from. Connecting Nodes of two networks merges them into one,
+    with counters past those of both, so no epoch or version is ever seen
+    twice. Nodes that get disconnected stay in the same network.
+
+    :param epoch: generation counter for traversals, see Node.newEpoch
+    :param version: bumped on every change of structure, see Node.getVersion
+    :param links: bumped when Nodes get connected or disconnected, see
+        ``Node.getLinkVersion``
+    :param merged: the network this one was merged into, if any
+    """
+
+    def __init__(self):
+        self.epoch: int = 0
+        self.version: int = 0
+        self.links: int = 0
+        self.merged: Network | None = None
+
+    def find(self) -> Network:
+        """The network this one ended up in after merging
+
+        :return: network not merged into another
+        """
+        network: Network = self
+        while network.merged is not None:
+            network = network.merged
+
+        # Shorten the way for the next time
+        other: Network = self
+        while other.merged is not None and other.merged is not network:
+            other.merged, other = network, other.merged
+
+        return network
+
+    def merge(self, other: Network) -> None:
+        """Take another network in, its Nodes share the counters of this one
+        from now on
+
+        :param other: network not merged into another
+        """
+        self.epoch = max(self.epoch, other.epoch)
+        self.version = max(self.version, other.version) + 1
+        self.links = max(self.links, other.links) + 1
+        other.merged = self
 
 
 class Node:
     """Node class that lives inside Engine
 
+    The neighbors are stored unrotated. The rotation of the Node, its own turn
+    plus the turn of its frame, is applied whenever they are read, so rotating
+    is cheap, see Frame.
+
     :param data: Your object
     :param index: Id
     :param locked: If it can be removed
-    :param state: Can be set by other functions
+    :param mark: epoch of the latest traversal that visited the Node
+    :param network: counters of the network the Node lives in, see Network
     """
 
     var: int = 0  # Global do not modify
 
-    def __init__(self, data: Data = None):
+    # Rotation, only stored on the Nodes that were ever rotated
+    _turn: Rotation = 0
+    _frame: Frame | None = None
+
+    # For Nodes pickled before there were networks and marks
+    _network: Network = Network()
+    mark: int = 0
+
+    def __init__(self, data: Data = None, network: Network | None = None):
         """Node constructor where Data is optional
 
         :param data: optional Data to store on Node
+        :param network: network to live in, a new one by default
         """
 
         # User data
@@ -74,10 +188,11 @@ class Node:
 
         # Runtime variables
         self.locked: bool = False
-        self.state: NodeState = NodeState.NOT_VISITED
+        self.mark: int = 0
 
         # Protected
         self._neighbors: List[Node | None] = [None] * ALL_DIRECTIONS
+        self._network: Network = Network() if network is None else network
 
         # Final Static, DO NOT MODIFY
         self._index: int = Node.var
@@ -96,10 +211,6 @@ class Node:
         :return: bool
         """
         return self is obj
-        if isinstance(obj, int):
-            return self.state == obj
-        else:
-            return self is obj
 
     def __contains__(self, item: object) -> bool:
         """Overload in operator
@@ -136,7 +247,10 @@ class Node:
         :param direction: desired direction
         :return: Node or None
         """
-        return self._neighbors[direction.value]
+        frame: Frame | None = self._frame
+        turn: Rotation = self._turn if frame is None else self._turn + frame.turn
+
+        return self._neighbors[(direction.value - turn) % ALL_DIRECTIONS]
 
     def __setitem__(self, direction: Direction, node: Node | None) -> None:
         """Setter for Node
@@ -150,7 +264,27 @@ class Node:
         :type node: Node or None
         :param direction: Direction
         """
-        self._neighbors[direction.value] = node
+        frame: Frame | None = self._frame
+        turn: Rotation = self._turn if frame is None else self._turn + frame.turn
+        slot: int = (direction.value - turn) % ALL_DIRECTIONS
+
+        network: Network = self.getNetwork()
+        if node is not None and node._network is not network:
+            other: Network = node.getNetwork()
+            if other is not network:
+                network.merge(other)
+                node._network = network
+
+        old: Node | None = self._neighbors[slot]
+        if old is not node:
+            network.links += 1
+
+            journal: Journal | None = Journal.active
+            if journal is not None:
+                journal.record(self.__setitem__, direction, old)
+
+        self._neighbors[slot] = node
+        network.version += 1
 
     def __hash__(self) -> int:
         """Overload hash for Node
@@ -197,8 +331,23 @@ class Node:
         """
         print(f"({datetime.datetime.now()}) from Node=({self.getId()}) LOG: {message}")
 
+    def slots(self) -> List[Node | None]:
+        """Neighbors in Direction order, with the rotation applied
+
+        :return: neighbor or None for every Direction
+        """
+        frame: Frame | None = self._frame
+        turn: Rotation = self._turn  # Kept in range
+        if frame is not None:
+            turn = (turn + frame.turn) % ALL_DIRECTIONS
+
+        if turn:
+            return self._neighbors[-turn:] + self._neighbors[:-turn]
+
+        return self._neighbors
+
     def keys(self) -> Generator[Direction, None, None]:
-        for i, neighbor in enumerate(self._neighbors):
+        for i, neighbor in enumerate(self.slots()):
             if neighbor is not None:
                 yield Direction(i)
 
@@ -213,7 +362,7 @@ class Node:
 
         :return: a valid neighbor
         """
-        for neighbor in self._neighbors:
+        for neighbor in self.slots():
             if neighbor is not None:
                 yield neighbor
 
@@ -227,7 +376,7 @@ class Node:
 
         :return: a valid direction and neighbor
         """
-        for i, neighbor in enumerate(self._neighbors):
+        for i, neighbor in enumerate(self.slots()):
             if neighbor is not None:
                 yield (Direction(i), neighbor)
 
@@ -237,6 +386,10 @@ class Node:
 
         :param data: your data
         """
+        journal: Journal | None = Journal.active
+        if journal is not None:
+            journal.record(self.setData, self._data)
+
         self._data = data
 
     def getData(self) -> Data:
@@ -253,9 +406,64 @@ class Node:
         """
         return self._index
 
+    def newEpoch(self) -> int:
+        """Start a new traversal of the network this Node lives in. A Node is
+        visited by the traversal when its mark equals the returned epoch, so no
+        Node has to be reset afterwards.
+
+        Usage:
+
+        >>> territory: int = node.newEpoch()
+        >>> node.mark = territory  # Visit
+        >>> node.mark == territory  # If visited
+
+        A Node only holds the mark of the latest traversal that visited it. So a
+        traversal must not mark Nodes itself while another one still needs to
+        tell its own Nodes. A preOrder started from the loop of another one
+        keeps a set instead, and postOrder always does.
+
+        :return: epoch unique to this traversal in its network
+        """
+        network: Network = self.getNetwork()
+        network.epoch += 1
+        return network.epoch
+
+    def getNetwork(self) -> Network:
+        """Counters of the network this Node lives in
+
+        :return: network, after any merges
+        """
+        network: Network = self._network
+        if network.merged is not None:
+            network = self._network = network.find()
+
+        return network
+
+    def getVersion(self) -> int:
+        """Structure version of the network this Node lives in. It changes
+        whenever a neighbor is set or a Node is rotated, so anything derived
+        from the layout stays valid for as long as the version is the same.
+
+        :return: current version
+        """
+        return self.getNetwork().version
+
+    def getLinkVersion(self) -> int:
+        """Like getVersion but only changes when Nodes get connected or
+        disconnected, not when they are rotated. For anything that only
+        depends on who is connected to whom.
+
+        :return: current version
+        """
+        return self.getNetwork().links
+
     # ---- Methods ----
     def toggleLock(self) -> None:
         """Toggle lock state for Node"""
+        journal: Journal | None = Journal.active
+        if journal is not None:
+            journal.record(self.toggleLock)
+
         self.locked = not self.locked
 
     def isLocked(self) -> bool:
@@ -282,12 +490,84 @@ class Node:
         if rotation == 0:
             self.log("Will not rotate when not needed")
             return
-        new_neighbors: List[Node | None] = [None] * ALL_DIRECTIONS
 
-        for i, neighbor in enumerate(self._neighbors):
-            new_neighbors[(i + rotation) % ALL_DIRECTIONS] = neighbor
+        journal: Journal | None = Journal.active
+        if journal is not None:
+            journal.record(self.rotate, -rotation)
+
+        self._turn = (self._turn + rotation) % ALL_DIRECTIONS
+        self.getNetwork().version += 1
+
+    def rotateAll(self, rotation: Rotation, ignore: Node | None = None) -> None:
+        """Rotate all Nodes reachable from this Node by turning their frame.
+        The frame is made with a search the first time, after that the same
+        Nodes are rotated in O(1) until the connections change.
+
+        :param rotation: how to rotate
+        :param ignore: Node to leave as is, Nodes behind it are not reached
+        """
+        frame: Frame | None = self._frame
+        if frame is None or not frame.covers(self, ignore):
+            frame = Frame(self, ignore)
+            for other, _, _ in preOrder(self, self.newEpoch(), INFINITY, ignore):
+                other.join(frame)
+            frame.size = frame.members
+
+        journal: Journal | None = Journal.active
+        if journal is not None:
+            journal.record(self.rotateAll, -rotation, ignore)
 
-        self._neighbors = new_neighbors
+        frame.turn = (frame.turn + rotation) % ALL_DIRECTIONS
+        self.getNetwork().version += 1
+
+    def join(self, frame: Frame) -> None:
+        """Move the Node to another frame without rotating it
+
+        :param frame: frame to join
+        """
+        old: Frame | None = self._frame
+        if old is not None:
+            self._turn = (self._turn + old.turn) % ALL_DIRECTIONS
+            old.members -= 1
+
+        self._turn = (self._turn - frame.turn) % ALL_DIRECTIONS
+        self._frame = frame
+        frame.members += 1
+
+    def normalize(self) -> None:
+        """Store the neighbors rotated and leave the frame, so the Node reads
+        the same without any rotation. Nothing changes from the outside.
+        """
+        if self._frame is None and self._turn == 0:
+            return
+
+        self._neighbors = list(self.slots())
+
+        if self._frame is not None:
+            self._frame.members -= 1
+            self._frame = None
+
+        self._turn = 0
+
+    def swap(self, a: Direction, b: Direction) -> None:
+        """Swap the neighbors in two directions. Nobody gets connected or
+        disconnected, so only the layout changes.
+
+        :param a: one Direction
+        :param b: the other Direction
+        """
+        frame: Frame | None = self._frame
+        turn: Rotation = self._turn if frame is None else self._turn + frame.turn
+        i: int = (a.value - turn) % ALL_DIRECTIONS
+        j: int = (b.value - turn) % ALL_DIRECTIONS
+
+        journal: Journal | None = Journal.active
+        if journal is not None:
+            journal.record(self.swap, a, b)
+
+        neighbors: List[Node | None] = self._neighbors
+        neighbors[i], neighbors[j] = neighbors[j], neighbors[i]
+        self.getNetwork().version += 1
 
     def remove(self) -> Dict[Direction, Node]:
         """Remove all references to Node
@@ -300,12 +580,14 @@ class Node:
 
         return neighbors
 
-    def canRemove(self) -> bool:
+    def canRemove(self, origin: Node | None = None) -> bool:
         """Checks if Node can be removed or not
 
-        :return: [TODO:return]
+        :param origin: Node that is never removed, like the start of an engine.
+            Ids cannot tell, a NodeStore numbers its rows in the order saved
+        :return: if removable
         """
-        if self.getId() == 0 or self.isLocked():
+        if self == origin or self.isLocked():
             return False
 
         if self._data is not None:
@@ -320,8 +602,8 @@ class Node:
         :param node: other Node
         :return: if is connected
         """
-        return (self[direction] is node) and (
-            node[oppositeDirection(direction)] is self
+        return (self[direction] == node) and (
+            node[oppositeDirection(direction)] == self
         )
 
     def canConnect(self, direction: Direction, node: Node) -> bool:
@@ -353,6 +635,14 @@ class Node:
         self[direction] = None
         node[oppositeDirection(direction)] = None
 
+    def spawn(self, data: Data = None) -> Node:
+        """Create a new unconnected Node living in the same backend
+
+        :param data: optional Data to store on the new Node
+        :return: new Node
+        """
+        return Node(data, self.getNetwork())
+
     def directionTo(self, node: Node) -> Direction | None:
         """Get the first valid direction to Node or None
 
@@ -384,37 +674,37 @@ def isArticulationPoint(node: Node, depth: int = INFINITY) -> bool:
     neighbors: Set[Node] = set(node.values())
     done: bool = False
     cache: List[Node] = []
-    node.state = NodeState.IGNORE
+    # Kept apart from the marks, which a traversal nested in another one
+    # leaves as they are, see preOrder
+    visited: Set[Node] = set()
 
     while len(neighbors) > 0 and not done:
         start = neighbors.pop()
-        if start.state == NodeState.VISITED:
+        if start in visited:
             continue
-        elif (
-            start.state == NodeState.NOT_VISITED and cache != []
-        ):  # This rarely happens
-            cleanVisited(cache)
+        elif cache != []:  # This rarely happens
+            visited = set()
             cache = []
 
         for neighbor in neighbors:
-            if neighbor.state == NodeState.VISITED:
+            if neighbor in visited:
                 continue
             if cache != []:
                 recache: List[Node] = []
 
-                # Search for neighbors until a VISITED node is found
+                # Search for neighbors until a visited node is found
                 result = DFSWithCallback(
                     neighbor,
-                    NodeState.TMP_VISITED,
+                    node.newEpoch(),
                     recache,
-                    lambda n: n.state == NodeState.VISITED,
+                    lambda n: n in visited,
                     depth,
+                    ignore=node,
                 )
 
                 # Add all visited Nodes to cache
-                for n in recache:
-                    n.state = NodeState.VISITED
-                    cache.append(n)
+                visited.update(recache)
+                cache.extend(recache)
                 if not result:  # Is there a better way to stop nested loop?
                     done = True
                     break
@@ -422,116 +712,90 @@ def isArticulationPoint(node: Node, depth: int = INFINITY) -> bool:
             else:
                 # A complete search until start is found
                 result = DFSWithCallback(
-                    neighbor, NodeState.VISITED, cache, lambda n: n == start, depth
+                    neighbor,
+                    node.newEpoch(),
+                    cache,
+                    lambda n: n == start,
+                    depth,
+                    ignore=node,
                 )
+                visited.update(cache)
 
                 if not result:
                     done = True
                     break
 
-    node.state = NodeState.NOT_VISITED
-    cleanVisited(cache)
-
     return not done
 
 
 def DFSWithCallback(
     node: Node,
-    territory: NodeState,
-    visited: list[Node],
+    territory: int,
+    visited: List[Node] | None,
     f: Callable[..., bool],
     depth: int,
+    ignore: Node | None = None,
 ) -> bool:
     """Perform DFS and apply a function f(node) for each Node encountered and
     stop at max depth or when callback is satisfied
 
-    WARNING: You must clean up all nodes in visited
-
     :param node: Current Node
-    :param territory: which territory current node shall belong to
-    :param visited: aldready visited Nodes
+    :param territory: epoch marking the Nodes of this search
+    :param visited: optional list collecting the visited Nodes
     :param f: Callback for Node
     :param depth: Current depth
+    :param ignore: Node that must not be entered
     :return: if found
     """
-    if f(node):
-        return True
-    if depth == 0:
-        return False
-
-    node.state = territory
-    visited.append(node)
-
-    for neighbor in node.values():
-        # if neighbor.state not in (NodeState.IGNORE, NodeState.VISITED, territory):
-        if (neighbor.state != NodeState.IGNORE) and (neighbor.state != territory):
-            found: bool = DFSWithCallback(neighbor, territory, visited, f, depth - 1)
-            if found:
-                return True
+    for other, _, _ in preOrder(node, territory, depth, ignore):
+        if f(other):
+            return True
+        if visited is not None:
+            visited.append(other)
 
     return False
 
 
 def DFSWithCallbackAfter(
     node: Node,
-    parent: Node,
-    visited: List[Node],
     f: Callable[..., bool],
     args: Dict[Any, Any],
 ) -> bool:
-    visited.append(node)
-    for neighbor in node.values():
-        if neighbor not in visited:
-            if DFSWithCallbackAfter(neighbor, node, visited, f, args):
-                return True
+    """Perform DFS and apply a function f(node, parent, args) to each Node
+    (except node) once all Nodes below it are visited. Stop when the callback
+    is satisfied.
 
-    if node == parent:
-        return False
+    :param node: Start Node
+    :param f: Callback for Node and its parent
+    :param args: passed on to the callback
+    :return: if found
+    """
+    for other, parent in postOrder(node):
+        if f(other, parent, args):
+            return True
 
-    return f(node, parent, args)
+    return False
 
 
 def DFSWithCallbackAndPosition(
     node: Node,
     position: Position,
-    territory: NodeState,
-    visited: list[Node],
+    territory: int,
     f: Callable[..., bool],
     depth: int,
 ) -> bool:
     """Perform DFS and apply a function f(node) for each Node encountered and
     stop at max depth or when callback is satisfied
 
-    WARNING: You must clean up all nodes in visited
-
     :param node: Current Node
-    :param territory: which territory current node shall belong to
-    :param visited: aldready visited Nodes
+    :param territory: epoch marking the Nodes of this search
     :param f: Callback for Node
     :param depth: Current depth
     :return: if found
     """
-    if f(node, position):
-        return True
-    if depth == 0:
-        return False
-
-    node.state = territory
-    visited.append(node)
-
-    for direction, neighbor in node.items():
-        # if neighbor.state not in (NodeState.IGNORE, NodeState.VISITED, territory):
-        if (neighbor.state != NodeState.IGNORE) and (neighbor.state != territory):
-            found: bool = DFSWithCallbackAndPosition(
-                neighbor,
-                deltaPosition(direction, position),
-                territory,
-                visited,
-                f,
-                depth - 1,
-            )
-            if found:
-                return True
+    for other, otherPosition, _ in preOrder(node, territory, depth, None, position):
+        if f(other, otherPosition):
+            return True
 
     return False
 
@@ -619,7 +883,7 @@ def relativeExplorer(
     n: int,
     place: Grid,
     position: Position,
-    visited: List[Node],
+    territory: int,
 ) -> None:
     """Explore the network similar to DFS but with limits
     and the added functionality to map the network to Eucleidian space.
@@ -628,53 +892,55 @@ def relativeExplorer(
     :param n: depth of allowed concecutive movements
     :param place: the grid to build up
     :param position: current Eucleidian position
-    :param visited: already visited Nodes
+    :param territory: epoch marking the explored Nodes
     """
-    if position not in place or n > place[position][0]:
-        place[position] = (n, node)
+    for other, otherPosition, m in preOrder(node, territory, n, None, position):
+        if otherPosition not in place or m > place[otherPosition][0]:
+            place[otherPosition] = (m, other)
 
-    # Maximum depth reached
-    if n == 0:
-        return
-
-    for direction, neighbor in node.items():
-        if neighbor.state == NodeState.NOT_VISITED:
-            neighbor.state = NodeState.VISITED  # Must clean afterwards
-            visited.append(neighbor)
-            relativeExplorer(
-                neighbor,
-                n - 1,
-                place,
-                deltaPosition(direction, position),
-                visited,  # Maybe optimized for local search of recent?
-            )
 
-
-def rotateAll(node: Node, rotation: Rotation) -> None:
-    """Rotate all NOT_VISITED Nodes in the network
+def rotateAll(node: Node, rotation: Rotation, ignore: Node | None = None) -> None:
+    """Rotate all Nodes reachable in the network, see Node.rotateAll
 
     :param node: current Node
     :param rotation: how to rotate
+    :param ignore: Node to leave as is, Nodes behind it are not reached
+    """
+    node.rotateAll(rotation, ignore)
+
+
+def normalizeAll(node: Node) -> None:
+    """Store the rotations of all Nodes reachable in the network in their
+    neighbors, see Node.normalize. Done before saving, or whenever asked.
+
+    :param node: any Node of the network
     """
 
     def f(other: Node) -> bool:
-        other.rotate(rotation)
+        other.normalize()
         return False
 
-    visited: List[Node] = []
-    DFSWithCallback(node, NodeState.VISITED, visited, f, INFINITY)
-    cleanVisited(visited)
+    DFSWithCallback(node, node.newEpoch(), None, f, INFINITY)
 
 
-def bend(node: Node, pivot: Node, rotation: Rotation) -> bool:
+def bend(
+    node: Node,
+    pivot: Node,
+    rotation: Rotation,
+    isCut: Callable[[Node], bool] | None = None,
+) -> bool:
     """Try to bend the node with regards to pivot. Return True if actually
     bended.
 
     :param node: node to bend
     :param pivot: node to bend around
     :param times: type of rotation
+    :param isCut: cut vertex test to use, e.g. Engine.isCutVertex, defaults to
+        a search with isArticulationPoint
     :return: if bended
     """
+    if isCut is None:
+        isCut = lambda other: not isArticulationPoint(other)
 
     if not (
         not node.isLeaf()
@@ -682,7 +948,7 @@ def bend(node: Node, pivot: Node, rotation: Rotation) -> bool:
         and pivot in node  # If pivot is neighbor
         and node in pivot  # --||--
         and not node.isLocked()
-        and not isArticulationPoint(node)
+        and isCut(node)
     ):
         return False
 
@@ -698,14 +964,11 @@ def bend(node: Node, pivot: Node, rotation: Rotation) -> bool:
     # take its place
     if node[potential] in (pivot, None):
         # All nodes except those behind (and) pivot will be rotated
-        pivot.state = NodeState.IGNORE
-        rotateAll(node, rotation)
-        pivot.state = NodeState.NOT_VISITED
+        rotateAll(node, rotation, pivot)
 
         newDirection: Direction = Direction.rotate(previousDirection, rotation)
 
-        node[newDirection] = node[previousDirection]
-        node[previousDirection] = pivot
+        node.swap(newDirection, previousDirection)  # Pivot stays in place
         return True
 
     else:  # Could not bend
@@ -713,44 +976,64 @@ def bend(node: Node, pivot: Node, rotation: Rotation) -> bool:
 
 
 def countCollisions(startNode: Node) -> int:
-    def f(
-        node: Node,
-        position: Position,
-        place: Dict[Node, List[Position]],
-        visited: List[Node],
-    ):
-        if node not in place:
-            place[node] = [position]
-        elif position not in place[node]:  # Node exists in multiple places. Bad...
-            place[node].append(position)
-            print("I exists on multiple places...")
-        else:
-            return
+    """Count the collisions of the network laid out in 2D, in O(V+E). Every
+    Node reachable from startNode is laid out by a breadth first spanning
+    tree. Every other edge that disagrees with the layout puts its Node on one
+    more position. A collision is a position taken more than once.
+
+    The network is flat when there are no collisions.
 
+    :param startNode: Node to lay out from, at ORIGO
+    :return: number of collisions
+    """
+    place: Dict[Node, Position] = {startNode: ORIGO}
+    for _ in breadthFirst([(ORIGO, startNode)], place):
+        pass
+
+    # Other positions the edges outside the tree would put Nodes on
+    elsewhere: Set[Tuple[Node, Position]] = set()
+    for node, position in place.items():
         for direction, neighbor in node.items():
-            if neighbor not in visited:
-                f(
-                    neighbor,
-                    deltaPosition(direction, position),
-                    place,
-                    [neighbor] + visited,
-                )
+            other: Position = deltaPosition(direction, position)
+            if other != place[neighbor]:
+                elsewhere.add((neighbor, other))
 
-    world = {}
-    f(startNode, ORIGO, world, [])
+    positions: List[Position] = list(place.values())
+    positions.extend(position for _, position in elsewhere)
 
-    all_positions = set()
+    return len(positions) - len(set(positions))
 
-    collisions: int = 0
 
-    for positions in world.values():
-        for position in positions:
-            if position in all_positions:
-                collisions += 1
-            else:
-                all_positions.add(position)
+def journaled(operation: Callable[..., Any]) -> Callable[..., Any]:
+    """Make an Engine operation one step of the journal, to undo and redo it.
+    Undoing the step also returns to the Node the operation started at.
+
+    :param operation: Engine method
+    :return: journaled method
+    """
+
+    @functools.wraps(operation)
+    def wrapper(self: Engine, *args, **kwargs) -> Any:
+        self.journal.begin(self._restore, self.node, self.previous)
+        try:
+            return operation(self, *args, **kwargs)
+        finally:
+            self.journal.end()
 
-    return collisions
+    return wrapper
+
+
+def finish(steps: Generator[None, None, Any]) -> Any:
+    """Run maintenance to the end at once, see Engine.maintain
+
+    :param steps: maintenance to run
+    :return: what the maintenance returned
+    """
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
 
 
 class Engine:
@@ -774,13 +1057,24 @@ class Engine:
 
     :param mode: The mode for the engine to operate in
     :param depth: operation depth
+    :param root: optional initial Node, decides the backend (e.g. a NodeStore)
     :param node: current Node
     :param start: initial Node
     :param previous: previous Node
     :param grid: 2D representation
+    :param rings: explored Nodes with positions, one list per hop
+    :param placement: position of every explored Node
+    :param ordered: if the rings are in the order they were explored in
+    :param version: structure version the rings were explored at
+    :param routes: shortest routes to start, see routeHome
+    :param cuts: cut vertices of the network, see isCutVertex
+    :param holonomy: what the cycles of the network do, see getHolonomy
+    :param twoWay: link version, Nodes checked and if all their edges lead
+        back, see search
+    :param task: maintenance in progress, see maintain
     """
 
-    def __init__(self, mode: EngineMode, depth: int):
+    def __init__(self, mode: EngineMode, depth: int, root: Node | None = None):
         assert isinstance(
             mode, EngineMode
         ), "You must have a valid EngineMode, not: " + str(mode)
@@ -795,11 +1089,18 @@ class Engine:
         self.setDepth(depth)
         self.setMode(mode)
 
-        self.node: Node = Node()
+        self.node: Node = Node() if root is None else root
         self.start: Node = self.node
         self.node.toggleLock()
 
         self.previous: Node = self.node
+        self.routes: RouteTree = RouteTree(self.start, build=False)
+        self.cuts: ArticulationIndex = ArticulationIndex()
+        self.embedding: Embedding | None = None
+        self.holonomy: Holonomy = Holonomy()
+        self.twoWay: Tuple[int, Set[Node], bool] | None = None
+        self.journal: Journal = Journal()
+        self.task: Generator[None, None, Any] | None = None
 
         # World stuff
         self.grid: Grid = {}
@@ -808,56 +1109,347 @@ class Engine:
 
         self.update()
 
+    def routeHome(self) -> List[Node] | None:
+        """Shortest route home to start, like search(self.start) but without a
+        search. The routes are built on first use and kept up to date by the
+        engine after that, only rebuilt when the network was changed behind its
+        back.
+
+        :return: route from start back to, but without, the current Node. None
+        if start cannot be reached
+        """
+        if self.routes.version != self.node.getLinkVersion():
+            self.routes.build()
+
+        path: List[Node] | None = self.routes.route(self.node)
+        if path is None:
+            return None
+
+        path.reverse()
+
+        return path[:-1]  # Without the current Node
+
+    def isCutVertex(self, node: Node) -> bool:
+        """Checks if removing a Node would split the network. The answer comes
+        from an index of the whole network, only built again after Nodes were
+        connected or disconnected.
+
+        :param node: Node to check
+        :return: if cut vertex
+        """
+        if not self.cuts.isValid(node):
+            self.cuts.build(node)
+
+        return self.cuts.isCut(node)
+
+    def getEmbedding(self) -> Embedding:
+        """The network laid out from the current Node. Bends made through it
+        keep it up to date, it is only laid out again after the current Node
+        or the layout changed behind its back.
+
+        :return: embedding rooted at the current Node
+        """
+        if not self._isEmbedded():
+            self.embedding = Embedding(self.node)
+
+        return self.embedding
+
+    def getHolonomy(self) -> Holonomy:
+        """What walking around the cycles of the network does, and which
+        collisions no bend across blocks can remove. Analysed again after the
+        layout changed.
+
+        :return: analysis from the current Node
+        """
+        if not self.holonomy.isValid(self.node):
+            if not self.cuts.isValid(self.node):
+                self.cuts.build(self.node)
+            self.holonomy.build(self.node, self.cuts)
+
+        return self.holonomy
+
+    def _explainTangle(self) -> None:
+        """Tell what may keep the collisions left from being untangled. Not a
+        proof, bends inside a room may still make it fit, see Holonomy
+        """
+        explanation: str = self.getHolonomy().explain()
+        if explanation:
+            print(explanation)
+
+    def _isEmbedded(self) -> bool:
+        return (
+            self.embedding is not None
+            and self.embedding.root == self.node
+            and self.embedding.version == self.node.getVersion()
+        )
+
+    def _preparing(self) -> Generator[None, None, None]:
+        """Index the cut vertices, lay out the network and analyse its cycles
+        a little at a time, so maintenance does not have to do it all in its
+        first step. Whatever changes the network in between steps leaves it to
+        be done at once.
+        """
+        node: Node = self.node
+        if not self.cuts.isValid(node):
+            links: int = node.getLinkVersion()
+            for _ in self.cuts.building(node):
+                yield
+                if node.getLinkVersion() != links:
+                    return
+
+        if not self._isEmbedded():
+            version: int = node.getVersion()
+            embedding: Embedding = Embedding(node, build=False)
+            for _ in embedding.building():
+                yield
+                if node.getVersion() != version:
+                    return
+
+            self.embedding = embedding
+
+        if not self.holonomy.isValid(node):
+            version = node.getVersion()
+            holonomy: Holonomy = Holonomy()
+            for _ in holonomy.building(node, self.cuts):
+                yield
+                if node.getVersion() != version:
+                    return
+
+            self.holonomy = holonomy
+
+    def undo(self) -> bool:
+        """Undo the latest operation that changed the network
+
+        :return: if there was anything to undo
+        """
+        if self.mode == EngineMode.READ_ONLY or not self.journal.undo():
+            return False
+
+        self.update()
+
+        return True
+
+    def redo(self) -> bool:
+        """Redo the latest undone operation
+
+        :return: if there was anything to redo
+        """
+        if self.mode == EngineMode.READ_ONLY or not self.journal.redo():
+            return False
+
+        self.update()
+
+        return True
+
+    def _restore(self, node: Node, previous: Node) -> None:
+        """Go back to a Node, as part of a journal step
+
+        :param node: Node to stand on
+        :param previous: Node to have come from
+        """
+        journal: Journal | None = Journal.active
+        if journal is not None:
+            journal.record(self._restore, self.node, self.previous)
+
+        self.node = node
+        self.previous = previous
+
+    def maintain(self, steps: Generator[None, None, Any]) -> bool:
+        """Start maintenance that runs a little at a time, see work. The whole
+        maintenance is one step of the journal, anything done in between
+        included.
+
+        Usage:
+
+        >>> engine.maintain(engine.untangling())
+        >>> while engine.isBusy():
+        ...     engine.work(0.005)  # Every frame
+
+        :param steps: maintenance, like untangling, optimizing or pruning
+        :return: if started, only one maintenance runs at a time
+        """
+        if self.mode == EngineMode.READ_ONLY or self.task is not None:
+            return False
+
+        self.journal.begin(self._restore, self.node, self.previous)
+        self.task = steps
+
+        return True
+
+    def work(self, budget: float) -> bool:
+        """Continue the maintenance in progress for a while. At least one step
+        is done, so it always gets somewhere.
+
+        :param budget: seconds to spend
+        :return: if any work was done
+        """
+        if self.task is None:
+            return False
+
+        deadline: float = time.perf_counter() + budget
+        done: bool = True
+        try:
+            next(self.task)
+            while time.perf_counter() < deadline:
+                next(self.task)
+            done = False
+        except StopIteration:
+            pass
+        finally:
+            if done:  # Finished or failed
+                self.task = None
+                self.journal.end()
+
+        if self.version != self.node.getVersion():  # Show the progress
+            self.update()
+
+        return True
+
+    def isBusy(self) -> bool:
+        """Checks if maintenance is in progress
+
+        :return: if busy
+        """
+        return self.task is not None
+
+    def cancel(self) -> None:
+        """Stop the maintenance in progress, what is done so far is kept"""
+        if self.task is None:
+            return
+
+        self.task.close()
+        self.task = None
+        self.journal.end()
+        self.update()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state: Dict[str, Any] = self.__dict__.copy()
+        del state["journal"]  # Undo history is not saved
+        state["task"] = None  # Nor maintenance in progress
+        state["twoWay"] = None
+
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.journal = Journal()
+        self.task = None
+
     def setDrawer(self, f: Callable[..., None]) -> None:
         self.drawer = f
 
-    def search(self, node: Node) -> List[Node]:
-        """Search for a Node in the network
+    def search(self, node: Node, limit: int = INFINITY) -> List[Node] | None:
+        """Search for the shortest route to a Node in the network
 
-        WARNING if Node is not present in the Engine, an empty list will be
-        returned
+        The network is searched from both ends at once, a ring at a time on the
+        side with the smallest frontier, until the two sides meet. Stepping
+        backwards needs every edge to have one back, which connect and
+        disconnect make sure of. Edges that lead into a Node without one back
+        cannot be found from it, so a network with any such edge is searched
+        forward only, see isTwoWay.
 
         :param node: target Node
-        :return: depthed path to Node
+        :param limit: most steps allowed in the route
+        :return: route from node back to, but without, the current Node. None
+        if node cannot be reached within limit
         """
-        q = Queue()
-        q.put(self.node)
+        if node == self.node:
+            return []
+
+        # Every explored Node mapped to the next Node towards its own side
+        forward: Dict[Node, Node | None] = {self.node: None}
+        backward: Dict[Node, Node | None] = {node: None}
+        forwardFrontier: Deque[Node] = deque([self.node])
+        backwardFrontier: Deque[Node] = deque([node])
+        forwardSteps: int = 0
+        backwardSteps: int = 0
+
+        if not self.isTwoWay():
+            backwardFrontier.clear()
+
+        def expand(
+            frontier: Deque[Node],
+            seen: Dict[Node, Node | None],
+            other: Dict[Node, Node | None],
+            reverse: bool,
+        ) -> Node | None:
+            for _ in range(len(frontier)):
+                current: Node = frontier.popleft()
+                for neighbor in current.values():
+                    if neighbor in seen:
+                        continue
+
+                    if reverse and current not in neighbor:
+                        continue  # Only outside the two way part, see isTwoWay
+
+                    seen[neighbor] = current
+                    if neighbor in other:
+                        return neighbor
+
+                    frontier.append(neighbor)
+
+            return None
+
+        # The first meeting is the shortest, as the sides grow a step at a time
+        meeting: Node | None = None
+        while meeting is None:
+            if forwardSteps + backwardSteps == limit or not forwardFrontier:
+                return None
+
+            if backwardFrontier and len(backwardFrontier) < len(forwardFrontier):
+                meeting = expand(backwardFrontier, backward, forward, True)
+                backwardSteps += 1
+                if not backwardFrontier and meeting is None:
+                    # Continue from the forward side alone
+                    backward = {node: None}
+                    backwardSteps = 0
+            else:
+                meeting = expand(forwardFrontier, forward, backward, False)
+                forwardSteps += 1
 
-        visited: List[Node] = []
-        pathMap: Dict[Node, Node] = {}
+        path: List[Node] = []
+        other: Node | None = meeting
+        while other is not None:
+            path.append(other)
+            other = backward[other]
 
-        while not q.empty():
-            other: Node = q.get()
+        path.reverse()
+        other = forward[meeting]
+        while other is not None:
+            path.append(other)
+            other = forward[other]
 
-            if other == node:
-                break
+        return path[:-1]  # Without the current Node
 
-            for neighbor in other.values():
-                if neighbor.state == NodeState.NOT_VISITED:
-                    neighbor.state = NodeState.VISITED
-                    visited.append(neighbor)
-                    q.put(neighbor)
-                    pathMap[neighbor] = other
+    def isTwoWay(self) -> bool:
+        """Checks if every edge reachable from the current Node has one back.
+        Checked again once the links changed or the engine got somewhere it
+        was not checked from, in O(V+E).
 
-        cleanVisited(visited)
-        path: List[Node] = []
+        :return: if two way
+        """
+        links: int = self.node.getLinkVersion()
+        if (
+            self.twoWay is None
+            or self.twoWay[0] != links
+            or self.node not in self.twoWay[1]
+        ):
+            seen: Set[Node] = {self.node}
+            frontier: Deque[Node] = deque([self.node])
+            twoWay: bool = True
+            while frontier:
+                node: Node = frontier.popleft()
+                for neighbor in node.values():
+                    if node not in neighbor:
+                        twoWay = False
 
-        other: Node = node
-        i = 0
-        while True:
-            if i > 50:
-                print("Too far!")
-                break
-            if other not in pathMap:
-                break
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        frontier.append(neighbor)
 
-            path.append(other)
-            other = pathMap[other]
-            if other == self.node:
-                break
-            i += 1
+            self.twoWay = (links, seen, twoWay)
 
-        return path
+        return self.twoWay[2]
 
     def getDepth(self) -> int:
         """Getter for depth
@@ -875,8 +1467,15 @@ class Engine:
         assert value >= 0, "Invalid range: " + str(value)
         if self.depth != value:
             self.depth = value
-            print("Changing depth")
-            self.update()
+            if (
+                self.version == self.node.getVersion()
+                and self.rings[0][0][1] == self.node
+                and (self.ordered or value < len(self.rings))
+            ):
+                self.explore()
+                self.fill()
+            else:
+                self.update()
 
     def getPath(self) -> List[Node]:
         return self.path
@@ -902,6 +1501,7 @@ class Engine:
     def getGrid(self) -> World:
         return self.world
 
+    @journaled
     def move(self, direction: Direction) -> bool:
         """Tries to move in a desired Direction
 
@@ -909,13 +1509,20 @@ class Engine:
         :return: if successful
         """
 
+        links: int = self.node.getLinkVersion()
         node: Node = traverse(self.node, direction, self.grid, self.mode)
         if self.node != node:
+            if node.getLinkVersion() != links:  # Created or connected on the way
+                self.routes.repair([node, *node.values()], links)
+                if node.isLeaf() and node not in self.cuts:
+                    self.cuts.attach(node, *node.values(), links)
+
             self.remove()  # Optimize by removing redundant Nodes
             self.previous = self.node
             self.node = node
 
-            self.update()
+            if not self.shift(MOVEMENT_MAP[direction]):
+                self.update()
 
             return True
 
@@ -934,6 +1541,7 @@ class Engine:
             if possibleDirection in near:
                 yield possibleDirection
 
+    @journaled
     def remove(self) -> bool:
         """Tries to remove current Node from the network
 
@@ -942,15 +1550,20 @@ class Engine:
 
         if (
             self.mode != EngineMode.READ_ONLY
-            and self.node.canRemove()
-            and isArticulationPoint(self.node)
+            and self.node.canRemove(self.start)
+            and not self.isCutVertex(self.node)
         ):
             if self.node == self.previous:
                 for node in self.node.values():
                     self.previous = node
                     break
 
-            self.node.remove()
+            removed: Node = self.node
+            links: int = removed.getLinkVersion()
+            neighbors: Dict[Direction, Node] = removed.remove()
+            self.routes.repair([removed, *neighbors.values()], links)
+            if len(neighbors) == 1:
+                self.cuts.detach(removed, *neighbors.values(), links)
 
             self.node = self.previous
             for node in self.node.values():
@@ -963,6 +1576,7 @@ class Engine:
 
         return False
 
+    @journaled
     def insert(self) -> bool:
         """Insert a new to the network on the current position
 
@@ -971,7 +1585,9 @@ class Engine:
         if self.mode == EngineMode.READ_ONLY or self.node == self.previous:
             return False
 
-        node: Node = Node()
+        links: int = self.node.getLinkVersion()
+        node: Node = self.node.spawn()
+        touched: List[Node] = [node, self.node, self.previous]
         direction: Direction | None = self.previous.directionTo(self.node)
 
         if direction is None:  # This should not happen!?
@@ -979,6 +1595,7 @@ class Engine:
 
         if self.node.isLeaf():
             self.node.connect(direction, node)
+            self.cuts.attach(node, self.node, links)
             self.previous = self.node
             self.node = node
 
@@ -989,48 +1606,349 @@ class Engine:
             self.previous = node
             self.node
 
+        self.routes.repair(touched, links)
         self.update()
 
         return True
 
     @staticmethod
     def deserialize(filename: str) -> Engine:
+        """Load a world, see worldfile.loadWorld. Worlds pickled by older
+        versions are still read.
+
+        :param filename: file to read
+        :return: engine of the world
+        """
+        # The world file module builds on this one
+        from worldfile import isWorldFile, loadWorld
+
+        if isWorldFile(filename):
+            return loadWorld(filename)
+
         # Deserialize the network of nodes
         with open(filename, "rb") as file:
             network: Engine = pickle.load(file)
 
+        if not hasattr(network, "routes"):  # Saved by an older version
+            network.routes = RouteTree(network.start)
+            network.update()
+
+        if not hasattr(network, "cuts"):
+            network.cuts = ArticulationIndex()
+
+        if not hasattr(network, "embedding"):
+            network.embedding = None
+
+        if not hasattr(network, "holonomy"):
+            network.holonomy = Holonomy()
+
+        if not hasattr(network, "twoWay"):
+            network.twoWay = None
+
         return network
 
     @staticmethod
-    def serialize(network: Engine, filename: str) -> None:
-        """Serialize the world"""
+    def serialize(network: Engine, filename: str) -> int:
+        """Save the world in the binary world format, see worldfile.saveWorld
+
+        :param network: engine to save
+        :param filename: file to write
+        :return: number of bytes written
+        """
+        from worldfile import saveWorld
 
-        # Serialize the network of nodes
-        with open(filename, "wb") as file:
-            pickle.dump(network, file)
+        return saveWorld(network, filename)
 
     def update(self) -> None:
-        """Generate a 2D representation of the network. Will keep Nodes with
-        shorter Manhattan distance.
+        """Generate a 2D representation of the network. The network is explored
+        ring by ring, so every position is claimed by the Node with the fewest
+        steps to it, whatever order the neighbors are stored in.
+
+        Both the grid and the world are filled in priority order, closest ring
+        first, so a consumer may stop after any ring.
 
         :return: Grid of the world
         """
-        self.grid.clear()
-        all_visited: List[Node] = []
-        relativeExplorer(self.node, self.depth, self.grid, ORIGO, all_visited)
+        self.reset()
+        self.explore()
+        self.fill()
+
+    def reset(self) -> None:
+        """Forget all explored rings, except the current Node"""
+        self.placement: Dict[Node, Position] = {self.node: ORIGO}
+        self.rings: List[Ring] = [[(ORIGO, self.node)]]
+        self.version: int = self.node.getVersion()
+        self.regular: bool | None = None
+        self.ordered: bool = True
+
+    def explore(self, depth: int | None = None) -> None:
+        """Explore beyond the outermost ring until depth is reached. Rings that
+        are already explored are kept, so the depth can shrink and grow again
+        without exploring anything twice.
+
+        Which Node claims a position beyond depends on the order of the rings,
+        so only rings in the order they were explored in may be explored
+        further, see ordered. Rings moved by shift are not.
+
+        :param depth: how far to explore, defaults to the engine depth
+        """
+        if depth is None:
+            depth = self.depth
+
+        first: int = len(self.rings)
+        rings: Iterator[Ring] = breadthFirst(self.rings[-1], self.placement)
+        while len(self.rings) <= depth:
+            ring: Ring = next(rings, [])
+            if not ring:
+                break
+
+            self.rings.append(ring)
+
+        if self.regular is False or first == len(self.rings):
+            return
+
+        # Only the cheap half of the check, edges are checked on demand. Since
+        # a position gives the hop distance, positions can only repeat in a ring
+        for hop in range(first, len(self.rings)):
+            ring = self.rings[hop]
+            if len({position for position, _ in ring}) != len(ring) or any(
+                distance(position) != hop for position, _ in ring
+            ):
+                self.regular = False
+                return
+
+        self.regular = None
+
+    def iterNeighborhood(
+        self, depth: int | None = None
+    ) -> Generator[Tuple[Position, int, Node], None, None]:
+        """Stream the neighborhood ring by ring, closest first, without waiting
+        for the grid. Rings that are not explored yet are explored when the
+        consumer gets to them, and kept for later updates. So stopping early
+        saves the work of the rings left.
 
-        cleanVisited(all_visited)
+        The stream ends if the engine moves or updates in between.
 
+        Usage:
+
+        >>> for position, hop, node in engine.iterNeighborhood(20):
+                if outOfTime():
+                    break
+
+        :param depth: how many steps away to go, defaults to the engine depth
+        :return: position, hop distance and Node
+        """
+        if depth is None:
+            depth = self.depth
+
+        if (
+            self.version != self.node.getVersion()
+            or self.rings[0][0][1] != self.node
+            or (not self.ordered and depth >= len(self.rings))
+        ):
+            self.reset()
+
+        rings: List[Ring] = self.rings
+        claimed: Set[Position] = set()
+        for hop in range(depth + 1):
+            if self.rings is not rings:
+                return
+
+            if hop == len(rings):
+                self.explore(hop)
+                if hop == len(rings):
+                    return
+
+            for position, node in rings[hop]:
+                if position not in claimed:
+                    claimed.add(position)
+                    yield position, hop, node
+
+    def fill(self) -> None:
+        """Fill the grid and the world from the explored rings up to depth,
+        closest ring first.
+        """
+        self.grid.clear()
         world: World = {}
 
-        for position, (priority, node) in self.grid.items():
-            if priority not in world:
-                world[priority] = []
+        for hop, ring in enumerate(self.rings[: self.depth + 1]):
+            priority: int = self.depth - hop
+            for position, node in ring:
+                if position in self.grid:
+                    continue
+
+                self.grid[position] = (priority, node)
+                if priority not in world:
+                    world[priority] = []
 
-            world[priority].append((position, node))
+                world[priority].append((position, node))
 
         self.world = world
 
+    def iterLinks(
+        self,
+    ) -> Generator[Tuple[int, Position, Node, Position], None, None]:
+        """Stream every link between two Nodes on the grid once, for drawing.
+        A link is only on the grid if the neighbor got the position next to the
+        Node in its direction, a link that leads elsewhere is left out.
+
+        Links are given from their farther end, farthest first, so closer links
+        are drawn on top. The grid is brought up to date first if the network
+        was changed since the last update.
+
+        Usage:
+
+        >>> for priority, position, node, other in engine.iterLinks():
+                drawLine(position, other)
+
+        :return: priority and position of the farther end, its Node, and the
+        position of the closer end
+        """
+        if self.version != self.node.getVersion() or self.rings[0][0][1] != self.node:
+            self.update()
+
+        grid: Grid = self.grid
+        for priority in sorted(self.world):
+            for position, node in self.world[priority]:
+                for direction, neighbor in node.items():
+                    other: Position = deltaPosition(direction, position)
+                    entry: Tuple[int, Node] | None = grid.get(other)
+                    if (
+                        entry is None
+                        or entry[1] != neighbor
+                        or entry[0] < priority
+                        or (entry[0] == priority and other < position)
+                    ):
+                        continue  # Off the grid or drawn from the other end
+
+                    yield priority, position, node, other
+
+    def isRegular(self) -> bool:
+        """Checks if the explored neighborhood is a flat piece of grid. That is
+        every Node has a position of its own at its hop distance, and every
+        edge between two explored Nodes agrees with their positions.
+
+        The answer is kept until the next update.
+
+        :return: if regular
+        """
+        if self.regular is None:
+            self.regular = True
+            for node, position in self.placement.items():
+                for direction, neighbor in node.items():
+                    other: Position | None = self.placement.get(neighbor)
+                    if other is None:
+                        continue
+
+                    if other != deltaPosition(direction, position):
+                        self.regular = False
+                        return False
+
+        return self.regular
+
+    def shift(self, delta: Position) -> bool:
+        """Re-anchor the neighborhood on the Node at delta instead of exploring
+        it all over again. The previous rings are moved by -delta, and only the
+        Nodes that were on the outermost ring and got closer are expanded, to
+        find the newly exposed frontier.
+
+        This only works when nothing was changed since the last update and the
+        previous neighborhood is regular, see isRegular. It is also checked
+        that every Node still has a neighbor one step closer to the new center,
+        so the result is exactly what update would produce.
+
+        :param delta: position of the new center in the current grid
+        :return: if successful, otherwise update must be used
+        """
+        if (
+            DIAGONAL
+            or self.version != self.node.getVersion()
+            or self.placement.get(self.node) != delta
+            or not self.isRegular()
+        ):
+            return False
+
+        depth: int = self.depth
+        dx, dy = delta
+
+        placement: Dict[Node, Position] = {}
+        grid: Grid = {}
+        rings: List[Ring] = [[] for _ in range(depth + 1)]
+        closer: Ring = []
+
+        for node, (x, y) in self.placement.items():
+            position: Position = (x - dx, y - dy)
+            hop: int = abs(position[0]) + abs(position[1])
+            if hop <= depth:
+                placement[node] = position
+                grid[position] = (depth - hop, node)
+                rings[hop].append((position, node))
+                if 0 < hop < abs(x) + abs(y):
+                    closer.append((position, node))
+
+        # Nodes on the old edge may now be one step inside it
+        if len(self.rings) == depth + 1:
+            for (x, y), node in self.rings[depth]:
+                position = (x - dx, y - dy)
+                if abs(position[0]) + abs(position[1]) != depth - 1:
+                    continue
+
+                for direction, neighbor in node.items():
+                    neighborPosition: Position = deltaPosition(direction, position)
+                    if neighbor in placement:
+                        if placement[neighbor] != neighborPosition:
+                            return False
+
+                        continue
+
+                    x, y = neighborPosition
+                    if abs(x) + abs(y) != depth or neighborPosition in grid:
+                        return False
+
+                    placement[neighbor] = neighborPosition
+                    grid[neighborPosition] = (0, neighbor)
+                    rings[depth].append((neighborPosition, neighbor))
+
+        # The edge is the only place new inconsistent edges may appear
+        for position, node in rings[depth]:
+            for direction, neighbor in node.items():
+                other: Position | None = placement.get(neighbor)
+                if other is not None and other != deltaPosition(direction, position):
+                    return False
+
+        # Every Node must be reachable by a path that never steps away. Nodes
+        # that got further away keep theirs, by stepping to the old center
+        # first, so only the ones that got closer must be checked.
+        def reachedFrom(position: Position, direction: Direction, node: Node) -> bool:
+            entry: Tuple[int, Node] | None = grid.get(position)
+            return entry is not None and entry[1][direction] == node
+
+        x, y = -dx, -dy
+        if not reachedFrom(ORIGO, MOVEMENT_MAP_INVERTED[(x, y)], grid[(x, y)][1]):
+            return False
+
+        for (x, y), node in closer:
+            if not (
+                (x > 0 and reachedFrom((x - 1, y), Direction.EAST, node))
+                or (x < 0 and reachedFrom((x + 1, y), Direction.WEST, node))
+                or (y > 0 and reachedFrom((x, y - 1), Direction.NORTH, node))
+                or (y < 0 and reachedFrom((x, y + 1), Direction.SOUTH, node))
+            ):
+                return False
+
+        self.placement = placement
+        self.rings = rings
+        self.regular = True
+        self.ordered = False  # Exploring further must start over, see explore
+
+        self.grid = grid
+        self.world = {
+            depth - hop: list(ring) for hop, ring in enumerate(rings) if ring
+        }
+
+        return True
+
+    @journaled
     def tryRotate(self, rotation: Rotation) -> bool:
         """Try to bend the network at the current position
 
@@ -1042,15 +1960,17 @@ class Engine:
         """
         if self.mode == EngineMode.READ_ONLY:
             return False
-        previousCollisions: int = countCollisions(self.node)
-        if not bend(self.node, self.previous, rotation):
+
+        collisions: int = self.getEmbedding().collisions
+        savepoint: int = self.journal.savepoint()
+        if not self._bend(self.node, self.previous, rotation):
             # return False
             rotateAll(self.node, rotation)
 
         else:
-            if countCollisions(self.node) > previousCollisions:
+            if self.getEmbedding().collisions > collisions:
                 if self.mode != EngineMode.LIMINAL:
-                    bend(self.node, self.previous, -rotation)
+                    self.journal.rollback(savepoint)
 
                     print("You can only bend with collisions in LIMINAL mode")
 
@@ -1058,6 +1978,7 @@ class Engine:
 
         return True
 
+    @journaled
     def optimize(self) -> bool:
         """Best effort optimization where it tries to straighten all paths
         outwards. Could be used to remove some interdimensional collisions.
@@ -1068,24 +1989,25 @@ class Engine:
 
         :return: if optimized
         """
+        return finish(self.optimizing())
 
+    def optimizing(self) -> Generator[None, None, bool]:
+        """Optimize one Node per step, see optimize and maintain
+
+        :return: if optimized
+        """
         if self.mode == EngineMode.READ_ONLY:
             return False
 
-        def rec(node: Node, parent: Node, visited: List[Node]):
-            visited.append(node)
-            flattened: bool = False
+        yield from self._preparing()
 
-            for neighbor in node.values():
-                if neighbor not in visited:
-                    flattened = rec(neighbor, node, visited)
+        flattened: bool = False
 
-            if node == parent:
-                return flattened
+        for node, parent in postOrder(self.node):
             parentDirection: Direction | None = parent.directionTo(node)
 
             if parentDirection is None:  # This happens in directed graphs
-                return flattened
+                continue
 
             n_neighbors: int = len(node)
 
@@ -1093,20 +2015,19 @@ class Engine:
                 rotation: Rotation = -1
 
                 while (node[parentDirection] is None) and (rotation < 2):
-                    if rotation != 0 and bend(node, parent, rotation):
+                    if rotation != 0 and bend(node, parent, rotation, self.isCutVertex):
                         flattened = True
                     rotation += 1
 
-            return flattened
+            yield
 
-        visited: List[Node] = []
-        flattened: bool = rec(self.node, self.node, visited)
         if flattened:
             print("Performed optimization")
             self.update()
 
         return flattened
 
+    @journaled
     def _untangle(self) -> bool:
         """Naive untanglement where backtracking is used together with DFS to
         bend around the network until no further collisions are present. This
@@ -1127,100 +2048,45 @@ class Engine:
         if self.mode == EngineMode.READ_ONLY:
             return False
 
-        collisions: int = countCollisions(self.node)  # This function costs a lot
+        collisions: int = self.getEmbedding().collisions
 
         if collisions == 0:
             print("Nothing to untangle :)")
             return False
 
-        def rec(node: Node, parent: Node, visited: List[Node], collisions: List[int]):
-            visited.append(node)
-            done: bool = False
-
-            for neighbor in node.values():
-                if neighbor not in visited:
-                    done = rec(neighbor, node, visited, collisions)
-                    if done:
-                        return True
-
-            if collisions[0] == 0:
-                return True
+        collisionCount: int = collisions
 
-            if node == parent:
-                return done
+        for node, parent in postOrder(self.node):
             parentDirection: Direction | None = parent.directionTo(node)
 
             if parentDirection is None:  # This happens in directed graphs
-                return done
+                continue
 
             n_neighbors: int = len(node)
 
             if n_neighbors not in (0, ALL_DIRECTIONS - 1):
-                rotation: Rotation = -1
+                # Every candidate is tried from where the node started
+                for rotation in (-1, 1):
+                    savepoint: int = self.journal.savepoint()
+                    if self._bend(node, parent, rotation):
+                        currentCollisions = self.getEmbedding().collisions
 
-                didUntangle = False
-                haveBend = False
-
-                # rotationCount: Rotation = 0
-                #
-                # toCheck: Tuple[Rotation, Rotation] = (-1, 2)
-                #
-                # rotation = -1
-                #
-                # tmpBest = collisions[0]
-                #
-                # tryAnother = False
-                #
-                # if bend(node, parent, rotation):
-                #     currentCollisions = countCollisions(node)
-                #
-                #     if currentCollisions == 0:
-                #         collisions[0] -= collisions[0] - currentCollisions
-                #         return True  # Done
-                #     elif currentCollisions < tmpBest:
-                #         tmpBest = currentCollisions
-                #
-                #     else:
-                #         rotation = 2
-
-                while not didUntangle and (rotation < 2):
-                    if rotation != 0 and bend(node, parent, rotation):
-                        currentCollisions = countCollisions(node)
-                        haveBend = True
-
-                        if currentCollisions == 0:
-                            # Why is python so evil... why cant i modify global
-                            # collisions...
-
-                            collisions[0] -= collisions[0] - currentCollisions
-                            # print("FOUND DONE")
-                            return True  # Done
-                        elif currentCollisions < collisions[0]:
-                            didUntangle = True
-                            collisions[0] -= collisions[0] - currentCollisions
-                            # print("FOUND")
+                        if currentCollisions < collisionCount:
+                            collisionCount = currentCollisions
+                            break
 
-                    rotation += 1
+                        self.journal.rollback(savepoint)
 
-                if haveBend and not didUntangle:
-                    bend(node, parent, -rotation)
-
-            return done
+            if collisionCount == 0:
+                break
 
-        visited: List[Node] = []
-        # print(collisions)
-        collisionCount = [collisions]
-        flattened: bool = rec(self.node, self.node, visited, collisionCount)
-        # print(collisionCount[0])
-        if collisionCount[0] == 0:
+        if collisionCount == 0:
             print("Fully converted to absolute space!")
 
-        elif collisionCount[0] < collisions:
+        elif collisionCount < collisions:
             print("Making progress")
 
-        elif (
-            not flattened and collisionCount[0] > 0
-        ):  # This is bad, the system cannot convert to 2D
+        else:  # This is bad, the system cannot convert to 2D
             # space, it is up to the user to fix collisions. This required deletions
             # of Nodes. I am not sure if this is a global error or if it can be
             # mitigated by simply going to a different node
@@ -1232,10 +2098,29 @@ class Engine:
 
         return True
 
-    def drawState(self):
-        self.update()
-        self.drawer()
+    def _bend(self, node: Node, pivot: Node, rotation: Rotation) -> bool:
+        """Bend node around pivot and follow the bend in the embedding, so the
+        collisions after it are known without counting them again
+
+        :param node: node to bend
+        :param pivot: node to bend around
+        :param rotation: rotation of the bend
+        :return: if bended
+        """
+        embedding: Embedding = self.getEmbedding()
+        since: int = node.getVersion()
+        savepoint: int = self.journal.savepoint()
+        if not bend(node, pivot, rotation, self.isCutVertex):
+            return False
+
+        embedding.rotate(node, pivot, rotation, since)
+
+        # Rolling back reverts the embedding once the bend itself is undone
+        self.journal.insert(savepoint, embedding.revert, embedding.changes)
 
+        return True
+
+    @journaled
     def untangle(self) -> bool:
         """Naive untanglement where backtracking is used together with DFS to
         bend around the network until no further collisions are present. This
@@ -1253,257 +2138,157 @@ class Engine:
 
         :return: status
         """
-        if self.mode == EngineMode.READ_ONLY:
-            return False
+        return finish(self.untangling())
 
-        collisions: int = countCollisions(self.node)  # This function costs a lot
+    def untangling(self) -> Generator[None, None, bool]:
+        """Untangle one Node per step, see untangle and maintain. The best
+        count so far is kept between steps.
 
-        if collisions == 0:
-            print("Nothing to untangle :)")
+        :return: status
+        """
+        if self.mode == EngineMode.READ_ONLY:
             return False
 
-        def rectifier(node: Node, parent: Node, args):
-            parentDirection: Direction | None = parent.directionTo(node)
+        yield from self._preparing()
 
-            if parentDirection is None:  # This happens in directed graphs
-                print("This should not happen")
-                return False
-
-            n_neighbors: int = len(node)
-
-            if n_neighbors not in (0, ALL_DIRECTIONS - 1):
-                didUntangle: bool = False
-
-                tmpBest = args["collisions"]
-
-                if bend(node, parent, -1):
-                    currentCollisions = countCollisions(node)
-                    if currentCollisions < tmpBest:
-                        tmpBest = currentCollisions
-                        didUntangle = True
-                    # elif currentCollisions > tmpBest:
-                    #     bend()
-
-                    if bend(node, parent, 2):
-                        currentCollisions = countCollisions(node)
-                        if currentCollisions < tmpBest:
-                            tmpBest = currentCollisions  # Done
-                        elif didUntangle and (currentCollisions > tmpBest):
-                            bend(node, parent, -2)  # Undo :/
-                        else:
-                            bend(node, parent, -1)
-                    else:
-                        if not didUntangle:
-                            bend(node, parent, 1)
-
-                else:  # Test only the other rotation
-                    if bend(node, parent, 1):
-                        currentCollisions = countCollisions(node)
-                        if currentCollisions < tmpBest:
-                            tmpBest = currentCollisions  # Done
-
-                        else:
-                            bend(node, parent, -1)
-
-                if tmpBest < args["collisions"]:
-                    args["collisions"] = tmpBest
-                    args["draw"]()
-                    import time
-
-                    time.sleep(0.3)
-
-                return args["collisions"] == 0
+        collisions: int = self.getEmbedding().collisions
 
+        if collisions == 0:
+            print("Nothing to untangle :)")
             return False
 
-        args = {"collisions": collisions, "draw": self.drawState}
-
         aNode: Node = self.node
 
         for i in range(10):
-            previousCollisionCount: int = args["collisions"]
-            done: bool = DFSWithCallbackAfter(aNode, aNode, [], rectifier, args)
+            previousCollisionCount: int = collisions
+
+            for node, parent in postOrder(aNode):
+                collisions = self._rectify(node, parent)
+                if collisions == 0:
+                    break
+
+                yield
 
-            if done:
+            if collisions == 0:
                 print("Fully converted to absolute space")
                 break
-            elif args["collisions"] < previousCollisionCount:
+            elif collisions < previousCollisionCount:
                 print("making progress")
             else:  # This is bad
                 print("Unable to convert to absolute space")
+                self._explainTangle()
                 break
         self.update()
 
         return True
-        errorCount = 0
 
-        # print(collisions)
-        collisionCount = [collisions]
+    @journaled
+    def solve(self, budget: float, seed: int = 0) -> Annealer | None:
+        """Untangle by simulated annealing, see Annealer. Unlike untangle it
+        keeps trying for as long as it is allowed to.
 
-        tested: List[Node] = []
-        print(args)
+        :param budget: seconds to spend
+        :param seed: random seed
+        :return: the annealer, with collisions over time. None if not allowed
+        """
+        return finish(self.solving(budget, seed))
 
-        visited: List[Node] = []
+    def solving(
+        self, budget: float, seed: int = 0
+    ) -> Generator[None, None, Annealer | None]:
+        """Anneal one move per step, see solve and maintain
 
-        while True and errorCount < 10:
-            visited = []
-            flattened: bool = DFSWithCallbackAfter(aNode, aNode, [], rectifier, args)
-            print(args)
-            break
-            # print(collisionCount[0])
-            if collisionCount[0] == 0:
-                print("Fully converted to absolute space!")
-                break
+        :param budget: seconds to spend
+        :param seed: random seed
+        :return: the annealer, with collisions over time. None if not allowed
+        """
+        if self.mode == EngineMode.READ_ONLY:
+            return None
 
-            elif collisionCount[0] < collisions:
-                collisions = collisionCount[0]
-                print("Making progress")
-
-            elif (
-                not flattened and collisionCount[0] > 0
-            ):  # This is bad, the system cannot convert to 2D
-                # space, it is up to the user to fix collisions. This required deletions
-                # of Nodes. I am not sure if this is a global error or if it can be
-                # mitigated by simply going to a different node
-
-                tested.append(aNode)
-
-                neighbors = list(aNode.values())
-                for neighbor in neighbors:
-                    if neighbor not in tested:
-                        aNode = neighbor
-                errorCount += 1
-        if errorCount >= 10:
-            print(
-                "Absolute-space error. Cannot perform automatic untanglement. User intervention is required!"
-            )
+        yield from self._preparing()
 
+        annealer: Annealer = Annealer(self, seed)
+        collisions: int = yield from annealer.solving(budget)
+        print(
+            f"Annealed {annealer.moves} moves, "
+            f"{annealer.history[0][1]} -> {collisions} collisions"
+        )
         self.update()
 
-        return True
-
-        def rec(node: Node, parent: Node, visited: List[Node], collisions: List[int]):
-            visited.append(node)
-            done: bool = False
-
-            for neighbor in node.values():
-                if neighbor not in visited:
-                    done = rec(neighbor, node, visited, collisions)
-                    if done:
-                        return True
+        return annealer
 
-            if collisions[0] == 0:
-                return True
+    def _rectify(self, node: Node, parent: Node) -> int:
+        """Bend node around parent the way that leaves the fewest collisions,
+        if any way leaves fewer than now
 
-            if node == parent:
-                return done
-            parentDirection: Direction | None = parent.directionTo(node)
+        :param node: node to bend
+        :param parent: node to bend around
+        :return: collisions after
+        """
+        collisions: int = self.getEmbedding().collisions
 
-            if parentDirection is None:  # This happens in directed graphs
-                return done
+        parentDirection: Direction | None = parent.directionTo(node)
 
-            n_neighbors: int = len(node)
+        if parentDirection is None:  # This happens in directed graphs
+            print("This should not happen")
+            return collisions
 
-            if n_neighbors not in (0, ALL_DIRECTIONS - 1):
-                didUntangle: bool = False
-
-                tmpBest = collisions[0]
-
-                if bend(node, parent, -1):
-                    currentCollisions = countCollisions(node)
-                    if currentCollisions < tmpBest:
-                        tmpBest = currentCollisions
-                        didUntangle = True
-                    # elif currentCollisions > tmpBest:
-                    #     bend()
-
-                    if bend(node, parent, 2):
-                        currentCollisions = countCollisions(node)
-                        if currentCollisions < tmpBest:
-                            tmpBest = currentCollisions  # Done
-                        elif didUntangle and (currentCollisions > tmpBest):
-                            bend(node, parent, -2)  # Undo :/
-                        else:
-                            bend(node, parent, -1)
-                    else:
-                        if not didUntangle:
-                            bend(node, parent, 1)
-
-                else:  # Test only the other rotation
-                    if bend(node, parent, 1):
-                        currentCollisions = countCollisions(node)
-                        if currentCollisions < tmpBest:
-                            tmpBest = currentCollisions  # Done
-
-                        else:
-                            bend(node, parent, -1)
-
-                if tmpBest < collisions[0]:
-                    collisions[0] -= collisions[0] - tmpBest
-
-                if collisions[0] == 0:
-                    return True
-
-            return done
-
-        visited: List[Node] = []
-        # print(collisions)
-        collisionCount = [collisions]
+        n_neighbors: int = len(node)
 
-        aNode: Node = self.node
-        errorCount = 0
+        if n_neighbors in (0, ALL_DIRECTIONS - 1):
+            return collisions
 
-        tested: List[Node] = []
+        best: Rotation | None = None
 
-        while True and errorCount < 10:
-            visited = []
-            flattened: bool = rec(aNode, aNode, visited, collisionCount)
-            # print(collisionCount[0])
-            if collisionCount[0] == 0:
-                print("Fully converted to absolute space!")
-                break
+        # Try both ways from where the node started, keep the best
+        for rotation in (-1, 1):
+            savepoint: int = self.journal.savepoint()
+            if self._bend(node, parent, rotation):
+                currentCollisions = self.getEmbedding().collisions
+                if currentCollisions < collisions:
+                    collisions = currentCollisions
+                    best = rotation
 
-            elif collisionCount[0] < collisions:
-                collisions = collisionCount[0]
-                print("Making progress")
-
-            elif (
-                not flattened and collisionCount[0] > 0
-            ):  # This is bad, the system cannot convert to 2D
-                # space, it is up to the user to fix collisions. This required deletions
-                # of Nodes. I am not sure if this is a global error or if it can be
-                # mitigated by simply going to a different node
-
-                tested.append(aNode)
-
-                neighbors = list(aNode.values())
-                for neighbor in neighbors:
-                    if neighbor not in tested:
-                        aNode = neighbor
-                errorCount += 1
-        if errorCount >= 10:
-            print(
-                "Absolute-space error. Cannot perform automatic untanglement. User intervention is required!"
-            )
+                self.journal.rollback(savepoint)
 
-        self.update()
+        if best is not None:
+            self._bend(node, parent, best)
 
-        return True
+        return collisions
 
+    @journaled
     def prune(self) -> None:
         """Prune network by connecting all nodes that may be connected"""
+        finish(self.pruning())
+
+    def pruning(self) -> Generator[None, None, None]:
+        """Prune one Node per step, see prune and maintain. The grid is the
+        one from when pruning started, so it stops if anything else changes
+        the network in between steps.
+        """
         if self.mode == EngineMode.READ_ONLY:
             return
 
-        def f(other: Node, position: Position) -> bool:
-            connectNearby(other, self.grid, position)
-            return False
+        links: int = self.node.getLinkVersion()
+        touched: Set[Node] = set()
+        grid: Grid = dict(self.grid)
 
-        visited: List[Node] = []
-        DFSWithCallbackAndPosition(
-            self.node, ORIGO, NodeState.VISITED, visited, f, INFINITY
-        )
-        cleanVisited(visited)
+        version: int = self.node.getVersion()
+        for other, position, _ in preOrder(
+            self.node, self.node.newEpoch(), INFINITY, None, ORIGO
+        ):
+            if other.getVersion() != version:  # Changed by someone else
+                print("The network changed, pruning stopped")
+                break
+
+            if connectNearby(other, grid, position):
+                touched.add(other)
+                touched.update(other.values())
+
+            version = other.getVersion()
+            yield
+
+        self.routes.repair(touched, links)
 
         # def f2(other: Node) -> bool:
         #     if other is self.node:
@@ -1517,9 +2302,7 @@ class Engine:
         #
         #     return False
         #
-        # visited: List[Node] = []
-        # DFSWithCallback(self.node, NodeState.VISITED, visited, f2, INFINITY)
-        # cleanVisited(visited)
+        # DFSWithCallback(self.node, self.node.newEpoch(), None, f2, INFINITY)
         self.update()
 
 
@@ -1562,7 +2345,7 @@ def traverse(node: Node, direction: Direction, grid: Grid, mode: EngineMode) ->
     if mode == EngineMode.LIMINAL:
         neighbor: Node | None = node[direction]
         if neighbor is None:
-            neighbor = Node()
+            neighbor = node.spawn()
             node.connect(direction, neighbor)
 
         return neighbor
@@ -1578,7 +2361,7 @@ def traverse(node: Node, direction: Direction, grid: Grid, mode: EngineMode) ->
 
     elif mode == EngineMode.NORMAL:
         # We can assume connect works, since no previous method worked
-        neighbor = Node()
+        neighbor = node.spawn()
         # Connect neighbor a number of times
         connectNearby(neighbor, grid, position)
         return neighbor
@@ -1587,3 +2370,48 @@ def traverse(node: Node, direction: Direction, grid: Grid, mode: EngineMode) ->
         node.log("Unable to traverse to anything")
 
         return node
+
+
+def createGrid(root: Node, width: int, height: int) -> Dict[Position, Node]:
+    """Build a filled width x height grid of connected Nodes where root is the
+    bottom left corner. New Nodes are spawned in the same backend as root.
+
+    :param root: bottom left Node
+    :param width: number of columns
+    :param height: number of rows
+    :return: the grid
+    """
+    grid: Dict[Position, Node] = {ORIGO: root}
+    for x in range(width):
+        for y in range(height):
+            position: Position = (x, y)
+            if position not in grid:
+                grid[position] = root.spawn()
+
+            node: Node = grid[position]
+            for direction in (Direction.WEST, Direction.SOUTH):
+                other: Node | None = grid.get(deltaPosition(direction, position))
+                if other is not None:
+                    node.connect(direction, other)
+
+    return grid
+
+
+def createCorridor(
+    root: Node, length: int, direction: Direction = Direction.EAST
+) -> Node:
+    """Build a straight corridor of connected Nodes starting at root. New Nodes
+    are spawned in the same backend as root.
+
+    :param root: first Node of the corridor
+    :param length: number of Nodes including root
+    :param direction: which way the corridor goes
+    :return: the last Node
+    """
+    node: Node = root
+    for _ in range(length - 1):
+        neighbor: Node = node.spawn()
+        node.connect(direction, neighbor)
+        node = neighbor
+
+    return node
@@ -0,0 +1,373 @@
+# Static analysis
+from __future__ import annotations
+from typing import Dict, List, Tuple
+from array import array
+from collections import OrderedDict
+
+import bisect
+import mmap
+import pickle
+import sqlite3
+import sys
+
+# Local package for Direction and Position logic
+from direction import ALL_DIRECTIONS, Rotation
+
+from node import Node, Data
+from store import LOCKED, NONE, NodeStore, StoreNode
+from worldfile import MappedStore, WorldHeader
+
+
+class Page:
+    """Rows of a PagedStore that are in memory, laid out like a NodeStore
+
+    :param neighbors: adjacency array of the rows
+    :param flags: lock bitfield
+    :param marks: traversal marks
+    :param data: user data of the rows that have any
+    """
+
+    __slots__ = ("neighbors", "flags", "marks", "data")
+
+    def __init__(self, size: int):
+        self.neighbors: array = array("i", (NONE,)) * (size * ALL_DIRECTIONS)
+        self.flags: bytearray = bytearray(size)
+        self.marks: array = array("q", (0,)) * size
+        self.data: Dict[int, Data] = {}
+
+    def isPinned(self) -> bool:
+        """Checks if any Node on the page is locked, so it stays in memory
+
+        :return: if pinned
+        """
+        return any(flag & LOCKED for flag in self.flags)
+
+
+class PagedStore(NodeStore):
+    """NodeStore that keeps only some of its Nodes in memory
+
+    Rows are grouped in pages of consecutive rows. Nodes are spawned in the
+    order they are walked into, so a page holds Nodes close to each other.
+    Pages are kept in memory in least recently used order, and once there are
+    more Nodes in memory than the budget allows, the pages used the longest
+    ago are written to an SQLite file and dropped. The engine keeps using the
+    neighborhood of the cursor, so what goes is what is far away. A page with
+    a locked Node stays in memory. Using a Node on a page that was dropped
+    reads the page back in.
+
+    Data on the Nodes is pickled along with their page.
+
+    A world file can be opened as it is, see openWorld. Pages that were never
+    used are then read from the file, so only the neighborhood the engine
+    explores is ever loaded, whatever the size of the world.
+
+    Usage:
+
+    >>> store = PagedStore(budget=100_000)
+    >>> engine = Engine(EngineMode.NORMAL, 10, store.new())
+    >>> store.hits, store.misses  # Pages found in memory, and read back in
+
+    :param budget: most Nodes to keep in memory, at least one page is kept
+    :param size: number of rows per page
+    :param path: file to keep dropped pages in, a temporary one by default
+    :param pages: pages in memory, least recently used first
+    :param hits: number of times a page was in memory
+    :param misses: number of times a page had to be read back in
+    :param evictions: number of times a page was written out and dropped
+    :param world: world file pages are read from the first time, if any
+    """
+
+    def __init__(self, budget: int = 100_000, size: int = 256, path: str = ""):
+        super().__init__()
+        self.budget: int = budget
+        self.size: int = size
+        self.count: int = 0
+        self.pages: OrderedDict[int, Page] = OrderedDict()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.world: MappedStore | None = None
+
+        # Nothing to recover after a crash, so no need to wait for the disk
+        self.database: sqlite3.Connection = sqlite3.connect(path)
+        self.database.execute("PRAGMA journal_mode = OFF")
+        self.database.execute("PRAGMA synchronous = OFF")
+        self.database.execute(
+            "CREATE TABLE IF NOT EXISTS pages (number INTEGER PRIMARY KEY,"
+            " neighbors BLOB, flags BLOB, marks BLOB, data BLOB)"
+        )
+
+    def __len__(self) -> int:
+        return self.count
+
+    @classmethod
+    def openWorld(
+        cls, filename: str, budget: int = 100_000, size: int = 256
+    ) -> Tuple[PagedStore, WorldHeader]:
+        """Open a world saved by saveWorld without reading it, see MappedStore.
+        The system is asked to read the file ahead in the background, so later
+        pages are in memory by the time they are used.
+
+        :param filename: world file
+        :param budget: most Nodes to keep in memory
+        :param size: number of rows per page
+        :return: the store, and where the engine that saved it stood
+        """
+        store: PagedStore = cls(budget, size)
+        store.world = MappedStore(filename)
+        store.count = len(store.world)
+        if hasattr(mmap, "MADV_WILLNEED"):
+            store.world.map.madvise(mmap.MADV_WILLNEED)
+
+        return store, store.world.header
+
+    def close(self) -> None:
+        """Close the file of dropped pages. Nodes of the store cannot be used
+        after this."""
+        self.database.close()
+        self.pages.clear()
+        if self.world is not None:
+            self.world.close()
+
+    def resident(self) -> int:
+        """Number of Nodes in memory
+
+        :return: number of rows on the pages in memory
+        """
+        return len(self.pages) * self.size
+
+    def nbytes(self) -> int:
+        """Size of the pages in memory
+
+        :return: number of bytes
+        """
+        return sum(
+            page.neighbors.itemsize * len(page.neighbors)
+            + len(page.flags)
+            + page.marks.itemsize * len(page.marks)
+            + sys.getsizeof(page.data)
+            for page in self.pages.values()
+        )
+
+    def snapshot(self) -> NodeStore:
+        """Copy every row as it is now into memory, pages read back in from
+        the file in one go"""
+        dropped: Dict[int, Tuple[bytes, bytes, bytes]] = {
+            number: (neighbors, flags, data)
+            for number, neighbors, flags, data in self.database.execute(
+                "SELECT number, neighbors, flags, data FROM pages"
+            )
+            if number not in self.pages
+        }
+
+        store: NodeStore = NodeStore()
+        for number in range(-(-self.count // self.size)):
+            used: int = min(self.size, self.count - number * self.size)
+            page: Page | None = self.pages.get(number)
+            if page is None and number not in dropped:  # Never used
+                page = self._fromWorld(number)
+
+            if page is None:
+                neighbors, flags, data = dropped[number]
+                store.neighbors.frombytes(neighbors[: 4 * used * ALL_DIRECTIONS])
+                store.flags.extend(flags[:used])
+                store.data.update(pickle.loads(data))
+            else:
+                store.neighbors.extend(page.neighbors[: used * ALL_DIRECTIONS])
+                store.flags.extend(page.flags[:used])
+                store.data.update(page.data)
+
+        store.marks = array("q", bytes(8 * self.count))
+
+        return store
+
+    def _page(self, index: int) -> Page:
+        """The page a row is on, read back in if needed
+
+        :param index: row
+        :return: page in memory
+        """
+        number: int = index // self.size
+        page: Page | None = self.pages.get(number)
+        if page is not None:
+            self.hits += 1
+            self.pages.move_to_end(number)
+            return page
+
+        self.misses += 1
+        dropped: Tuple[bytes, bytes, bytes, bytes] | None = self.database.execute(
+            "SELECT neighbors, flags, marks, data FROM pages WHERE number = ?",
+            (number,),
+        ).fetchone()
+
+        if dropped is None:
+            page = self._fromWorld(number)
+        else:
+            neighbors, flags, marks, data = dropped
+            page = Page(0)
+            page.neighbors.frombytes(neighbors)
+            page.flags = bytearray(flags)
+            page.marks.frombytes(marks)
+            page.data = pickle.loads(data)
+
+        self._keep(number, page)
+
+        return page
+
+    def _fromWorld(self, number: int) -> Page:
+        """A page read from the world file for the first time
+
+        :param number: page number
+        :return: the page, not kept yet
+        """
+        world: MappedStore | None = self.world
+        assert world is not None, "Page was never made"
+
+        begin: int = number * self.size
+        end: int = min(begin + self.size, len(world))
+        page: Page = Page(self.size)
+        page.neighbors[: (end - begin) * ALL_DIRECTIONS] = array(
+            "i", world.neighbors[begin * ALL_DIRECTIONS : end * ALL_DIRECTIONS]
+        )
+        page.flags[: end - begin] = world.flags[begin:end]
+        page.data = world.readData(begin, end)
+
+        return page
+
+    def _keep(self, number: int, page: Page) -> None:
+        """Keep a page in memory, and drop the ones used the longest ago if
+        there are too many
+
+        :param number: page number
+        :param page: the page
+        """
+        self.pages[number] = page
+
+        excess: int = len(self.pages) - max(1, self.budget // self.size)
+        if excess <= 0:
+            return
+
+        dropped: List[int] = []
+        for other, candidate in self.pages.items():
+            if len(dropped) == excess or other == number:
+                break
+
+            if not candidate.isPinned():
+                dropped.append(other)
+
+        for other in dropped:
+            candidate = self.pages.pop(other)
+            self.database.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                (
+                    other,
+                    candidate.neighbors.tobytes(),
+                    bytes(candidate.flags),
+                    candidate.marks.tobytes(),
+                    pickle.dumps(candidate.data, pickle.HIGHEST_PROTOCOL),
+                ),
+            )
+            self.evictions += 1
+
+    def new(self, data: Data = None) -> StoreNode:
+        index: int = self.count
+        number: int = index // self.size
+        if index % self.size == 0:
+            self._keep(number, Page(self.size))
+
+        self.count += 1
+        if data is not None:
+            self._page(index).data[index] = data
+
+        if self.log is not None:
+            self.log.changed(index, data is not None)
+
+        return self.node(index)
+
+    # ---- Row accessors ----
+    def neighbor(self, index: int, slot: int) -> StoreNode | None:
+        page: Page = self._page(index)
+        other: int = page.neighbors[index % self.size * ALL_DIRECTIONS + slot]
+        if other == NONE:
+            return None
+
+        return self.node(other)
+
+    def setNeighbor(self, index: int, slot: int, node: Node | None) -> None:
+        other: int = NONE
+        if node is not None:
+            assert (
+                isinstance(node, StoreNode) and node._store is self
+            ), "Can only connect Nodes from the same store"
+            other = node._index
+
+        neighbors: array = self._page(index).neighbors
+        offset: int = index % self.size * ALL_DIRECTIONS + slot
+        if neighbors[offset] != other:
+            self.links += 1
+
+        neighbors[offset] = other
+        self.version += 1
+
+        if self.log is not None:
+            self.log.changed(index)
+
+    def swap(self, index: int, a: int, b: int) -> None:
+        neighbors: array = self._page(index).neighbors
+        offset: int = index % self.size * ALL_DIRECTIONS
+        neighbors[offset + a], neighbors[offset + b] = (
+            neighbors[offset + b],
+            neighbors[offset + a],
+        )
+        self.version += 1
+
+        if self.log is not None:
+            self.log.changed(index)
+
+    def row(self, index: int) -> array:
+        offset: int = index % self.size * ALL_DIRECTIONS
+        return self._page(index).neighbors[offset : offset + ALL_DIRECTIONS]
+
+    def rotate(self, index: int, rotation: Rotation) -> None:
+        neighbors: array = self._page(index).neighbors
+        offset: int = index % self.size * ALL_DIRECTIONS
+        old: array = neighbors[offset : offset + ALL_DIRECTIONS]
+        for i in range(ALL_DIRECTIONS):
+            neighbors[offset + (i + rotation) % ALL_DIRECTIONS] = old[i]
+        self.version += 1
+
+        if self.log is not None:
+            self.log.changed(index)
+
+    def isLocked(self, index: int) -> bool:
+        return bool(self._page(index).flags[index % self.size] & LOCKED)
+
+    def setLocked(self, index: int, locked: bool) -> None:
+        flags: bytearray = self._page(index).flags
+        if locked:
+            flags[index % self.size] |= LOCKED
+        else:
+            flags[index % self.size] &= ~LOCKED
+
+        if self.log is not None:
+            self.log.changed(index)
+
+    def getMark(self, index: int) -> int:
+        return self._page(index).marks[index % self.size]
+
+    def setMark(self, index: int, epoch: int) -> None:
+        self._page(index).marks[index % self.size] = epoch
+
+    def getData(self, index: int) -> Data:
+        return self._page(index).data.get(index)
+
+    def setData(self, index: int, data: Data) -> None:
+        page: Page = self._page(index)
+        if data is None:
+            page.data.pop(index, None)
+        else:
+            page.data[index] = data
+
+        if self.log is not None:
+            self.log.changed(index, True)
@@ -0,0 +1,158 @@
+# Static analysis
+from __future__ import annotations
+from typing import Dict, Generator, List, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+
+import os
+
+from direction import Rotation
+from node import Engine, EngineMode, Node, bend, finish, journaled
+from store import NodeStore
+from articulation import ArticulationIndex
+from embedding import Embedding
+from journal import Journal
+
+# (change in collisions, row of the Node, row of the pivot, rotation)
+Score = Tuple[int, int, int, Rotation]
+
+
+def bendable(root: Node, cuts: ArticulationIndex) -> List[Tuple[Node, Node]]:
+    """Nodes that can be bent around the Node they are first reached from, in
+    breadth first order
+
+    :param root: Node to start from
+    :param cuts: index of the cut vertices of the network
+    :return: every such Node with the Node to bend around
+    """
+    seen: Dict[Node, Node | None] = {root: None}
+    order: List[Node] = [root]
+    candidates: List[Tuple[Node, Node]] = []
+    for node in order:
+        for neighbor in node.values():
+            if neighbor in seen:
+                continue
+
+            seen[neighbor] = node
+            order.append(neighbor)
+            if (
+                not neighbor.isLeaf()
+                and not neighbor.isLocked()
+                and cuts.isCut(neighbor)
+            ):
+                candidates.append((neighbor, node))
+
+    return candidates
+
+
+def scoreBends(store: NodeStore, share: int, shares: int) -> List[Score]:
+    """Try every bend of a share of the candidates in a snapshot, one after
+    another from the same state. Meant to run in a worker process.
+
+    :param store: snapshot, see NodeStore.fromGraph, laid out from row 0
+    :param share: which share to try
+    :param shares: number of shares the candidates are split in
+    :return: the bends that leave fewer collisions
+    """
+    root: Node = store.node(0)
+    cuts = ArticulationIndex()
+    cuts.build(root)
+    embedding = Embedding(root)
+
+    scores: List[Score] = []
+    with Journal() as journal:
+        for node, pivot in bendable(root, cuts)[share::shares]:
+            for rotation in (-1, 1, 2):
+                since: int = root.getVersion()
+                savepoint: int = journal.savepoint()
+                if not bend(node, pivot, rotation, cuts.isCut):
+                    continue
+
+                delta: int = embedding.rotate(node, pivot, rotation, since)
+                journal.insert(savepoint, embedding.revert, embedding.changes)
+                journal.rollback(savepoint)
+
+                if delta < 0:
+                    scores.append((delta, node._index, pivot._index, rotation))
+
+    return scores
+
+
+def untanglingInParallel(
+    engine: Engine, workers: int | None = None, rounds: int = 10
+) -> Generator[None, None, bool]:
+    """Untangle in rounds, scoring candidate bends in worker processes, see
+    Engine.maintain. Every round the network is copied to a NodeStore, the
+    workers each try a share of the bends on their copy, and the best ones are
+    applied to the network as long as they still help. Steps wait for the
+    workers a moment at a time.
+
+    :param engine: engine of the network, untangled from the current Node
+    :param workers: number of processes, one per core by default
+    :param rounds: most rounds to make
+    :return: status
+    """
+    if engine.mode == EngineMode.READ_ONLY:
+        return False
+
+    yield from engine._preparing()
+
+    collisions: int = engine.getEmbedding().collisions
+    if collisions == 0:
+        print("Nothing to untangle :)")
+        return False
+
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(workers)
+    try:
+        for _ in range(rounds):
+            previous: int = collisions
+            store, rows = NodeStore.fromGraph(engine.node)
+            nodes: List[Node] = list(rows)  # By row
+
+            futures: List[Future] = [
+                pool.submit(scoreBends, store, share, workers)
+                for share in range(workers)
+            ]
+            while wait(futures, timeout=0.001).not_done:
+                yield
+
+            # The best first, each tried again on what the others left
+            for _, node, pivot, rotation in sorted(
+                score for future in futures for score in future.result()
+            ):
+                savepoint: int = engine.journal.savepoint()
+                if engine._bend(nodes[node], nodes[pivot], rotation):
+                    if engine.getEmbedding().collisions < collisions:
+                        collisions = engine.getEmbedding().collisions
+                    else:
+                        engine.journal.rollback(savepoint)
+
+                yield
+
+            if collisions == 0:
+                print("Fully converted to absolute space")
+                break
+            elif collisions < previous:
+                print("making progress")
+            else:  # This is bad
+                print("Unable to convert to absolute space")
+                engine._explainTangle()
+                break
+
+    finally:  # Stopped halfway, the workers are not waited for
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    engine.update()
+
+    return True
+
+
+@journaled
+def untangleInParallel(engine: Engine, workers: int | None = None) -> bool:
+    """Untangle at once, see untanglingInParallel
+
+    :param engine: engine of the network
+    :param workers: number of processes, one per core by default
+    :return: status
+    """
+    return finish(untanglingInParallel(engine, workers))
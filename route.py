@@ -0,0 +1,156 @@
+# Static analysis
+from __future__ import annotations
+from typing import Iterable, Dict, List, Set, Tuple, TYPE_CHECKING
+from collections import deque
+
+import heapq
+import itertools
+
+if TYPE_CHECKING:
+    from node import Node
+
+
+class RouteTree:
+    """Shortest path tree rooted at a Node
+
+    Every Node reachable from the root knows its distance to the root and the
+    neighbor one step closer, so the route home is a walk along the parents.
+    The children of a Node are the neighbors that have it as parent, so no
+    extra bookkeeping is needed for them.
+
+    Rotations do not change who is connected to whom, so only connecting and
+    disconnecting Nodes affects the tree. After such a change the tree is
+    repaired locally around the Nodes involved, see repair.
+
+    Usage:
+
+    >>> routes = RouteTree(engine.start)
+    >>> routes.route(engine.node)  # Route from engine.node to the root
+
+    :param root: Node every route leads to
+    :param build: build right away, otherwise the tree is empty and stale
+    :param parent: the neighbor one step closer to root for every Node
+    :param distance: number of steps to root for every Node
+    :param version: link version the tree is valid for, see
+        ``Node.getLinkVersion``
+    """
+
+    def __init__(self, root: Node, build: bool = True):
+        self.root: Node = root
+        self.parent: Dict[Node, Node | None] = {}
+        self.distance: Dict[Node, int] = {}
+        self.version: int | None = None
+        if build:
+            self.build()
+
+    def __contains__(self, node: Node) -> bool:
+        return node in self.distance
+
+    def __len__(self) -> int:
+        return len(self.distance)
+
+    def build(self) -> None:
+        """Build the whole tree from scratch with a breadth first search"""
+        self.parent: Dict[Node, Node | None] = {self.root: None}
+        self.distance: Dict[Node, int] = {self.root: 0}
+
+        frontier: deque[Node] = deque([self.root])
+        while frontier:
+            node: Node = frontier.popleft()
+            steps: int = self.distance[node] + 1
+            for neighbor in node.values():
+                if neighbor not in self.distance:
+                    self.parent[neighbor] = node
+                    self.distance[neighbor] = steps
+                    frontier.append(neighbor)
+
+        self.version = self.root.getLinkVersion()
+
+    def repair(self, nodes: Iterable[Node], since: int) -> None:
+        """Repair the tree after connections changed between the given Nodes.
+        Both ends of every changed edge must be given, removed Nodes included.
+
+        Nodes that lost the edge to their parent take their whole subtree with
+        them. These are reattached through the best neighbor left outside, and
+        the distances are then spread, like Dijkstra, to every Node that got
+        closer. Nothing else is visited.
+
+        :param nodes: Nodes that were connected or disconnected
+        :param since: link version from before the changes, the tree is left
+        stale if it was not up to date by then
+        """
+        if since != self.version:
+            self.version = None  # Built from scratch once needed
+            return
+
+        touched: Set[Node] = set(nodes)
+
+        # Subtrees that lost their way home
+        orphans: List[Node] = []
+        for node in touched:
+            parent: Node | None = self.parent.get(node)
+            if node in self.distance and node != self.root:
+                if parent is None or node not in parent:
+                    orphans.append(node)
+
+        detached: Set[Node] = set()
+        while orphans:
+            node = orphans.pop()
+            if node in detached:
+                continue
+
+            detached.add(node)
+            for neighbor in node.values():
+                if self.parent.get(neighbor) == node:
+                    orphans.append(neighbor)
+
+        for node in detached:
+            del self.distance[node]
+            del self.parent[node]
+
+        # Nodes without distance start from their best neighbor left, the
+        # rest may bring their neighbors closer
+        order = itertools.count()  # Nodes do not compare
+        queue: List[Tuple[int, int, Node, Node]] = []
+        for node in detached | touched:
+            if node in self.distance:
+                steps: int = self.distance[node] + 1
+                for neighbor in node.values():
+                    if steps < self.distance.get(neighbor, steps + 1):
+                        heapq.heappush(queue, (steps, next(order), neighbor, node))
+                continue
+
+            for neighbor in node.values():
+                if neighbor in self.distance and node in neighbor:
+                    steps = self.distance[neighbor] + 1
+                    heapq.heappush(queue, (steps, next(order), node, neighbor))
+
+        while queue:
+            steps, _, node, parent = heapq.heappop(queue)
+            if steps >= self.distance.get(node, steps + 1):
+                continue
+
+            self.distance[node] = steps
+            self.parent[node] = parent
+            for neighbor in node.values():
+                if steps + 1 < self.distance.get(neighbor, steps + 2):
+                    heapq.heappush(queue, (steps + 1, next(order), neighbor, node))
+
+        self.version = self.root.getLinkVersion()
+
+    def route(self, node: Node) -> List[Node] | None:
+        """Shortest route from a Node to the root
+
+        :param node: Node to start from
+        :return: Nodes from node to root, both included. None if unreachable
+        """
+        if node not in self.distance:
+            return None
+
+        path: List[Node] = []
+        other: Node | None = node
+        while other is not None:
+            path.append(other)
+            other = self.parent[other]
+
+        return path
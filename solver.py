@@ -0,0 +1,201 @@
+# Static analysis
+from __future__ import annotations
+from typing import Dict, Generator, List, Tuple, TYPE_CHECKING
+from collections import deque
+
+import math
+import random
+import time
+
+from direction import Position, Rotation
+
+if TYPE_CHECKING:
+    from embedding import Embedding
+    from node import Engine, Node
+
+
+class Annealer:
+    """Untangles a network by simulated annealing over bends
+
+    A move bends a cut vertex around the neighbor it is reached from, so the
+    Nodes further out turn with it. The embedding follows the bend and tells
+    the change in collisions right away. A move is kept if it does not make
+    things worse, otherwise only by chance, the more likely the hotter it is.
+    Rejected moves are rolled back through the journal, and once the time is
+    up the network is rolled back to the best state that was found. Whatever
+    else changes the network in between steps is kept, the best state is
+    looked for from there on.
+
+    The temperature cools down from hot to cold over the budget, which counts
+    the time spent solving only, so it may be run a slice at a time.
+
+    Usage:
+
+    >>> annealer = Annealer(engine, seed=1)
+    >>> for _ in annealer.solving(5.0):  # One move per step
+    ...     pass
+    >>> annealer.history  # Collisions over time
+
+    :param engine: engine of the network, solved from the current Node
+    :param seed: random seed
+    :param hot: temperature to start at, in collisions
+    :param cold: temperature to end at
+    :param history: seconds spent and collisions, whenever a new best was found
+    :param moves: number of moves tried
+    :param parent: Node every Node is first reached from
+    :param candidates: Nodes that may be bent, with the Node to bend around
+    :param nodes: every Node, to choose from
+    """
+
+    focus: float = 0.8  # How often to start from a Node in a collision
+    samples: int = 100  # Nodes to look at for one in a collision
+    settle: float = 0.3  # Chance to stop at every candidate on the way to the root
+
+    def __init__(
+        self, engine: Engine, seed: int = 0, hot: float = 1.0, cold: float = 0.05
+    ):
+        self.engine: Engine = engine
+        self.random: random.Random = random.Random(seed)
+        self.hot: float = hot
+        self.cold: float = cold
+        self.history: List[Tuple[float, int]] = []
+        self.moves: int = 0
+
+        self.parent: Dict[Node, Node | None] = {}
+        self.candidates: Dict[Node, Node] = {}
+        self.nodes: List[Node] = []
+
+    def _explore(self) -> None:
+        """Find the Node every Node is first reached from, and the cut
+        vertices that can be bent around it, so the Nodes bent are the ones
+        further out
+        """
+        engine: Engine = self.engine
+        root: Node = engine.node
+
+        self.parent = {root: None}
+        self.candidates = {}
+        frontier: deque[Node] = deque([root])
+        while frontier:
+            node: Node = frontier.popleft()
+            for neighbor in node.values():
+                if neighbor in self.parent:
+                    continue
+
+                self.parent[neighbor] = node
+                frontier.append(neighbor)
+                if (
+                    not neighbor.isLeaf()
+                    and not neighbor.isLocked()
+                    and engine.isCutVertex(neighbor)
+                ):
+                    self.candidates[neighbor] = node
+
+        self.nodes = list(self.parent)
+
+    def _choose(self, embedding: Embedding) -> Node | None:
+        """Choose a Node to bend, usually a little closer to the root than a
+        Node in a collision, so the collision may be moved out of the way
+
+        :return: candidate. None if none was found on the way
+        """
+        node: Node | None = None
+        if self.random.random() < self.focus:
+            for _ in range(self.samples):
+                other: Node = self.random.choice(self.nodes)
+                position: Position | None = embedding.place.get(other)
+                if position is not None and embedding.taken[position] > 1:
+                    node = other
+                    break
+
+        if node is None:  # Anywhere
+            node = self.random.choice(self.nodes)
+
+        # A few steps closer to the root, the fewer the more likely
+        chosen: Node | None = None
+        while node is not None:
+            if node in self.candidates:
+                chosen = node
+                if self.random.random() < self.settle:
+                    break
+
+            node = self.parent[node]
+
+        return chosen
+
+    def solving(self, budget: float) -> Generator[None, None, int]:
+        """Anneal for a while, one move per step
+
+        :param budget: seconds to spend
+        :return: collisions left
+        """
+        engine: Engine = self.engine
+        collisions: int = engine.getEmbedding().collisions
+        best: int = collisions
+        spent: float = 0.0
+        self.history.append((spent, best))
+
+        self._explore()
+        rotations: List[Rotation] = [-1, 1, 2]
+
+        engine.journal.begin()
+        try:
+            bestSavepoint: int = engine.journal.savepoint()
+            resumed: float = time.perf_counter()
+
+            while self.candidates and best > 0 and spent < budget:
+                temperature: float = self.hot * (self.cold / self.hot) ** (
+                    spent / budget
+                )
+
+                embedding: Embedding = engine.getEmbedding()
+                node: Node | None = self._choose(embedding)
+                savepoint: int = engine.journal.savepoint()
+                if node is not None and engine._bend(
+                    node, self.candidates[node], self.random.choice(rotations)
+                ):
+                    self.moves += 1
+                    embedding = engine.getEmbedding()
+
+                    if embedding.history[-1][3] is not None:
+                        # Laid out from scratch, something else hangs on the
+                        # Nodes further out. Too costly to try again
+                        engine.journal.rollback(savepoint)
+                        del self.candidates[node]
+
+                    else:
+                        delta: int = embedding.collisions - collisions
+                        if delta <= 0 or self.random.random() < math.exp(
+                            -delta / temperature
+                        ):
+                            collisions = embedding.collisions
+
+                        else:
+                            engine.journal.rollback(savepoint)
+
+                now: float = time.perf_counter()
+                spent += now - resumed
+                resumed = now
+
+                if collisions < best:
+                    best = collisions
+                    bestSavepoint = engine.journal.savepoint()
+                    self.history.append((spent, best))
+
+                mark: int = engine.journal.savepoint()
+                yield
+                resumed = time.perf_counter()
+                collisions = engine.getEmbedding().collisions  # If moved since
+
+                if engine.journal.savepoint() != mark:
+                    # Changed in between, rolling back would take that too
+                    best = collisions
+                    bestSavepoint = engine.journal.savepoint()
+                    self._explore()
+
+            engine.journal.rollback(bestSavepoint)
+
+        finally:
+            engine.journal.end()
+
+        return best
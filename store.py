@@ -0,0 +1,402 @@
+# Static analysis
+from __future__ import annotations
+from typing import Generator, Dict, Tuple, List, TYPE_CHECKING
+from array import array
+
+import sys
+
+# Local package for Direction and Position logic
+from direction import Rotation, Direction, ALL_DIRECTIONS
+
+from node import Node, Data
+from journal import Journal
+from traversal import INFINITY, preOrder
+
+if TYPE_CHECKING:
+    from worldlog import WriteAheadLog
+
+NONE: int = -1  # Adjacency value for a missing neighbor
+
+LOCKED: int = 0b001  # Flag bit for a locked Node
+
+
+class NodeStore:
+    """Struct-of-arrays backend for Nodes
+
+    Every Node is a row in a set of flat arrays instead of a Python object:
+
+    * ``neighbors`` int32 adjacency array of shape ``[N, ALL_DIRECTIONS]``
+      where a missing neighbor is ``NONE``
+    * ``flags`` one byte per Node holding the lock bit
+    * ``marks`` traversal epoch per Node, see ``Node.newEpoch``
+    * ``data`` side table holding user data for the few Nodes that have any
+
+    Nodes are handed out as thin ``StoreNode`` handles created on demand. Two
+    handles to the same row compare and hash equal, so handles can be dropped
+    and recreated freely.
+
+    Usage:
+
+    >>> store = NodeStore()
+    >>> engine = Engine(EngineMode.NORMAL, 10, store.new())
+
+    :param neighbors: adjacency array
+    :param flags: lock bitfield
+    :param marks: traversal marks
+    :param data: sparse user data
+    :param epoch: generation counter for traversals of this store
+    :param version: bumped on every change of structure, see ``Node.getVersion``
+    :param links: bumped on every change of connections, see
+        ``Node.getLinkVersion``
+    :param log: log told about every change, if any, see WriteAheadLog
+    """
+
+    def __init__(self):
+        self.neighbors: array = array("i")
+        self.flags: bytearray = bytearray()
+        self.marks: array = array("q")
+        self.data: Dict[int, Data] = {}
+
+        self.epoch: int = 0
+        self.version: int = 0
+        self.links: int = 0
+
+        self.log: WriteAheadLog | None = None
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    @classmethod
+    def fromGraph(
+        cls, root: Node, *others: Node
+    ) -> Tuple[NodeStore, Dict[Node, int]]:
+        """Copy the network root lives in into a new store, in breadth first
+        order. The copy is compact and pickles as a few flat arrays, so it is
+        cheap to hand to other processes.
+
+        :param root: Node to copy from, it ends up on row 0
+        :param others: more Nodes to copy from at the same time, right after
+            root, like ones that may not be connected to it
+        :return: the copy, and the row of every Node copied
+        """
+        store: NodeStore = cls()
+        rows: Dict[Node, int] = {root: 0}
+        order: List[Node] = [root]
+        for other in others:
+            if other not in rows:
+                rows[other] = len(order)
+                order.append(other)
+
+        for node in order:
+            for neighbor in node.values():
+                if neighbor not in rows:
+                    rows[neighbor] = len(order)
+                    order.append(neighbor)
+
+        store.neighbors = array("i", (NONE,)) * (len(order) * ALL_DIRECTIONS)
+        store.flags = bytearray(len(order))
+        store.marks = array("q", (0,)) * len(order)
+        for row, node in enumerate(order):
+            offset: int = row * ALL_DIRECTIONS
+            for direction, neighbor in node.items():
+                store.neighbors[offset + direction.value] = rows[neighbor]
+
+            if node.isLocked():
+                store.flags[row] = LOCKED
+
+            data: Data = node.getData()
+            if data is not None:
+                store.data[row] = data
+
+        return store, rows
+
+    def snapshot(self) -> NodeStore:
+        """Copy every row as it is now, keeping their numbers. Unlike
+        fromGraph nothing is walked, the arrays are copied as they are.
+
+        :return: the copy, a plain NodeStore
+        """
+        store: NodeStore = NodeStore()
+        store.neighbors = array("i", self.neighbors.tobytes())
+        store.flags = bytearray(self.flags)
+        store.marks = array("q", bytes(8 * len(store.flags)))
+        store.data = dict(self.data)
+
+        return store
+
+    def new(self, data: Data = None) -> StoreNode:
+        """Allocate a new Node in the store
+
+        :param data: optional Data to store on Node
+        :return: handle to the new Node
+        """
+        index: int = len(self.flags)
+        self.neighbors.extend((NONE,) * ALL_DIRECTIONS)
+        self.flags.append(0)
+        self.marks.append(0)
+        if data is not None:
+            self.data[index] = data
+
+        if self.log is not None:
+            self.log.changed(index, data is not None)
+
+        return self.node(index)
+
+    def node(self, index: int) -> StoreNode:
+        """Get the handle for a Node
+
+        :param index: row of the Node
+        :return: handle
+        """
+        return StoreNode(self, index)
+
+    def nbytes(self) -> int:
+        """Size of the arrays backing the store
+
+        :return: number of bytes
+        """
+        return (
+            self.neighbors.itemsize * len(self.neighbors)
+            + len(self.flags)
+            + self.marks.itemsize * len(self.marks)
+            + sys.getsizeof(self.data)
+        )
+
+    # ---- Row accessors ----
+    def neighbor(self, index: int, slot: int) -> StoreNode | None:
+        other: int = self.neighbors[index * ALL_DIRECTIONS + slot]
+        if other == NONE:
+            return None
+
+        return self.node(other)
+
+    def setNeighbor(self, index: int, slot: int, node: Node | None) -> None:
+        other: int = NONE
+        if node is not None:
+            assert (
+                isinstance(node, StoreNode) and node._store is self
+            ), "Can only connect Nodes from the same store"
+            other = node._index
+
+        offset: int = index * ALL_DIRECTIONS + slot
+        if self.neighbors[offset] != other:
+            self.links += 1
+
+        self.neighbors[offset] = other
+        self.version += 1
+
+        if self.log is not None:
+            self.log.changed(index)
+
+    def swap(self, index: int, a: int, b: int) -> None:
+        offset: int = index * ALL_DIRECTIONS
+        neighbors: array = self.neighbors
+        neighbors[offset + a], neighbors[offset + b] = (
+            neighbors[offset + b],
+            neighbors[offset + a],
+        )
+        self.version += 1
+
+        if self.log is not None:
+            self.log.changed(index)
+
+    def row(self, index: int) -> array:
+        """Copy of the adjacency row for a Node
+
+        :param index: row of the Node
+        :return: ALL_DIRECTIONS neighbor indices
+        """
+        offset: int = index * ALL_DIRECTIONS
+        return self.neighbors[offset : offset + ALL_DIRECTIONS]
+
+    def rotate(self, index: int, rotation: Rotation) -> None:
+        offset: int = index * ALL_DIRECTIONS
+        old: array = self.neighbors[offset : offset + ALL_DIRECTIONS]
+        for i in range(ALL_DIRECTIONS):
+            self.neighbors[offset + (i + rotation) % ALL_DIRECTIONS] = old[i]
+        self.version += 1
+
+        if self.log is not None:
+            self.log.changed(index)
+
+    def isLocked(self, index: int) -> bool:
+        return bool(self.flags[index] & LOCKED)
+
+    def setLocked(self, index: int, locked: bool) -> None:
+        if locked:
+            self.flags[index] |= LOCKED
+        else:
+            self.flags[index] &= ~LOCKED
+
+        if self.log is not None:
+            self.log.changed(index)
+
+    def getMark(self, index: int) -> int:
+        return self.marks[index]
+
+    def setMark(self, index: int, epoch: int) -> None:
+        self.marks[index] = epoch
+
+    def newEpoch(self) -> int:
+        self.epoch += 1
+        return self.epoch
+
+    def getData(self, index: int) -> Data:
+        return self.data.get(index)
+
+    def setData(self, index: int, data: Data) -> None:
+        if data is None:
+            self.data.pop(index, None)
+        else:
+            self.data[index] = data
+
+        if self.log is not None:
+            self.log.changed(index, True)
+
+
+class StoreNode(Node):
+    """Thin handle to a Node living inside a NodeStore
+
+    Behaves like a regular Node, but all state is kept in the store.
+
+    :param store: the NodeStore owning this Node
+    :param index: row in the store, doubles as Node ID
+    """
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store: NodeStore, index: int):
+        self._store: NodeStore = store
+        self._index: int = index
+
+    # ---- Backing fields ----
+    @property
+    def _data(self) -> Data:
+        return self._store.getData(self._index)
+
+    @_data.setter
+    def _data(self, data: Data) -> None:
+        self._store.setData(self._index, data)
+
+    @property
+    def _neighbors(self) -> List[Node | None]:
+        store: NodeStore = self._store
+        return [store.neighbor(self._index, i) for i in range(ALL_DIRECTIONS)]
+
+    @property
+    def locked(self) -> bool:
+        return self._store.isLocked(self._index)
+
+    @locked.setter
+    def locked(self, locked: bool) -> None:
+        self._store.setLocked(self._index, locked)
+
+    @property
+    def mark(self) -> int:
+        return self._store.getMark(self._index)
+
+    @mark.setter
+    def mark(self, epoch: int) -> None:
+        self._store.setMark(self._index, epoch)
+
+    # ---- Object overrides ----
+    def __getitem__(self, direction: Direction) -> Node | None:
+        return self._store.neighbor(self._index, direction.value)
+
+    def __setitem__(self, direction: Direction, node: Node | None) -> None:
+        journal: Journal | None = Journal.active
+        if journal is not None:
+            old: Node | None = self[direction]
+            if old != node:
+                journal.record(self.__setitem__, direction, old)
+
+        self._store.setNeighbor(self._index, direction.value, node)
+
+    def __eq__(self, obj: object) -> bool:
+        return (
+            isinstance(obj, StoreNode)
+            and obj._index == self._index
+            and obj._store is self._store
+        )
+
+    def __hash__(self) -> int:
+        return self._index
+
+    def __reduce__(self) -> Tuple:
+        return (self._store.node, (self._index,))
+
+    # ---- Helper Functions ----
+    def keys(self) -> Generator[Direction, None, None]:
+        for i, other in enumerate(self._store.row(self._index)):
+            if other != NONE:
+                yield Direction(i)
+
+    def values(self) -> Generator[Node, None, None]:
+        store: NodeStore = self._store
+        for other in store.row(self._index):
+            if other != NONE:
+                yield store.node(other)
+
+    def items(self) -> Generator[Tuple[Direction, Node], None, None]:
+        store: NodeStore = self._store
+        for i, other in enumerate(store.row(self._index)):
+            if other != NONE:
+                yield (Direction(i), store.node(other))
+
+    # ---- Graph Functions ----
+    def swap(self, a: Direction, b: Direction) -> None:
+        journal: Journal | None = Journal.active
+        if journal is not None:
+            journal.record(self.swap, a, b)
+
+        self._store.swap(self._index, a.value, b.value)
+
+    def rotate(self, rotation: Rotation) -> None:
+        rotation %= ALL_DIRECTIONS
+        if rotation == 0:
+            self.log("Will not rotate when not needed")
+            return
+
+        journal: Journal | None = Journal.active
+        if journal is not None:
+            journal.record(self.rotate, -rotation)
+
+        self._store.rotate(self._index, rotation)
+
+    def rotateAll(self, rotation: Rotation, ignore: Node | None = None) -> None:
+        """Rotate all Nodes reachable from this Node by rotating their rows in
+        place, in O(N), and journaled as one step like Node.rotateAll
+
+        Rows have no frames: the rows are what the world file, the log, the
+        pages and the snapshots store and read as they are, so a turn kept
+        aside would have to be applied on every one of those paths.
+
+        :param rotation: how to rotate
+        :param ignore: Node to leave as is, Nodes behind it are not reached
+        """
+        rotation %= ALL_DIRECTIONS
+        if rotation == 0:
+            return
+
+        journal: Journal | None = Journal.active
+        if journal is not None:
+            journal.record(self.rotateAll, -rotation, ignore)
+
+        store: NodeStore = self._store
+        for other, _, _ in preOrder(self, self.newEpoch(), INFINITY, ignore):
+            store.rotate(other._index, rotation)
+
+    def normalize(self) -> None:
+        pass  # Rows always read the way they are stored
+
+    def newEpoch(self) -> int:
+        return self._store.newEpoch()
+
+    def getVersion(self) -> int:
+        return self._store.version
+
+    def getLinkVersion(self) -> int:
+        return self._store.links
+
+    def spawn(self, data: Data = None) -> Node:
+        return self._store.new(data)
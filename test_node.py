@@ -0,0 +1,1016 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# File: test_node.py
+# Author: Irreq
+# Date: 17/10-2026
+
+import base64
+import os
+import random
+import sys
+import tempfile
+
+from node import *
+from articulation import ArticulationIndex
+from embedding import Embedding
+from holonomy import Holonomy
+from store import NodeStore
+from parallel import scoreBends, untangleInParallel
+from paging import PagedStore
+from worldfile import MappedStore, isWorldFile, loadWorld, openWorld, saveWorld
+from worldlog import BATCH, HEADER, WriteAheadLog, logName
+from autosave import Autosave
+
+
+def test_deep_corridor_traversal():
+    """Traversals must not be limited by the recursion limit"""
+    start = Node()
+    end = createCorridor(start, 5 * sys.getrecursionlimit())
+
+    assert DFSWithCallback(start, start.newEpoch(), None, lambda n: n == end, INFINITY)
+
+    parents = {}
+    DFSWithCallbackAfter(start, lambda n, p, args: args.update({n: p}), parents)
+    assert len(parents) == 5 * sys.getrecursionlimit() - 1
+
+    grid = {}
+    relativeExplorer(start, INFINITY, grid, ORIGO, start.newEpoch())
+    assert grid[(5 * sys.getrecursionlimit() - 1, 0)][1] == end
+
+
+def test_epoch_marks():
+    """Traversals need no reset in between, and every network counts on its
+    own"""
+    for root in [Node(), NodeStore().new()]:
+        grid = createGrid(root, 5, 5)
+        for _ in range(2):  # Back to back
+            visited = [other for other, _, _ in preOrder(root, root.newEpoch())]
+            assert len(visited) == len(set(visited)) == 25
+
+        # Marking traversals nested in a postOrder do not disturb it
+        nested = []
+        for other, _ in postOrder(root):
+            nested.append(other)
+            assert len(list(preOrder(other, other.newEpoch()))) == 25
+        assert len(nested) == len(set(nested)) == 24
+
+        # Nor does one nested in a preOrder, over the same Nodes or others
+        other = root.spawn()
+        corridor = createCorridor(other, 3)
+        visited = []
+        for node, _, _ in preOrder(root, root.newEpoch()):
+            visited.append(node)
+            assert len(list(preOrder(node, node.newEpoch()))) == 25
+            assert len(list(preOrder(other, corridor.newEpoch()))) == 3
+            assert isArticulationPoint(node)
+        assert len(visited) == len(set(visited)) == 25
+        assert len(list(preOrder(root, root.newEpoch()))) == 25  # Marking again
+
+    a, b = createGrid(Node(), 3, 3), createGrid(Node(), 3, 3)
+    version, links = a[ORIGO].getVersion(), a[ORIGO].getLinkVersion()
+    b[ORIGO].rotate(1)
+    b[ORIGO].disconnect(Direction.EAST, b[(1, 0)])
+    assert a[(2, 2)].getVersion() == version
+    assert a[(2, 2)].getLinkVersion() == links
+
+    a[(2, 2)].connect(Direction.EAST, b[ORIGO])  # Merged into one
+    assert b[(1, 0)].getNetwork() is a[ORIGO].getNetwork()
+    assert a[ORIGO].getVersion() > max(version, b[(2, 2)].getVersion() - 1)
+    assert a[ORIGO].spawn().getNetwork() is b[(2, 2)].getNetwork()
+
+
+def test_store_matches_objects():
+    """The same script on a world of Nodes and on a NodeStore gives the same
+    neighborhoods and collisions"""
+    directions = [Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST]
+
+    def layout(engine):
+        return {
+            position: (priority, {d.value for d in node.keys()}, node.isLocked())
+            for position, (priority, node) in engine.grid.items()
+        }
+
+    for mode in [EngineMode.LIMINAL, EngineMode.NORMAL]:
+        engines = [
+            Engine(mode, 4, createGrid(root, 10, 10)[(5, 5)])
+            for root in [Node(), NodeStore().new()]
+        ]
+        rng = random.Random(mode.value)
+        for _ in range(150):
+            action = rng.choice(["move", "move", "insert", "remove", "rotate"])
+            argument = rng.choice(directions if action == "move" else [-1, 1, 2])
+            results = []
+            for engine in engines:
+                if action == "move":
+                    results.append(engine.move(argument))
+                elif action == "insert":
+                    if engine.previous.directionTo(engine.node) is not None:
+                        results.append(engine.insert())
+                elif action == "remove":
+                    results.append(engine.remove())
+                else:
+                    results.append(engine.tryRotate(argument))
+
+            a, b = engines
+            assert results[:1] == results[1:]
+            assert layout(a) == layout(b)
+            assert countCollisions(a.node) == countCollisions(b.node)
+
+
+def test_update_uses_true_hop_distance():
+    """Every position in the neighborhood gets its shortest path length"""
+    grid = createGrid(Node(), 30, 30)
+    depth = 12
+    engine = Engine(EngineMode.READ_ONLY, depth, grid[(15, 15)])
+
+    assert len(engine.grid) == 2 * depth * (depth + 1) + 1
+    for (x, y), (priority, node) in engine.grid.items():
+        assert priority == depth - abs(x) - abs(y)
+        assert grid[(15 + x, 15 + y)] == node
+
+    # Rings come closest first
+    assert list(engine.world) == list(range(depth, -1, -1))
+
+
+def test_move_shifts_neighborhood():
+    """A step must give the same neighborhood as exploring it all over again"""
+    grid = createGrid(Node(), 30, 30)
+    for direction, neighbor in list(grid[(17, 20)].items()):
+        grid[(17, 20)].disconnect(direction, neighbor)  # A hole to walk past
+
+    engine = Engine(EngineMode.READ_ONLY, 6, grid[(15, 10)])
+    shifted = 0
+    for direction in [Direction.NORTH] * 15 + [Direction.EAST] * 3:
+        assert engine.move(direction)
+        shifted += engine.regular is True  # Only set by shift
+
+        expected = dict(engine.grid)
+        engine.update()
+        assert engine.grid == expected
+
+    assert shifted > 0
+
+
+def test_depth_change_reuses_rings():
+    """Shrinking the depth must not explore, growing it only explores further"""
+    grid = createGrid(Node(), 30, 30)
+    engine = Engine(EngineMode.READ_ONLY, 8, grid[(15, 15)])
+    explored = len(engine.placement)
+
+    engine.setDepth(3)
+    assert len(engine.placement) == explored
+    assert engine.grid == Engine(EngineMode.READ_ONLY, 3, grid[(15, 15)]).grid
+
+    engine.setDepth(10)
+    assert len(engine.placement) > explored
+    assert engine.grid == Engine(EngineMode.READ_ONLY, 10, grid[(15, 15)]).grid
+
+
+def test_depth_grows_after_shift():
+    """Growing the depth after a step must give what exploring it all over
+    again gives, also on worlds with portals"""
+    directions = [Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST]
+    for seed in range(10):
+        rng = random.Random(seed)
+        grid = createGrid(Node(), 30, 30)
+        nodes = list(grid.values())
+        for _ in range(20):  # Portals, see benchmark.addPortals
+            a, b = rng.sample(nodes, 2)
+            direction = rng.choice(directions)
+            opposite = oppositeDirection(direction)
+            if a[direction] is not None:
+                a.disconnect(direction, a[direction])
+            if b[opposite] is not None:
+                b.disconnect(opposite, b[opposite])
+            a.connect(direction, b)
+
+        steps = [rng.choice(directions) for _ in range(10)]
+        streamed = Engine(EngineMode.READ_ONLY, 3, grid[(15, 15)])
+        grown = Engine(EngineMode.READ_ONLY, 3, grid[(15, 15)])
+        for direction in steps:
+            streamed.move(direction)
+            grown.move(direction)
+
+        grown.setDepth(8)
+        expected = dict(grown.grid)
+        grown.update()
+        assert grown.grid == expected
+
+        assert {
+            position: (8 - hop, node)
+            for position, hop, node in streamed.iterNeighborhood(8)
+        } == expected
+
+
+def test_iter_neighborhood_streams_rings():
+    """Rings come closest first and are only explored when asked for"""
+    grid = createGrid(Node(), 30, 30)
+    engine = Engine(EngineMode.READ_ONLY, 2, grid[(15, 15)])
+
+    stream = engine.iterNeighborhood(12)
+    for position, hop, node in stream:
+        if hop > 3:
+            break
+    assert len(engine.rings) == 5  # Explored one ring beyond the old depth
+    stream.close()
+
+    hops = [hop for _, hop, _ in engine.iterNeighborhood(12)]
+    assert hops == sorted(hops) and hops[-1] == 12
+    expected = Engine(EngineMode.READ_ONLY, 12, grid[(15, 15)]).grid
+    streamed = {
+        position: (12 - hop, node)
+        for position, hop, node in engine.iterNeighborhood(12)
+    }
+    assert streamed == expected
+
+
+def test_iter_links():
+    """Every link on the grid comes once, farther end first"""
+    grid = createGrid(Node(), 30, 30)
+    engine = Engine(EngineMode.READ_ONLY, 6, grid[(15, 15)])
+
+    links = list(engine.iterLinks())
+    expected = {
+        frozenset((position, deltaPosition(direction, position)))
+        for position in engine.grid
+        for direction in (Direction.NORTH, Direction.EAST)
+        if deltaPosition(direction, position) in engine.grid
+    }
+    assert {frozenset((position, other)) for _, position, _, other in links} == (
+        expected
+    )
+    assert len(links) == len(expected)
+    assert [priority for priority, *_ in links] == sorted(p for p, *_ in links)
+    assert all(engine.grid[other][0] > priority for priority, _, _, other in links)
+
+    # Only links that agree with the grid, once it is brought up to date
+    a, b = grid[(15, 16)], grid[(20, 20)]
+    a.disconnect(Direction.EAST, a[Direction.EAST])
+    b.disconnect(Direction.WEST, b[Direction.WEST])
+    a.connect(Direction.EAST, b)
+    links = list(engine.iterLinks())
+    assert engine.version == engine.node.getVersion()
+    assert all(
+        engine.grid[other][1] in node and engine.grid[position][1] == node
+        for _, position, node, other in links
+    )
+    assert len(links) == sum(
+        engine.grid[deltaPosition(direction, position)][1] == neighbor
+        for position, (_, node) in engine.grid.items()
+        for direction, neighbor in node.items()
+        if deltaPosition(direction, position) in engine.grid
+    ) // 2
+    assert ({(0, 1), (1, 1)} in [{p, o} for _, p, _, o in links]) == (
+        engine.grid[(1, 1)][1] == b
+    )
+
+
+def test_search_shortest_route():
+    """Routes are shortest, limited by hops and None when out of reach"""
+    grid = createGrid(Node(), 20, 20)
+    engine = Engine(EngineMode.READ_ONLY, 3, grid[(0, 0)])
+
+    route = engine.search(grid[(19, 19)])
+    assert len(route) == 38 and route[0] == grid[(19, 19)]
+    assert all(a in b for a, b in zip(route, route[1:] + [engine.node]))
+
+    assert engine.search(grid[(19, 19)], 37) is None
+    assert engine.search(engine.node.spawn()) is None
+    assert engine.search(engine.node) == []
+
+
+def test_search_one_way():
+    """Edges without one back are searched too, routes stay shortest"""
+    start = Node()
+    end = createCorridor(start, 4)
+    shortcut = start.spawn()
+    start.connect(Direction.SOUTH, shortcut)
+    shortcut[Direction.EAST] = end  # Only one way
+    engine = Engine(EngineMode.READ_ONLY, 3, start)
+
+    route = engine.search(end)
+    assert route == [end, shortcut]
+    assert not engine.isTwoWay()
+
+    # Leads to start, but cannot be reached from it
+    back = start.spawn()
+    back[Direction.WEST] = start
+    assert engine.search(back) is None
+
+    shortcut[Direction.EAST] = None
+    assert engine.isTwoWay() and len(engine.search(end)) == 3
+
+
+def test_route_home_follows_changes():
+    """The routes home are repaired when the network changes under them"""
+    engine = Engine(EngineMode.LIMINAL, 3)
+    for direction in [Direction.EAST] * 6 + [Direction.NORTH] * 2:
+        engine.move(direction)
+    assert len(engine.routeHome()) == 8
+    assert engine.routeHome()[0] == engine.start
+
+    # A shortcut home
+    shortcut = engine.node.spawn()
+    engine.node.connect(Direction.WEST, shortcut)
+    shortcut.connect(Direction.SOUTH, engine.start)
+    assert len(engine.routeHome()) == 2
+    assert len(engine.routeHome()) == len(engine.search(engine.start))
+
+    engine.node.disconnect(Direction.WEST, shortcut)
+    assert len(engine.routeHome()) == 8
+    assert engine.routes.version == engine.node.getLinkVersion()
+
+
+def test_articulation_index_matches_search():
+    """The index must agree with isArticulationPoint on random networks"""
+    rng = random.Random(1)
+    for _ in range(50):
+        width, height = rng.randrange(2, 8), rng.randrange(1, 8)
+        grid = createGrid(Node(), width, height)
+        for _ in range(width * height):
+            node = grid[(rng.randrange(width), rng.randrange(height))]
+            for direction, neighbor in list(node.items()):
+                if rng.random() < 0.3:
+                    node.disconnect(direction, neighbor)
+
+        cuts = ArticulationIndex()
+        for node in grid.values():
+            if not cuts.isValid(node):
+                cuts.build(node)
+            assert cuts.isCut(node) != isArticulationPoint(node)
+
+
+def test_articulation_index_walking_over_leaves():
+    """Stepping back onto Nodes that already exist must not attach them again"""
+    rng = random.Random(280)
+    engine = Engine(EngineMode.LIMINAL, 3)
+    steps = [Direction.NORTH, Direction.SOUTH, Direction.SOUTH, Direction.NORTH]
+    directions = [Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST]
+    for direction in steps + [rng.choice(directions) for _ in range(200)]:
+        engine.move(direction)
+        engine.isCutVertex(engine.node)  # Index is up to date from here on
+
+        fresh = ArticulationIndex()
+        fresh.build(engine.node)
+        assert engine.cuts.blocks == fresh.blocks
+
+
+def test_count_collisions():
+    """Flat networks have no collisions, folded ones do"""
+    grid = createGrid(Node(), 20, 20)
+    assert countCollisions(grid[(3, 4)]) == 0
+
+    # A corridor turning left until it ends up where it started
+    start = Node()
+    node = start
+    for direction in [Direction.EAST, Direction.NORTH, Direction.WEST, Direction.SOUTH]:
+        node = createCorridor(node, 2, direction)
+    assert countCollisions(start) == 1
+
+    # Long corridors are no problem either
+    createCorridor(node, 5 * sys.getrecursionlimit(), Direction.SOUTH)
+    assert countCollisions(start) == 1
+
+
+def test_embedding_follows_bends():
+    """Bends only move the Nodes behind the bent Node, and a rejected one is
+    reverted to exactly what it was"""
+    start = Node()
+    createCorridor(start, 9, Direction.EAST)
+
+    # An L-shaped branch over the corridor
+    branch = start[Direction.EAST][Direction.EAST]
+    leaf = Node()
+    branch.connect(Direction.NORTH, leaf)
+    createCorridor(createCorridor(leaf, 2, Direction.NORTH), 3, Direction.EAST)
+
+    embedding = Embedding(start)
+    assert embedding.collisions == countCollisions(start) == 0
+
+    layout = dict(embedding.place)
+    for rotation in [1, -1]:
+        since: int = start.getVersion()
+        assert bend(leaf, branch, rotation)
+
+        delta: int = embedding.rotate(leaf, branch, rotation, since)
+        assert embedding.collisions == delta == countCollisions(start)
+        assert embedding.place == Embedding(start).place
+
+        assert bend(leaf, branch, -rotation)
+        embedding.revert()
+        assert embedding.collisions == 0 and embedding.place == layout
+
+    # Turning the rest of the corridor up runs it into the branch
+    node = branch[Direction.EAST]
+    since = start.getVersion()
+    assert bend(node, branch, -1)
+    assert embedding.rotate(node, branch, -1, since) > 0
+    assert embedding.collisions == countCollisions(start)
+
+
+def test_embedding_follows_bends_over_cycles():
+    """The tracked collisions stay those of a fresh layout after every bend,
+    also when a cycle hangs behind the bent Node"""
+    directions = [Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST]
+    for seed in range(20):
+        for start in [Node(), NodeStore().new()]:
+            rng = random.Random(seed)
+            node = start.spawn()
+            start.connect(Direction.EAST, node)
+            nodes = [node]
+            while len(nodes) < 7:
+                other = rng.choice(nodes)
+                direction = rng.choice(directions)
+                if other[direction] is None:
+                    nodes.append(other.spawn())
+                    other.connect(direction, nodes[-1])
+            for _ in range(20):
+                a, b = rng.sample(nodes[1:], 2)
+                direction = rng.choice(directions)
+                if a.canConnect(direction, b) and b not in a:
+                    a.connect(direction, b)
+
+            engine = Engine(EngineMode.LIMINAL, 3, start)
+            for rotation in [1, 1, 1, 1, 2, -1, 2]:
+                if engine._bend(node, start, rotation):
+                    collisions = engine.getEmbedding().collisions
+                    assert collisions == Embedding(start).collisions
+                    assert collisions == countCollisions(start)
+
+
+def test_rotation_frames():
+    """Bending the same Nodes again only turns their frame, and normalizing
+    keeps every neighbor where it was"""
+    root = Node()
+    pivot = createCorridor(root, 2, Direction.EAST)
+    tail = Node()
+    pivot.connect(Direction.NORTH, tail)
+    end = createCorridor(tail, 50, Direction.NORTH)
+
+    assert bend(tail, pivot, 1)
+    frame = tail._frame
+    assert frame is not None and frame.members == 50 and end._frame is frame
+
+    for rotation in [-1, -1]:
+        assert bend(tail, pivot, rotation)
+    assert tail._frame is frame and tail.directionTo(pivot) == Direction.SOUTH
+    assert tail[Direction.WEST] is not None
+    assert list(end.keys()) == [Direction.EAST]
+
+    before = [(node, dict(node.items())) for node in [root, pivot, tail, end]]
+    version: int = root.getVersion()
+    normalizeAll(root)
+    assert [(node, dict(node.items())) for node in [root, pivot, tail, end]] == before
+    assert root.getVersion() == version and frame.members == 0
+
+    # Connecting anything makes the frame stale, it is made again
+    end.connect(Direction.NORTH, Node())
+    assert bend(tail, pivot, 1) and tail._frame is not frame
+
+    # A NodeStore rotates its rows instead, still one step to undo
+    root = NodeStore().new()
+    pivot = createCorridor(root, 2, Direction.EAST)
+    tail = pivot.spawn()
+    pivot.connect(Direction.NORTH, tail)
+    end = createCorridor(tail, 50, Direction.NORTH)
+    engine = Engine(EngineMode.LIMINAL, 3, root)
+    with engine.journal:
+        assert bend(tail, pivot, 1)
+    assert list(end.keys()) == [Direction.WEST] and len(engine.journal) == 1
+    assert engine.undo() and list(end.keys()) == [Direction.SOUTH]
+
+
+def test_journal_undo_redo():
+    """Every operation can be undone and redone exactly, trial bends are
+    rolled back without a trace"""
+    engine = Engine(EngineMode.NORMAL, 3)
+
+    def snapshot():
+        nodes = [engine.start]
+        for node in nodes:
+            nodes.extend(other for other in node.values() if other not in nodes)
+        return [(node, node.slots()[:], node.getData()) for node in nodes]
+
+    states = [snapshot()]
+    for direction in [Direction.NORTH, Direction.NORTH, Direction.EAST]:
+        engine.move(direction)
+        states.append(snapshot())
+
+    with engine.journal:
+        engine.getNode().setData("treasure")
+    states.append(snapshot())
+    assert len(engine.journal) == 4
+
+    # A rejected bend leaves nothing behind
+    savepoint: int = engine.journal.savepoint()
+    with engine.journal:
+        engine.previous.rotate(1)
+        engine.journal.rollback(savepoint)
+    assert len(engine.journal) == 4 and snapshot() == states[-1]
+
+    node: Node = engine.getNode()
+    for state in reversed(states[:-1]):
+        assert engine.undo()
+        assert snapshot() == state
+    assert not engine.undo() and engine.getNode() == engine.start
+    assert node.getData() is None and len(list(node.values())) == 0
+
+    for state in states[1:]:
+        assert engine.redo()
+        assert snapshot() == state
+    assert not engine.redo() and node.getData() == "treasure"
+
+
+def test_maintenance_in_slices():
+    """Maintenance run a little at a time ends where running it at once does,
+    and is undone as one step"""
+
+    def spiral() -> Node:
+        start = Node()
+        node = start
+        for direction in [Direction.EAST, Direction.NORTH, Direction.WEST]:
+            node = createCorridor(node, 3, direction)
+        createCorridor(createCorridor(node, 3, Direction.SOUTH), 3, Direction.EAST)
+        return start
+
+    engine = Engine(EngineMode.LIMINAL, 3, spiral())
+    assert countCollisions(engine.node) == 3
+    assert engine.untangle() and countCollisions(engine.node) == 0
+
+    engine = Engine(EngineMode.LIMINAL, 3, spiral())
+    assert engine.maintain(engine.untangling())
+    assert not engine.maintain(engine.pruning())  # One at a time
+
+    slices: int = 0
+    while engine.work(0):
+        slices += 1
+        if engine.isBusy():
+            assert not engine.undo()  # Not halfway
+    assert slices > 1 and not engine.isBusy()
+    assert countCollisions(engine.node) == 0 and len(engine.journal) == 1
+
+    assert engine.undo() and countCollisions(engine.node) == 3
+
+
+def test_annealing_solver():
+    """Annealing untangles the network, the same way for the same seed, and
+    is undone as one step"""
+    start = Node()
+    node = start
+    for direction in [Direction.EAST, Direction.NORTH, Direction.WEST]:
+        node = createCorridor(node, 4, direction)
+    createCorridor(node, 6, Direction.SOUTH)
+    createCorridor(start[Direction.EAST], 3, Direction.SOUTH)
+
+    engine = Engine(EngineMode.LIMINAL, 3, start)
+    collisions: int = countCollisions(start)
+    assert collisions > 0
+
+    annealer = engine.solve(10.0, seed=1)
+    assert annealer is not None and countCollisions(start) == 0
+    assert annealer.history[0][1] > annealer.history[-1][1] == 0
+
+    assert engine.undo() and countCollisions(start) == collisions
+    assert engine.solve(10.0, seed=1).moves == annealer.moves
+
+
+def test_annealing_with_moves_in_between():
+    """Moving between slices of annealing is kept when it rolls back to the
+    best state it found"""
+    start = Node()
+    node = start
+    for direction in [Direction.EAST, Direction.NORTH, Direction.WEST]:
+        node = createCorridor(node, 4, direction)
+    createCorridor(node, 6, Direction.SOUTH)
+    createCorridor(start[Direction.EAST], 3, Direction.SOUTH)
+
+    engine = Engine(EngineMode.LIMINAL, 3, start)
+    engine.setDrawer(lambda *args: None)
+    assert engine.maintain(engine.solving(0.2, seed=1))
+    assert engine.work(0)
+
+    # Into the void, where new Nodes are made
+    for direction in [Direction.WEST] * 3 + [Direction.SOUTH] * 3:
+        assert engine.move(direction)
+        engine.work(0)
+    while engine.work(0.01):
+        pass
+
+    assert len(engine.node) > 0 and engine.search(engine.start) is not None
+    assert engine.routeHome() is not None
+
+
+def test_parallel_untangle():
+    """Bends scored on a snapshot in other processes untangle the network"""
+    start = Node()
+    node = start
+    for direction in [Direction.EAST, Direction.NORTH, Direction.WEST]:
+        node = createCorridor(node, 3, direction)
+    createCorridor(createCorridor(node, 3, Direction.SOUTH), 3, Direction.EAST)
+    node.setData("treasure")
+
+    store, rows = NodeStore.fromGraph(start)
+    assert rows[start] == 0 and len(store) == len(rows) == 11
+    for original, row in rows.items():
+        copy = store.node(row)
+        assert [(d, rows[n]) for d, n in original.items()] == [
+            (d, n._index) for d, n in copy.items()
+        ]
+        assert copy.getData() == original.getData()
+        assert copy.isLocked() == original.isLocked()
+
+    scores = scoreBends(store, 0, 1)
+    assert scores and all(delta < 0 for delta, _, _, _ in scores)
+    assert [(d, n._index) for d, n in store.node(0).items()] == [(Direction.EAST, 1)]
+
+    engine = Engine(EngineMode.LIMINAL, 3, start)
+    collisions: int = countCollisions(start)
+    assert untangleInParallel(engine, 2) and countCollisions(start) == 0
+    assert engine.undo() and countCollisions(start) == collisions
+
+
+def test_holonomy_proves_permanent_collisions():
+    """Rooms that only fit one way keep their collisions when bent across
+    rooms, portals are named"""
+    # A loop that goes through itself, but every edge links back
+    start = Node()
+    node = start
+    for direction, length in [
+        (Direction.EAST, 3),
+        (Direction.NORTH, 2),
+        (Direction.WEST, 2),
+        (Direction.SOUTH, 3),
+        (Direction.WEST, 2),
+    ]:
+        node = createCorridor(node, length, direction)
+    node.connect(Direction.NORTH, start)
+    createCorridor(start, 4, Direction.WEST)
+
+    engine = Engine(EngineMode.LIMINAL, 3, start)
+    holonomy: Holonomy = engine.getHolonomy()
+    assert holonomy.permanent == countCollisions(start) == 1
+    assert not holonomy.cycles
+    assert engine.untangle()  # Still tried, bends inside the room twist it
+
+    # A corridor that leads back to where it started, four steps east
+    portal = Node()
+    createCorridor(portal, 4, Direction.EAST).connect(Direction.EAST, portal)
+    cuts = ArticulationIndex()
+    cuts.build(portal)
+    holonomy = Holonomy()
+    holonomy.build(portal, cuts)
+    assert holonomy.permanent == 0 and len(holonomy.twisted) == 1
+    [(node, neighbor, rotation, shift)] = holonomy.cycles
+    assert rotation == 0 and abs(shift[0]) == 4 and shift[1] == 0
+
+    # Trees have neither
+    tree = Node()
+    createCorridor(createCorridor(tree, 3, Direction.NORTH), 3, Direction.WEST)
+    cuts.build(tree)
+    holonomy.build(tree, cuts)
+    assert holonomy.permanent == 0 and not holonomy.cycles
+
+
+def test_holonomy_twisted_loop():
+    """Bending inside a room twists its cycles, so it may fit after all"""
+    # A loop that crosses itself, with the engine at the end of a corridor
+    start = Node()
+    node = start
+    for direction in [
+        Direction.NORTH,
+        Direction.WEST,
+        Direction.SOUTH,
+        Direction.WEST,
+        Direction.WEST,
+        Direction.SOUTH,
+        Direction.EAST,
+        Direction.EAST,
+        Direction.NORTH,
+    ]:
+        node = createCorridor(node, 2, direction)
+    node.connect(Direction.EAST, start)
+    end = createCorridor(start, 3, Direction.EAST)
+
+    engine = Engine(EngineMode.LIMINAL, 3, end)
+    assert engine.getHolonomy().permanent == countCollisions(end) == 1
+
+    # Around a neighbor in the same room, the loop no longer closes straight
+    assert bend(start, start[Direction.NORTH], 2, engine.isCutVertex)
+    assert countCollisions(end) == 0 and engine.getHolonomy().cycles
+
+
+def test_world_file_round_trip():
+    """Worlds are saved without recursion and read back the way they were"""
+    start = Node()
+    createCorridor(start, 5 * sys.getrecursionlimit())
+    branch = createCorridor(start, 4, Direction.NORTH)
+    branch.setData({"treasure": [1, 2]})
+    branch.toggleLock()
+    assert bend(start[Direction.NORTH], start, 1)  # Read through a frame
+
+    engine = Engine(EngineMode.LIMINAL, 4, start)
+    engine.setDrawer(lambda *args: None)
+    assert engine.move(Direction.EAST)
+
+    def snapshot(engine: Engine) -> List:
+        seen, order = {engine.start}, [engine.start]
+        for node in order:
+            for neighbor in node.values():
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    order.append(neighbor)
+        rows = {node: row for row, node in enumerate(order)}
+        return [
+            ([(d, rows[n]) for d, n in node.items()], node.getData(), node.isLocked())
+            for node in order
+        ] + [rows[engine.node], rows[engine.previous], engine.mode, engine.depth]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, "world")
+        assert Engine.serialize(engine, path) == os.path.getsize(path)
+        assert isWorldFile(path)
+
+        loaded: Engine = Engine.deserialize(path)
+        assert snapshot(loaded) == snapshot(engine)
+        assert loaded.grid.keys() == engine.grid.keys()
+
+        # Backed by a NodeStore now, which is written as it is
+        assert loaded.move(Direction.EAST) and loaded.insert()
+        Engine.serialize(loaded, path)
+        assert snapshot(loadWorld(path)) == snapshot(loaded)
+
+        # Laid out around the current Node, which is on row 0 and not the start
+        small = Engine(EngineMode.LIMINAL, 2)
+        for direction in [Direction.EAST] * 3:
+            assert small.move(direction)
+        saveWorld(small, path, ordered=True)
+        loaded = loadWorld(path)
+        assert loaded.node.getId() == 0 and loaded.node.canRemove(loaded.start)
+        loaded.start.toggleLock()
+        assert not loaded.start.canRemove(loaded.start)
+
+
+def test_old_pickle():
+    """Worlds pickled before epochs, with NodeState, are still read"""
+    # Engine(EngineMode.LIMINAL, 3) moved east, east and north, with data "hi"
+    old: bytes = base64.b64decode(
+        "gASVtQEAAAAAAACMBG5vZGWUjAZFbmdpbmWUk5QpgZR9lCiMBG1vZGWUaACMCkVuZ2luZU1vZGWU"
+        "k5RLAoWUUpSMBWRlcHRolEsDaABoAIwETm9kZZSTlCmBlH2UKIwFX2RhdGGUjAJoaZSMBmxvY2tl"
+        "ZJSJjAVzdGF0ZZRoAIwJTm9kZVN0YXRllJOUSwCFlFKUjApfbmVpZ2hib3JzlF2UKE5OaAwpgZR9"
+        "lChoD05oEYloEmgWaBddlChoDU5OaAwpgZR9lChoD05oEYloEmgWaBddlChOaBlOaAwpgZR9lCho"
+        "D05oEYhoEmgWaBddlChOaBxOTmWMBl9pbmRleJRLAHViZWgiSwF1YmVoIksCdWJOZWgiSwN1YowF"
+        "c3RhcnSUaB+MCHByZXZpb3VzlGgZjARncmlklH2UKEsASwCGlEsDaA2GlEsASv////+GlEsCaBmG"
+        "lEr/////Sv////+GlEsBaByGlEr+////Sv////+GlEsAaB+GlHWMBXdvcmxklH2UKEsDXZRoJ2gN"
+        "hpRhSwJdlGgpaBmGlGFLAV2UaCtoHIaUYUsAXZRoLWgfhpRhdYwEcGF0aJRdlHViLg=="
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, "world")
+        with open(path, "wb") as file:
+            file.write(old)
+        assert not isWorldFile(path)
+
+        engine: Engine = Engine.deserialize(path)
+
+    engine.setDrawer(lambda *args: None)
+    assert engine.node.getData() == "hi" and engine.getMode() == EngineMode.LIMINAL
+    assert len(engine.routeHome()) == 3 and engine.search(engine.start) is not None
+    assert engine.move(Direction.NORTH) and engine.insert()
+    assert sum(1 for _ in preOrder(engine.start, engine.start.newEpoch())) == 6
+    assert engine.undo() and engine.undo() and engine.node.getData() == "hi"
+
+
+def test_mapped_world():
+    """Worlds opened in place read the same, only where the engine looks"""
+    grid = createGrid(NodeStore().new(), 40, 40)
+    grid[(20, 21)].setData("treasure")
+    engine = Engine(EngineMode.NORMAL, 4, grid[(20, 20)])
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, "world")
+        Engine.serialize(engine, path)
+
+        mapped: Engine = openWorld(path)
+        store: MappedStore = mapped.node._store
+        assert mapped.getMode() == EngineMode.READ_ONLY and mapped.start.isLocked()
+        assert mapped.grid.keys() == engine.grid.keys()
+        assert not store.data and len(mapped.routes) == 0  # Nothing read yet
+
+        assert mapped.move(Direction.NORTH) and mapped.node.getData() == "treasure"
+        assert len(mapped.routeHome()) == 1
+        assert list(store.data) == [grid[(20, 21)]._index]
+        try:
+            mapped.node.connect(Direction.NORTH, mapped.previous)
+            assert False, "Connected in a read only world"
+        except TypeError:
+            pass
+
+        del mapped
+        store.close()
+
+
+def test_paged_store():
+    """A world paged out to disk reads the same as one kept in memory"""
+    store = PagedStore(budget=64, size=16)
+    paged = createGrid(store.new(), 30, 30)
+    grid = createGrid(NodeStore().new(), 30, 30)
+    assert len(store) == 900 and store.resident() == 64 and store.evictions > 0
+
+    paged[(29, 29)].setData({"treasure": 1})
+    paged[(0, 0)].toggleLock()  # Keeps its page in memory
+    pinned: int = paged[(0, 0)]._index // store.size
+
+    engine = Engine(EngineMode.NORMAL, 5, paged[(15, 15)])
+    reference = Engine(EngineMode.NORMAL, 5, grid[(15, 15)])
+    rng = random.Random(1)
+    for _ in range(200):
+        direction = rng.choice(list(Direction))
+        assert engine.move(direction) == reference.move(direction)
+        assert engine.grid.keys() == reference.grid.keys()
+        assert pinned in store.pages
+
+    assert store.misses > 0 and store.hits > store.misses
+    assert len(engine.routeHome()) == len(reference.routeHome())
+    assert paged[(29, 29)].getData() == {"treasure": 1}
+    assert countCollisions(paged[(0, 0)]) == countCollisions(grid[(0, 0)])
+    store.close()
+
+
+def test_world_log():
+    """Worlds saved by a log come back as they were at the last commit that
+    was written, whatever a crash left behind"""
+    store = PagedStore(budget=64, size=16)
+    engine = Engine(EngineMode.LIMINAL, 4, createGrid(store.new(), 12, 12)[(6, 6)])
+
+    def state(engine: Engine) -> List:
+        store: NodeStore = engine.node._store
+        return [
+            (list(store.row(i)), store.isLocked(i), store.getData(i))
+            for i in range(len(store))
+        ] + [engine.node._index, engine.previous._index, engine.mode, engine.depth]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, "world")
+        log = WriteAheadLog.create(engine, path, batch=1 << 30, interval=INFINITY)
+        size: int = os.path.getsize(path)
+
+        rng = random.Random(2)
+        for step in range(100):
+            engine.move(rng.choice(list(Direction)))
+            if step % 10 == 0:
+                engine.insert()
+            elif step % 10 == 5:
+                engine.remove()
+            elif step % 7 == 0:
+                engine.node.setData({"step": step})
+            elif step % 13 == 0:
+                engine.node.toggleLock()
+            elif step % 11 == 0:
+                assert engine.tryRotate(1)  # Turns every row behind
+
+            log.commit(engine)
+
+        engine.setDepth(6)
+        log.commit(engine)
+        assert log.written == 0  # Piled up until now
+        assert log.flush() > 0 and os.path.getsize(path) == size
+        saved: List = state(engine)
+        assert state(loadWorld(path)) != saved  # Only in the log
+
+        # Crash after a commit not written and a batch written halfway
+        assert engine.insert() and log.commit(engine) == 0
+        with open(logName(path), "ab") as file:
+            file.write(BATCH.pack(100, 0) + b"torn")
+        log.file.close()
+
+        engine, log = WriteAheadLog.resume(path)
+        assert state(engine) == saved
+
+        # Crash after a checkpoint, before the log was emptied
+        with open(logName(path), "rb") as file:
+            stale: bytes = file.read()
+        log.checkpoint(engine)
+        with open(logName(path), "wb") as file:
+            file.write(stale)
+        log.file.close()
+
+        engine, log = WriteAheadLog.resume(path)
+        assert state(engine) == saved
+        log.close()
+
+    store.close()
+
+
+def test_autosave():
+    """Worlds saved in the background are the snapshot taken, and their log
+    keeps what changed since"""
+    store = PagedStore(budget=64, size=16)
+    engine = Engine(EngineMode.LIMINAL, 4, createGrid(store.new(), 12, 12)[(6, 6)])
+    engine.node.setData("here")
+
+    def state(engine: Engine) -> List:
+        store: NodeStore = engine.node._store
+        return [
+            (list(store.row(i)), store.isLocked(i), store.getData(i))
+            for i in range(len(store))
+        ] + [engine.node._index, engine.previous._index]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, "world")
+        log = WriteAheadLog.create(engine, path, checkpoint=False)
+        autosave = Autosave(path, INFINITY, log)
+        assert not os.path.exists(path)
+
+        assert autosave.save(engine) and not autosave.save(engine)  # Busy
+        saved: List = state(engine)
+        assert engine.move(Direction.NORTH) and engine.insert()
+        engine.node.setData("later")
+        log.commit(engine)
+
+        autosave.close()
+        assert autosave.saves == 1 and autosave.bytes == os.path.getsize(path)
+        assert autosave.stalled <= autosave.seconds
+        assert state(loadWorld(path)) == saved
+        assert 0 < log.written == os.path.getsize(logName(path)) - HEADER.size
+
+        expected: List = state(engine)
+        log.close()
+        engine, log = WriteAheadLog.resume(path)
+        assert state(engine) == expected
+        log.close()
+
+    store.close()
+
+
+def test_paged_world():
+    """Worlds laid out around the current Node open paged, reading only what
+    the engine uses"""
+    grid = createGrid(NodeStore().new(), 40, 40)
+    engine = Engine(EngineMode.NORMAL, 3, grid[(20, 20)])
+    assert engine.move(Direction.EAST)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, "world")
+        saveWorld(engine, path, ordered=True)
+        loaded: Engine = loadWorld(path)
+        assert loaded.node._index == 0 and loaded.start._index == 1
+
+        log = WriteAheadLog.create(loaded, path)
+        assert loaded.move(Direction.NORTH)
+        loaded.node.setData("treasure")
+        log.commit(loaded)
+        log.close()
+
+        reference, log = WriteAheadLog.resume(path)
+        log.close()
+        paged, log = WriteAheadLog.resume(path, resident=1000)
+        store: PagedStore = paged.node._store
+        assert isinstance(store, PagedStore) and len(store) == 1600
+        assert len(store.pages) == 1  # Of 7, the rest was never read
+
+        assert paged.grid.keys() == reference.grid.keys()
+        assert paged.node.getData() == "treasure"
+        assert paged.move(Direction.EAST) and reference.move(Direction.EAST)
+        log.commit(paged)
+
+        copy, expected = store.snapshot(), reference.node._store
+        assert copy.neighbors == expected.neighbors and copy.flags == expected.flags
+        assert copy.data == expected.data
+        log.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    test_deep_corridor_traversal()
+    test_epoch_marks()
+    test_store_matches_objects()
+    test_update_uses_true_hop_distance()
+    test_move_shifts_neighborhood()
+    test_depth_change_reuses_rings()
+    test_depth_grows_after_shift()
+    test_iter_neighborhood_streams_rings()
+    test_iter_links()
+    test_search_shortest_route()
+    test_search_one_way()
+    test_route_home_follows_changes()
+    test_articulation_index_matches_search()
+    test_articulation_index_walking_over_leaves()
+    test_count_collisions()
+    test_embedding_follows_bends()
+    test_embedding_follows_bends_over_cycles()
+    test_rotation_frames()
+    test_journal_undo_redo()
+    test_maintenance_in_slices()
+    test_annealing_solver()
+    test_annealing_with_moves_in_between()
+    test_parallel_untangle()
+    test_holonomy_proves_permanent_collisions()
+    test_holonomy_twisted_loop()
+    test_world_file_round_trip()
+    test_old_pickle()
+    test_mapped_world()
+    test_paged_store()
+    test_world_log()
+    test_autosave()
+    test_paged_world()
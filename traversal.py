@@ -0,0 +1,173 @@
+"""Explicit-stack traversal kernels shared by the engine.
+
+None of these recurse, so they work on corridors of any length. Each frame on
+the stack holds the neighbor iterator of a Node, which makes the visiting
+order identical to the recursive functions they replace.
+"""
+
+# Static analysis
+from __future__ import annotations
+from typing import Generator, Iterator, Tuple, List, Set, Dict, TYPE_CHECKING
+
+import sys
+
+# Local package for Direction and Position logic
+from direction import Position, Direction, deltaPosition
+
+if TYPE_CHECKING:
+    from node import Node
+
+INFINITY: int = sys.maxsize  # Just a big number
+
+# Number of preOrder traversals that are marking Nodes right now
+marking: int = 0
+
+
+def preOrder(
+    node: Node,
+    territory: int,
+    depth: int = INFINITY,
+    ignore: Node | None = None,
+    position: Position | None = None,
+) -> Generator[Tuple[Node, Position | None, int], None, None]:
+    """Depth first pre-order traversal. A Node is yielded when it is entered
+    and marked with territory when the consumer asks for the next one, so
+    breaking out of the loop stops the search without marking the last Node.
+    Nodes already in territory are never entered again.
+
+    A traversal started while another one is marking, from the loop of the
+    other one, keeps its visited Nodes in a private set instead of marking
+    them, so the other one may go on. Nodes marked with territory before are
+    still not entered.
+
+    Usage:
+
+    >>> for other, position, n in preOrder(node, node.newEpoch(), depth):
+            ...
+
+    :param node: start Node
+    :param territory: epoch marking the Nodes of this traversal
+    :param depth: how many steps away from node to go
+    :param ignore: Node that must not be entered
+    :param position: position of node, None to skip position bookkeeping
+    :return: Node, its position and the depth left
+    """
+    global marking
+
+    visited: Set[Node] | None = set() if marking else None  # Nested
+    marking += 1
+    try:
+        yield node, position, depth
+        if visited is None:
+            node.mark = territory
+        else:
+            visited.add(node)
+
+        if depth <= 0:
+            return
+
+        stack: List[Tuple[Iterator[Tuple[Direction, Node]], Position | None, int]] = [
+            (node.items(), position, depth - 1)
+        ]
+
+        while stack:
+            neighbors, position, depth = stack[-1]
+
+            for direction, neighbor in neighbors:
+                if (
+                    neighbor.mark != territory
+                    and (visited is None or neighbor not in visited)
+                    and (ignore is None or neighbor != ignore)
+                ):
+                    break
+            else:
+                stack.pop()
+                continue
+
+            if position is not None:
+                neighborPosition: Position | None = deltaPosition(direction, position)
+            else:
+                neighborPosition = None
+
+            yield neighbor, neighborPosition, depth
+            if visited is None:
+                neighbor.mark = territory
+            else:
+                visited.add(neighbor)
+
+            if depth > 0:
+                stack.append((neighbor.items(), neighborPosition, depth - 1))
+
+    finally:
+        marking -= 1
+
+
+def postOrder(node: Node) -> Generator[Tuple[Node, Node], None, None]:
+    """Depth first post-order traversal. Every Node except the start Node is
+    yielded together with its parent once all Nodes below it are done.
+
+    The visited Nodes are kept in a private set instead of the marks, since the
+    consumer is allowed to run other traversals (like bend) in between, see
+    Node.newEpoch.
+
+    Usage:
+
+    >>> for other, parent in postOrder(node):
+            ...
+
+    :param node: start Node
+    :return: Node and the Node it was reached from
+    """
+    visited: Set[Node] = {node}
+    stack: List[Tuple[Node, Iterator[Node]]] = [(node, node.values())]
+
+    while stack:
+        current, neighbors = stack[-1]
+
+        for neighbor in neighbors:
+            if neighbor not in visited:
+                visited.add(neighbor)
+                stack.append((neighbor, neighbor.values()))
+                break
+        else:
+            stack.pop()
+            if stack:
+                yield current, stack[-1][0]
+
+
+Ring = List[Tuple[Position, "Node"]]
+
+
+def breadthFirst(
+    frontier: Ring, seen: Dict[Node, Position]
+) -> Generator[Ring, None, None]:
+    """Breadth first traversal yielding one ring at a time. Ring k holds every
+    Node first reached k steps beyond the frontier, together with the position
+    of the path it was reached by. Stopping after any ring leaves seen holding
+    exactly the Nodes of the rings so far, so it can be resumed from the last
+    ring later on.
+
+    Usage:
+
+    >>> seen = {node: ORIGO}
+    >>> for hop, ring in enumerate(breadthFirst([(ORIGO, node)], seen), 1):
+            ...
+
+    :param frontier: the outermost ring already explored
+    :param seen: position of every Node explored so far, will be extended
+    :return: rings of positions and Nodes
+    """
+    while frontier:
+        ring: Ring = []
+        for position, node in frontier:
+            for direction, neighbor in node.items():
+                if neighbor not in seen:
+                    neighborPosition: Position = deltaPosition(direction, position)
+                    seen[neighbor] = neighborPosition
+                    ring.append((neighborPosition, neighbor))
+
+        if not ring:
+            return
+
+        yield ring
+        frontier = ring
@@ -0,0 +1,487 @@
+"""Binary world files.
+
+A world is saved as a few flat sections, each written and read in bulk:
+
+* header, see HEADER
+* node table, one flag byte per Node, see ``NodeStore.flags``
+* int32 adjacency array of shape ``[N, ALL_DIRECTIONS]``, see
+  ``NodeStore.neighbors``
+* int32 rows of the Nodes that have data, ascending
+* int64 offset of the data of each of them into the blob, and the size of
+  the blob last
+* blob, the data of every such Node pickled, each prefixed by its uint32 length
+
+Everything is little endian, and every section starts 8 byte aligned. Nothing
+is recursive, so the size of a world is only limited by memory.
+"""
+
+# Static analysis
+from __future__ import annotations
+from typing import BinaryIO, Dict, List, Tuple
+from array import array
+
+import bisect
+import mmap
+import os
+import pickle
+import struct
+import sys
+
+from direction import ALL_DIRECTIONS, Rotation
+from node import Data, Engine, EngineMode, Node
+from store import LOCKED, NodeStore, StoreNode
+
+MAGIC: bytes = b"LIMINAL\0"
+
+FORMAT: int = 1  # Bumped on any change to the layout
+
+# magic, format, directions, Nodes, start, current Node, previous Node, mode,
+# depth, Nodes with data
+HEADER: struct.Struct = struct.Struct("<8sIIQqqqiiQ")
+
+LENGTH: struct.Struct = struct.Struct("<I")  # Prefix of every data in the blob
+
+ALIGNMENT: int = 8
+
+# Rows of start, the current and the previous Node, mode and depth
+WorldHeader = Tuple[int, int, int, EngineMode, int]
+
+# Network, and where the engine stands
+Snapshot = Tuple[NodeStore, int, int, int, EngineMode, int]
+
+
+def isWorldFile(filename: str) -> bool:
+    """Checks if a file is a binary world, not an old pickled one
+
+    :param filename: file to check
+    :return: if it starts like a world file
+    """
+    with open(filename, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def saveWorld(engine: Engine, filename: str, ordered: bool = False) -> int:
+    """Save the network of an engine. Nodes of a store keep their rows, a
+    plain NodeStore is written straight from its arrays. Node objects are
+    copied to a NodeStore first, in breadth first order from the current
+    Node and start at once, so that the neighborhood of either comes first in
+    the file, see PagedStore.openWorld. Only the network and where the engine
+    stands are kept.
+
+    :param engine: engine to save
+    :param filename: file to write
+    :param ordered: if Nodes of a store are laid out in breadth first order
+        too, leaving out the rows no longer in the network. Their rows change,
+        so the world file cannot be followed by a log of the store.
+    :return: number of bytes written
+    """
+    store, *header = _network(engine, ordered)
+    if type(store) is not NodeStore:
+        store = store.snapshot()
+
+    return saveStore((store, *header), filename)
+
+
+def takeSnapshot(engine: Engine) -> Snapshot:
+    """Copy of the network of an engine and where it stands, which can be
+    saved while the engine goes on, see saveStore. Only flat arrays are
+    copied, unless the engine is made of Node objects.
+
+    :param engine: engine to copy
+    :return: the copy
+    """
+    store, *header = _network(engine)
+    if isinstance(engine.start, StoreNode) and store is engine.start._store:
+        store = store.snapshot()
+
+    return (store, *header)
+
+
+def saveStore(snapshot: Snapshot, filename: str) -> int:
+    """Save a network, see takeSnapshot and loadStore
+
+    :param snapshot: network and where the engine stands
+    :param filename: file to write
+    :return: number of bytes written
+    """
+    store, start, current, previous, mode, depth = snapshot
+    with open(filename, "wb") as file:
+        file.write(
+            HEADER.pack(
+                MAGIC,
+                FORMAT,
+                ALL_DIRECTIONS,
+                len(store),
+                start,
+                current,
+                previous,
+                mode.value,
+                depth,
+                len(store.data),
+            )
+        )
+        _write(file, store.flags)
+        _write(file, _little(store.neighbors))
+
+        rows: array = array("i", sorted(store.data))
+        blob: List[bytes] = []
+        offsets: array = array("q", [0])
+        for row in rows:
+            data: bytes = pickle.dumps(store.data[row], pickle.HIGHEST_PROTOCOL)
+            blob.append(LENGTH.pack(len(data)))
+            blob.append(data)
+            offsets.append(offsets[-1] + LENGTH.size + len(data))
+
+        _write(file, _little(rows))
+        _write(file, _little(offsets))
+        file.writelines(blob)
+
+        return file.tell()
+
+
+def replaceWorld(snapshot: Snapshot, filename: str) -> int:
+    """Save a network in place of a world file, so that a crash halfway
+    leaves the old one whole. Once done, both the new file and its name are
+    on disk.
+
+    :param snapshot: network and where the engine stands, see takeSnapshot
+    :param filename: file to replace
+    :return: number of bytes written
+    """
+    temporary: str = filename + ".tmp"
+    size: int = saveStore(snapshot, temporary)
+    with open(temporary, "rb") as file:
+        os.fsync(file.fileno())
+
+    os.replace(temporary, filename)
+    syncDirectory(filename)
+
+    return size
+
+
+def syncDirectory(filename: str) -> None:
+    """Make sure the directory of a file reached the disk, after the file was
+    renamed into it. The name lives in the directory, not in the file.
+
+    :param filename: file renamed
+    """
+    if os.name != "posix":
+        return  # Not possible, nor needed, elsewhere
+
+    directory: int = os.open(os.path.dirname(filename) or ".", os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def loadWorld(filename: str) -> Engine:
+    """Load a world saved by saveWorld, into a NodeStore
+
+    :param filename: file to read
+    :return: engine standing where it stood when saved
+    """
+    store, start, current, previous, mode, depth = loadStore(filename)
+
+    return standOn(store, start, current, previous, mode, depth)
+
+
+def openWorld(filename: str) -> Engine:
+    """Open a world saved by saveWorld in place, read only, see MappedStore.
+    Only the neighborhood the engine explores is ever read.
+
+    :param filename: file to open
+    :return: read only engine standing where it stood when saved
+    """
+    if sys.byteorder == "big":  # The arrays cannot be used as they are
+        engine: Engine = loadWorld(filename)
+        engine.setMode(EngineMode.READ_ONLY)
+        return engine
+
+    store: MappedStore = MappedStore(filename)
+    start, current, previous, _, depth = store.header
+
+    return standOn(store, start, current, previous, EngineMode.READ_ONLY, depth)
+
+
+def loadStore(filename: str) -> Snapshot:
+    """Read the network of a world file, without an engine
+
+    :param filename: file to read
+    :return: the network, the rows of start, the current and the previous
+        Node, and the mode and depth of the engine
+    """
+    with open(filename, "rb") as file:
+        count, entries, header = _header(file.read(HEADER.size), filename)
+
+        store: NodeStore = NodeStore()
+        store.flags = bytearray(_read(file, count))
+        store.neighbors = _array(file, "i", count * ALL_DIRECTIONS)
+        store.marks = array("q", bytes(8 * count))
+
+        rows: array = _array(file, "i", entries)
+        offsets: array = _array(file, "q", entries + 1)
+        blob: bytes = file.read(offsets[-1])
+
+    for row, offset in zip(rows, offsets):
+        store.data[row] = _unpickle(blob, offset)
+
+    return (store, *header)
+
+
+def standOn(
+    store: NodeStore,
+    start: int,
+    current: int,
+    previous: int,
+    mode: EngineMode,
+    depth: int,
+) -> Engine:
+    """Put an engine on a loaded store, standing where the saved one stood
+
+    :param store: loaded store, with start saved locked
+    :param start: row of the initial Node
+    :param current: row of the current Node
+    :param previous: row of the previous Node
+    :param mode: engine mode
+    :param depth: engine depth
+    :return: engine
+    """
+    # The engine locks start, which was saved locked already
+    store.setLocked(start, not store.isLocked(start))
+    engine: Engine = Engine(mode, depth, store.node(start))
+    engine.node = store.node(current)
+    engine.previous = store.node(previous)
+    engine.update()
+
+    return engine
+
+
+class MappedStore(NodeStore):
+    """NodeStore reading a world file in place, through mmap
+
+    The adjacency array and the node table are used straight from the mapped
+    file, so opening a world of any size only reads its header. The pages the
+    engine reads are loaded by the operating system as it goes, and data is
+    unpickled once a Node is asked for it. Traversal marks and locks are kept
+    on the side, for the Nodes that get them.
+
+    Nothing can be connected, rotated or stored, the world is read only.
+
+    Usage:
+
+    >>> store = MappedStore("world")
+    >>> engine = Engine(EngineMode.READ_ONLY, 10, store.node(store.header[0]))
+    >>> store.close()  # Once done with it
+
+    :param filename: world file to open, see saveWorld
+    :param header: rows of start, the current and the previous Node, and the
+        mode and depth of the engine that saved it
+    :param rows: Nodes that have data, ascending
+    :param offsets: where their data is in the blob
+    :param locks: locks changed since opening
+    """
+
+    def __init__(self, filename: str):
+        super().__init__()
+        with open(filename, "rb") as file:
+            self.map: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        count, entries, header = _header(self.map[: HEADER.size], filename)
+        self.header: WorldHeader = header
+
+        view: memoryview = memoryview(self.map)
+        at: int = HEADER.size
+        self.flags = view[at : at + count]
+        at += _aligned(count)
+        self.neighbors = view[at : at + 4 * count * ALL_DIRECTIONS].cast("i")
+        at += _aligned(4 * count * ALL_DIRECTIONS)
+        self.rows: memoryview = view[at : at + 4 * entries].cast("i")
+        at += _aligned(4 * entries)
+        self.offsets: memoryview = view[at : at + 8 * (entries + 1)].cast("q")
+        self.blob: int = at + _aligned(8 * (entries + 1))
+
+        if len(self.map) < self.blob + self.offsets[-1]:
+            self.close()
+            raise ValueError("World file is cut short")
+
+        self.marks = _Marks()
+        self.locks: Dict[int, bool] = {}
+
+    def close(self) -> None:
+        """Unmap the file. Nodes of the store cannot be used after this."""
+        for view in [self.flags, self.neighbors, self.rows, self.offsets]:
+            view.release()
+        self.map.close()
+
+    def nbytes(self) -> int:
+        """Size of what is kept besides the mapped file
+
+        :return: number of bytes
+        """
+        return sys.getsizeof(self.marks) + sys.getsizeof(self.data)
+
+    def setNeighbor(self, index: int, slot: int, node: Node | None) -> None:
+        raise TypeError("Mapped worlds are read only")
+
+    def swap(self, index: int, a: int, b: int) -> None:
+        raise TypeError("Mapped worlds are read only")
+
+    def rotate(self, index: int, rotation: Rotation) -> None:
+        raise TypeError("Mapped worlds are read only")
+
+    def new(self, data: Data = None) -> StoreNode:
+        raise TypeError("Mapped worlds are read only")
+
+    def setData(self, index: int, data: Data) -> None:
+        raise TypeError("Mapped worlds are read only")
+
+    def readData(self, begin: int, end: int) -> Dict[int, Data]:
+        """Data of a range of rows, read without keeping it
+
+        :param begin: first row
+        :param end: row after the last one
+        :return: data of the rows that have any
+        """
+        first: int = bisect.bisect_left(self.rows, begin)
+        last: int = bisect.bisect_left(self.rows, end)
+
+        return {
+            self.rows[entry]: _unpickle(self.map, self.blob + self.offsets[entry])
+            for entry in range(first, last)
+        }
+
+    def snapshot(self) -> NodeStore:
+        store: NodeStore = super().snapshot()
+        for index, locked in self.locks.items():
+            store.flags[index] = LOCKED if locked else 0
+
+        for index in self.rows:
+            store.data[index] = self.getData(index)
+
+        return store
+
+    def isLocked(self, index: int) -> bool:
+        locked: bool | None = self.locks.get(index)
+        if locked is None:
+            return bool(self.flags[index] & LOCKED)
+
+        return locked
+
+    def setLocked(self, index: int, locked: bool) -> None:
+        self.locks[index] = locked
+
+    def getData(self, index: int) -> Data:
+        if index in self.data:
+            return self.data[index]
+
+        entry: int = bisect.bisect_left(self.rows, index)
+        if entry == len(self.rows) or self.rows[entry] != index:
+            return None
+
+        data: Data = _unpickle(self.map, self.blob + self.offsets[entry])
+        self.data[index] = data  # Unpickled once
+
+        return data
+
+
+class _Marks(dict):
+    """Traversal marks of the Nodes that were ever visited"""
+
+    def __missing__(self, index: int) -> int:
+        return 0
+
+
+def _header(data: bytes, filename: str) -> Tuple[int, int, WorldHeader]:
+    """Check and unpack a header
+
+    :return: number of Nodes, number of Nodes with data, and the rest
+    """
+    if len(data) < HEADER.size or not data.startswith(MAGIC):
+        raise ValueError("Not a world file: " + filename)
+
+    (
+        _,
+        version,
+        directions,
+        count,
+        start,
+        current,
+        previous,
+        mode,
+        depth,
+        entries,
+    ) = HEADER.unpack(data)
+    if version != FORMAT or directions != ALL_DIRECTIONS:
+        raise ValueError(
+            f"Unsupported world file: format {version}, {directions} directions"
+        )
+
+    return count, entries, (start, current, previous, EngineMode(mode), depth)
+
+
+def _unpickle(blob: bytes | mmap.mmap, offset: int) -> Data:
+    """Data at an offset of the blob, after its length"""
+    (length,) = LENGTH.unpack_from(blob, offset)
+    begin: int = offset + LENGTH.size
+
+    return pickle.loads(blob[begin : begin + length])
+
+
+def _network(engine: Engine, ordered: bool = False) -> Snapshot:
+    """Store of the network of an engine, or a copy in one in breadth first
+    order if it is made of Node objects or asked for, and where the engine
+    stands"""
+    nodes: List[Node] = [engine.start, engine.node, engine.previous]
+    if not ordered and all(
+        isinstance(node, StoreNode) and node._store is engine.start._store
+        for node in nodes
+    ):
+        store: NodeStore = engine.start._store
+        start, current, previous = (node._index for node in nodes)
+    else:  # Around the current Node and start alike
+        store, rows = NodeStore.fromGraph(engine.node, engine.start, engine.previous)
+        start, current, previous = (rows[node] for node in nodes)
+
+    return store, start, current, previous, engine.getMode(), engine.getDepth()
+
+
+def _aligned(size: int) -> int:
+    """Size of a section with the padding after it"""
+    return size + -size % ALIGNMENT
+
+
+def _little(values: array) -> bytes:
+    """Bytes of an array in little endian"""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+
+    return values.tobytes()
+
+
+def _write(file: BinaryIO, data: bytes | bytearray) -> None:
+    """Write a section, padded up to the next one"""
+    file.write(data)
+    file.write(bytes(_aligned(len(data)) - len(data)))
+
+
+def _read(file: BinaryIO, size: int) -> bytes:
+    """Read a section and the padding after it"""
+    data: bytes = file.read(size)
+    if len(data) < size:
+        raise ValueError("World file is cut short")
+
+    file.read(_aligned(size) - size)
+
+    return data
+
+
+def _array(file: BinaryIO, typecode: str, count: int) -> array:
+    """Read a section of little endian values"""
+    values: array = array(typecode)
+    values.frombytes(_read(file, count * values.itemsize))
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    return values
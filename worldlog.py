@@ -0,0 +1,416 @@
+"""Write-ahead log of a world.
+
+A world is kept as a base world file, see worldfile, and a log next to it of
+what changed in its store since:
+
+* header, see HEADER
+* batches, each a BATCH header with the size and CRC32 of its records
+
+Every record is a RECORD, of a kind followed by:
+
+* ROW_RECORD, the flags and neighbors the row ends up with, see ROW. Rows
+  past the end of the store are new
+* DATA_RECORD, the data the row ends up with, pickled and prefixed by its
+  length, see DATA
+* NO_DATA_RECORD, nothing, the row ends up without data
+* STAND_RECORD, where the engine stands, see STAND. The row is the current
+  Node
+
+Records hold what a row ends up as, never how it got there, so replaying a
+log twice, or over a world file it was already compacted into, ends the same.
+A batch that is cut short or does not match its CRC32 was never written to
+the end, so it and anything after it is ignored. Everything is little endian.
+"""
+
+# Static analysis
+from __future__ import annotations
+from typing import BinaryIO, List, Set, Tuple
+from array import array
+
+import os
+import pickle
+import struct
+import sys
+import time
+import zlib
+
+from direction import ALL_DIRECTIONS
+from node import Data, Engine, EngineMode
+from store import LOCKED, NONE, NodeStore, StoreNode
+from paging import PagedStore
+from worldfile import loadStore, replaceWorld, standOn, syncDirectory, takeSnapshot
+
+MAGIC: bytes = b"LIMLOG\0\0"
+
+FORMAT: int = 1  # Bumped on any change to the layout
+
+HEADER: struct.Struct = struct.Struct("<8sII")  # magic, format, directions
+
+BATCH: struct.Struct = struct.Struct("<II")  # size, CRC32 of the records
+
+RECORD: struct.Struct = struct.Struct("<Bi")  # kind, row
+
+ROW: struct.Struct = struct.Struct(f"<B{ALL_DIRECTIONS}i")  # flags, neighbors
+
+DATA: struct.Struct = struct.Struct("<I")  # length of the pickled data
+
+STAND: struct.Struct = struct.Struct("<iii")  # previous Node, mode, depth
+
+# Kinds of records
+ROW_RECORD: int = 0
+DATA_RECORD: int = 1
+NO_DATA_RECORD: int = 2
+STAND_RECORD: int = 3
+
+# Rows of the current and the previous Node, mode and depth
+Stand = Tuple[int, int, EngineMode, int]
+
+
+class WriteAheadLog:
+    """Append only log of what changed in the store of an engine, so saving
+    costs what changed since the last save instead of the size of the world
+
+    The store tells the log which rows change, see ``NodeStore.log``. Once the
+    engine is done with an operation, commit puts down what those rows ended
+    up as, however many times they changed on the way, like when untangling
+    tries a bend and takes it back. Whole operations are written to the disk
+    in batches, once enough of them piled up or a while has passed. Now and
+    then, a checkpoint writes the base world file anew and empties the log.
+
+    Rows are the Nodes of a NodeStore, so the engine has to be backed by one,
+    or by one of its subclasses. Data is logged when it is set, changing it
+    in place is not seen.
+
+    Usage:
+
+    >>> log = WriteAheadLog.create(engine, "world")  # Writes the world file
+    >>> engine.move(Direction.NORTH)
+    >>> log.commit(engine)  # Done with the move, on the disk before long
+    >>> engine, log = WriteAheadLog.resume("world")  # Crashed or not
+    >>> log.checkpoint(engine)  # Once the log grew big
+
+    :param filename: base world file, the log is kept next to it
+    :param store: store logged
+    :param batch: bytes of whole operations to pile up before writing them
+    :param interval: most seconds to wait before writing them anyway
+    :param rows: rows changed since the last commit
+    :param data: rows with data set since the last commit
+    :param pending: records of whole operations, not written yet
+    :param stand: where the engine stood at the last commit
+    :param written: bytes written to the log since the last checkpoint
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        store: NodeStore,
+        batch: int = 1 << 16,
+        interval: float = 1.0,
+    ):
+        self.filename: str = filename
+        self.store: NodeStore = store
+        self.batch: int = batch
+        self.interval: float = interval
+
+        self.rows: Set[int] = set()
+        self.data: Set[int] = set()
+        self.pending: bytearray = bytearray()
+        self.stand: Stand | None = None
+
+        self.file: BinaryIO = open(logName(filename), "ab")
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, FORMAT, ALL_DIRECTIONS))
+
+        self.written: int = self.file.tell() - HEADER.size
+        self.flushed: float = time.monotonic()
+
+        store.log = self
+
+    @classmethod
+    def create(
+        cls, engine: Engine, filename: str, checkpoint: bool = True, **kwargs
+    ) -> WriteAheadLog:
+        """Start saving a world
+
+        :param engine: engine backed by a NodeStore
+        :param filename: base world file
+        :param checkpoint: if the world file is written now, otherwise it is
+            up to the caller, see Autosave
+        :return: log of the engine
+        """
+        if not isinstance(engine.start, StoreNode):
+            raise TypeError("Only worlds backed by a NodeStore can be logged")
+
+        log: WriteAheadLog = cls(filename, engine.start._store, **kwargs)
+        if checkpoint:
+            log.checkpoint(engine)
+        else:  # Forget an old log of the same name
+            log.compact(HEADER.size + log.written)
+
+        return log
+
+    @classmethod
+    def resume(
+        cls, filename: str, resident: int | None = None, **kwargs
+    ) -> Tuple[Engine, WriteAheadLog]:
+        """Load a world saved by a log, see replay, and keep logging it
+
+        :param filename: base world file
+        :param resident: if given, the world file is not read but paged in as
+            it is used, keeping this many Nodes in memory, see
+            PagedStore.openWorld. Only the neighborhood of the engine and what
+            the log changed is read.
+        :return: engine standing where it stood at the last commit written,
+            and its log
+        """
+        store: NodeStore
+        if resident is None or sys.byteorder == "big":
+            store, start, current, previous, mode, depth = loadStore(filename)
+        else:
+            store, header = PagedStore.openWorld(filename, resident)
+            start, current, previous, mode, depth = header
+
+        stand, end = replay(store, logName(filename))
+        if stand is not None:
+            current, previous, mode, depth = stand
+
+        if os.path.exists(logName(filename)):
+            os.truncate(logName(filename), end)  # What a crash left halfway
+
+        engine: Engine = standOn(store, start, current, previous, mode, depth)
+
+        return engine, cls(filename, store, **kwargs)
+
+    def close(self) -> None:
+        """Write what was committed and stop logging"""
+        self.flush()
+        self.file.close()
+        self.store.log = None
+
+    def changed(self, index: int, data: bool = False) -> None:
+        """Told by the store when a row changed
+
+        :param index: row
+        :param data: if its data was set
+        """
+        self.rows.add(index)
+        if data:
+            self.data.add(index)
+
+    def commit(self, engine: Engine) -> int:
+        """Mark the end of an operation, and write the operations piled up if
+        it is time to
+
+        :param engine: engine of the store
+        :return: number of bytes written
+        """
+        store: NodeStore = self.store
+        records: List[bytes] = []
+        for index in sorted(self.rows):  # New rows in the order they came
+            flags: int = LOCKED if store.isLocked(index) else 0
+            records.append(RECORD.pack(ROW_RECORD, index))
+            records.append(ROW.pack(flags, *store.row(index)))
+
+        for index in sorted(self.data):
+            data: Data = store.getData(index)
+            if data is None:
+                records.append(RECORD.pack(NO_DATA_RECORD, index))
+            else:
+                blob: bytes = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+                records.append(RECORD.pack(DATA_RECORD, index))
+                records.append(DATA.pack(len(blob)))
+                records.append(blob)
+
+        self.rows.clear()
+        self.data.clear()
+
+        stand: Stand = (
+            engine.node._index,
+            engine.previous._index,
+            engine.getMode(),
+            engine.getDepth(),
+        )
+        if records or stand != self.stand:
+            current, previous, mode, depth = stand
+            records.append(RECORD.pack(STAND_RECORD, current))
+            records.append(STAND.pack(previous, mode.value, depth))
+            self.pending.extend(b"".join(records))
+            self.stand = stand
+
+        if (
+            len(self.pending) >= self.batch
+            or time.monotonic() - self.flushed >= self.interval
+        ):
+            return self.flush()
+
+        return 0
+
+    def flush(self) -> int:
+        """Write the operations piled up, and wait for the disk
+
+        :return: number of bytes written
+        """
+        self.flushed = time.monotonic()
+        if not self.pending:
+            return 0
+
+        records: bytes = bytes(self.pending)
+        self.file.write(BATCH.pack(len(records), zlib.crc32(records)))
+        self.file.write(records)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending.clear()
+
+        self.written += BATCH.size + len(records)
+
+        return BATCH.size + len(records)
+
+    def checkpoint(self, engine: Engine) -> int:
+        """Compact the log into the base world file. Taking as long as saving
+        the whole world, but a crash halfway loses nothing. See Autosave for
+        doing it while the engine goes on.
+
+        :param engine: engine of the store, done with any operation
+        :return: number of bytes of the world file
+        """
+        end: int = self.mark(engine)
+        size: int = replaceWorld(takeSnapshot(engine), self.filename)
+        self.compact(end)
+
+        return size
+
+    def mark(self, engine: Engine) -> int:
+        """Commit and write everything, before taking a snapshot of the world
+
+        :param engine: engine of the store, done with any operation
+        :return: where the log ends, see compact
+        """
+        self.commit(engine)
+        self.flush()
+
+        return HEADER.size + self.written
+
+    def compact(self, end: int) -> None:
+        """Drop what the base world file caught up with. Replaying it over
+        the new world file would change nothing anyway.
+
+        :param end: where the log ended when the snapshot saved was taken,
+            see mark
+        """
+        self.flush()
+        with open(logName(self.filename), "rb") as file:
+            file.seek(end)
+            rest: bytes = file.read()
+
+        temporary: str = logName(self.filename) + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(HEADER.pack(MAGIC, FORMAT, ALL_DIRECTIONS))
+            file.write(rest)
+            file.flush()
+            os.fsync(file.fileno())
+
+        self.file.close()
+        os.replace(temporary, logName(self.filename))
+        syncDirectory(self.filename)
+        self.file = open(logName(self.filename), "ab")
+        self.written = len(rest)
+
+
+def logName(filename: str) -> str:
+    """Log kept next to a world file
+
+    :param filename: base world file
+    :return: file of the log
+    """
+    return filename + ".log"
+
+
+def replay(store: NodeStore, filename: str) -> Tuple[Stand | None, int]:
+    """Bring a store loaded from a world file up to date with its log. The log
+    is read up to the last batch written to the end.
+
+    :param store: store as loaded, see worldfile.loadStore and
+        PagedStore.openWorld
+    :param filename: log to replay, nothing happens if there is none
+    :return: where the engine stood at the end, if the log says, and how far
+        the log was read
+    """
+    if not os.path.exists(filename):
+        return None, 0
+
+    with open(filename, "rb") as file:
+        log: bytes = file.read()
+
+    if len(log) < HEADER.size:  # Cut short before anything was logged
+        return None, 0
+
+    magic, version, directions = HEADER.unpack_from(log)
+    if magic != MAGIC:
+        raise ValueError("Not a world log: " + filename)
+
+    if version != FORMAT or directions != ALL_DIRECTIONS:
+        raise ValueError(
+            f"Unsupported world log: format {version}, {directions} directions"
+        )
+
+    stand: Stand | None = None
+    end: int = HEADER.size
+    while end + BATCH.size <= len(log):
+        size, crc = BATCH.unpack_from(log, end)
+        begin: int = end + BATCH.size
+        records: bytes = log[begin : begin + size]
+        if len(records) < size or zlib.crc32(records) != crc:
+            break  # Never written to the end
+
+        stand = _apply(store, records) or stand
+        end = begin + size
+
+    return stand, end
+
+
+def _apply(store: NodeStore, records: bytes) -> Stand | None:
+    """Apply the records of a batch to a store, through its row accessors
+    unless it is a plain NodeStore
+
+    :return: where the engine stood at the end of the batch
+    """
+    stand: Stand | None = None
+    at: int = 0
+    while at < len(records):
+        kind, index = RECORD.unpack_from(records, at)
+        at += RECORD.size
+
+        if kind == ROW_RECORD:
+            flags, *neighbors = ROW.unpack_from(records, at)
+            at += ROW.size
+
+            while len(store) <= index:
+                store.new()
+
+            if type(store) is NodeStore:
+                offset: int = index * ALL_DIRECTIONS
+                store.neighbors[offset : offset + ALL_DIRECTIONS] = array(
+                    "i", neighbors
+                )
+                store.flags[index] = flags
+            else:
+                for slot, other in enumerate(neighbors):
+                    store.setNeighbor(
+                        index, slot, None if other == NONE else store.node(other)
+                    )
+                store.setLocked(index, bool(flags & LOCKED))
+        elif kind == DATA_RECORD:
+            (length,) = DATA.unpack_from(records, at)
+            at += DATA.size
+            store.setData(index, pickle.loads(records[at : at + length]))
+            at += length
+        elif kind == NO_DATA_RECORD:
+            store.setData(index, None)
+        elif kind == STAND_RECORD:
+            previous, mode, depth = STAND.unpack_from(records, at)
+            at += STAND.size
+            stand = (index, previous, EngineMode(mode), depth)
+        else:
+            raise ValueError(f"Unknown world log record: {kind}")
+
+    return stand